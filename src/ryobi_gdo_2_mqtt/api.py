@@ -1,34 +1,56 @@
-import json
+import asyncio
+from typing import Any
 
 from aiohttp import ClientSession, ServerConnectionError, ServerTimeoutError
 
-from ryobi_gdo_2_mqtt.constants import DEVICE_GET_ENDPOINT, HOST_URI, LOGIN_ENDPOINT, DoorStates
+from ryobi_gdo_2_mqtt import codec
+from ryobi_gdo_2_mqtt.cache import ApiKeyCache
+from ryobi_gdo_2_mqtt.constants import DEVICE_GET_ENDPOINT, HOST_URI, LOGIN_ENDPOINT
+from ryobi_gdo_2_mqtt.device_state import DeviceStateExtractor
 from ryobi_gdo_2_mqtt.exceptions import (
+    RyobiApiError,
     RyobiAuthenticationError,
     RyobiConnectionError,
     RyobiDeviceNotFoundError,
     RyobiInvalidResponseError,
 )
 from ryobi_gdo_2_mqtt.logging import log
-from ryobi_gdo_2_mqtt.models import Auth, DeviceData, LoginResponse, LoginResult, MetaData, WskAuthAttempt
+from ryobi_gdo_2_mqtt.models import Auth, DeviceUpdate, LoginResponse, LoginResult, MetaData, WskAuthAttempt
+from ryobi_gdo_2_mqtt.rate_limit import RequestStats, TokenBucket
 
 
 class RyobiApiClient:
     """Client for interacting with the Ryobi API."""
 
-    def __init__(self, username: str, password: str, session: ClientSession):
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        session: ClientSession,
+        key_cache: ApiKeyCache | None = None,
+        rate_limiter: TokenBucket | None = None,
+    ):
         """Initialize the Ryobi API client.
 
         Args:
             username: Ryobi account username/email
             password: Ryobi account password
             session: aiohttp ClientSession for making requests
+            key_cache: Where to keep the API key between restarts, None to always log in
+            rate_limiter: Token bucket every request waits on, None to not limit requests
         """
         self.username = username
         self.password = password
         self.session = session
+        self.key_cache = key_cache
+        self.rate_limiter = rate_limiter
+        self.request_stats = RequestStats()
         self.api_key = None
+        self._login_lock = asyncio.Lock()
+        self._in_flight: dict[tuple[str, str], asyncio.Future] = {}
+        self._extractor = DeviceStateExtractor()
         self._device_modules: dict[str, dict[str, str]] = {}
+        self._attribute_stamps: dict[str, dict[str, tuple[int | None, Any]]] = {}
 
     async def get_api_key(self) -> bool:
         """Get api_key from Ryobi.
@@ -73,34 +95,121 @@ class RyobiApiClient:
             )
             login_response = LoginResponse(result=result)
             self.api_key = login_response.api_key
+            if self.key_cache is not None:
+                self.key_cache.store(self.username, self.api_key, created_date=auth.createdDate)
             return True
         except KeyError as e:
             log.error("Exception while parsing Ryobi answer to get API key: %s", e)
             raise RyobiInvalidResponseError(f"Invalid login response format: {e}") from e
 
+    def use_cached_api_key(self) -> bool:
+        """Take the API key from the cache instead of logging in.
+
+        The key is only checked when the websocket authenticates with it, see
+        ``refresh_api_key``.
+
+        Returns:
+            True if a cached key for this account was found
+        """
+        if self.key_cache is None:
+            return False
+        api_key = self.key_cache.load(self.username)
+        if api_key is None:
+            return False
+        self.api_key = api_key
+        return True
+
+    async def refresh_api_key(self, rejected: str | None = None) -> str | None:
+        """Log in again after the server rejected an API key.
+
+        Connections rejected with the same key share one login.
+
+        Args:
+            rejected: The API key the server rejected
+
+        Returns:
+            The new API key, or None if logging in failed
+        """
+        async with self._login_lock:
+            if rejected is not None and self.api_key is not None and self.api_key != rejected:
+                return self.api_key
+
+            log.info("API key rejected, logging in again")
+            if self.key_cache is not None:
+                self.key_cache.clear()
+            try:
+                await self.get_api_key()
+            except RyobiApiError as ex:
+                log.error("Failed to log in again: %s", ex)
+                return None
+            return self.api_key
+
     async def _process_request(self, url: str, method: str, data: dict[str, str]) -> dict | None:
-        """Process HTTP requests.
+        """Process HTTP requests, sharing one request between concurrent callers.
+
+        A caller asking for a (method, url) that is already in flight gets the
+        result of that request instead of sending its own.
+
+        Raises:
+            RyobiConnectionError: If connection fails or times out
+            RyobiInvalidResponseError: If response is not valid JSON or has error status
+        """
+        key = (method, url)
+        request = self._in_flight.get(key)
+        if request is not None:
+            self.request_stats.coalesced += 1
+            log.debug("Joining in-flight request to %s", url)
+        else:
+            request = asyncio.ensure_future(self._send_request(url, method, data))
+            self._in_flight[key] = request
+
+            def forget(done: asyncio.Future) -> None:
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+                # Every caller may have been cancelled, so mark a failure as retrieved
+                if not done.cancelled():
+                    done.exception()
+
+            request.add_done_callback(forget)
+
+        # One caller being cancelled must not cancel the request for the others
+        return await asyncio.shield(request)
+
+    async def _send_request(self, url: str, method: str, data: dict[str, str]) -> dict | None:
+        """Send an HTTP request, waiting for the rate limiter first.
 
         Raises:
             RyobiConnectionError: If connection fails or times out
             RyobiInvalidResponseError: If response is not valid JSON or has error status
         """
+        if self.rate_limiter is not None:
+            waited = await self.rate_limiter.acquire()
+            if waited:
+                self.request_stats.throttled += 1
+                self.request_stats.throttled_seconds += waited
+                log.debug("Request to %s throttled for %.2fs", url, waited)
+
         http_hethod = getattr(self.session, method)
         log.debug("Connecting to %s using %s", url, method)
+        self.request_stats.sent += 1
         try:
             async with http_hethod(url, data=data) as response:
-                rawReply = await response.text()
+                rawReply = await response.read()
                 try:
-                    reply = json.loads(rawReply)
-                    if not isinstance(reply, dict):
-                        raise RyobiInvalidResponseError(f"Response is not a dictionary: {rawReply}")
-                except ValueError as e:
-                    log.warning("Reply was not in JSON format: %s", rawReply)
-                    raise RyobiInvalidResponseError(f"Invalid JSON response: {rawReply}") from e
+                    reply = await codec.loads_offloaded(rawReply)
+                except codec.DecodeError as e:
+                    text = rawReply.decode(errors="replace")
+                    log.warning("Reply was not in JSON format: %s", text)
+                    raise RyobiInvalidResponseError(f"Invalid JSON response: {text}") from e
+                if not isinstance(reply, dict):
+                    raise RyobiInvalidResponseError(
+                        f"Response is not a dictionary: {rawReply.decode(errors='replace')}"
+                    )
 
                 if response.status in [404, 405, 500]:
-                    log.warning("HTTP Error: %s", rawReply)
-                    raise RyobiInvalidResponseError(f"HTTP error {response.status}: {rawReply}")
+                    text = rawReply.decode(errors="replace")
+                    log.warning("HTTP Error: %s", text)
+                    raise RyobiInvalidResponseError(f"HTTP error {response.status}: {text}")
 
                 return reply
         except (TimeoutError, ServerTimeoutError) as e:
@@ -157,14 +266,14 @@ class RyobiApiClient:
             devices[data["varName"]] = data["metaData"]["name"]
         return devices
 
-    async def update_device(self, device_id: str) -> DeviceData | None:
+    async def update_device(self, device_id: str) -> DeviceUpdate | None:
         """Update device status and parse modules.
 
         Args:
             device_id: The device ID to update
 
         Returns:
-            DeviceData object containing device data
+            DeviceUpdate with the device's current state
 
         Raises:
             RyobiInvalidResponseError: If response format is invalid
@@ -175,99 +284,58 @@ class RyobiApiClient:
         request = await self._process_request(url, method, data)
 
         try:
-            dtm = request["result"][0]["deviceTypeMap"]
-
-            # Parse the modules for this device
-            result = await self._index_modules(device_id, dtm)
-            log.debug("Modules indexed for %s: %s", device_id, self._device_modules.get(device_id))
-
-            if not result:
-                raise RyobiInvalidResponseError(f"Failed to index modules for device {device_id}")
-
-            device_modules = self._device_modules[device_id]
-            device_data_dict = {}
-
-            # Parse initial values
-            if "garageDoor" in device_modules:
-                door_state = dtm[device_modules["garageDoor"]]["at"]["doorState"]["value"]
-                device_data_dict["door_state"] = DoorStates.to_string(door_state)
-                device_data_dict["safety"] = dtm[device_modules["garageDoor"]]["at"]["sensorFlag"]["value"]
-                device_data_dict["vacation_mode"] = dtm[device_modules["garageDoor"]]["at"]["vacationMode"]["value"]
-
-                if "motionSensor" in dtm[device_modules["garageDoor"]]["at"]:
-                    device_data_dict["motion"] = dtm[device_modules["garageDoor"]]["at"]["motionSensor"]["value"]
-
-            if "garageLight" in device_modules:
-                device_data_dict["light_state"] = dtm[device_modules["garageLight"]]["at"]["lightState"]["value"]
-
-            if "backupCharger" in device_modules:
-                device_data_dict["battery_level"] = dtm[device_modules["backupCharger"]]["at"]["chargeLevel"]["value"]
-
-            if "wifiModule" in device_modules:
-                device_data_dict["wifi_rssi"] = dtm[device_modules["wifiModule"]]["at"]["rssi"]["value"]
-
-            if "parkAssistLaser" in device_modules:
-                device_data_dict["park_assist"] = dtm[device_modules["parkAssistLaser"]]["at"]["moduleState"]["value"]
+            state = self._extractor.extract(request["result"][0])
+        except (KeyError, IndexError, TypeError, AttributeError) as error:
+            log.error("Exception while parsing device update: %s", error)
+            raise RyobiInvalidResponseError(f"Invalid device data format for {device_id}: {error}") from error
 
-            if "inflator" in device_modules:
-                device_data_dict["inflator"] = dtm[device_modules["inflator"]]["at"]["moduleState"]["value"]
+        self._device_modules[device_id] = state.modules
+        self._attribute_stamps[device_id] = state.stamps
+        log.debug("Modules indexed for %s: %s", device_id, state.modules)
+        log.debug("Device data: %s", state.update)
+        return state.update
 
-            if "btSpeaker" in device_modules:
-                device_data_dict["bt_speaker"] = dtm[device_modules["btSpeaker"]]["at"]["moduleState"]["value"]
-                device_data_dict["mic_status"] = dtm[device_modules["btSpeaker"]]["at"]["micEnable"]["value"]
+    def attribute_stamps(self, device_id: str) -> dict[str, tuple[int | None, Any]]:
+        """Return (lastSet, value) per attribute key from the device's last REST state.
 
-            if "fan" in device_modules:
-                device_data_dict["fan"] = dtm[device_modules["fan"]]["at"]["speed"]["value"]
+        Args:
+            device_id: The device ID
 
-            if "name" in request["result"][0]["metaData"]:
-                device_data_dict["device_name"] = request["result"][0]["metaData"]["name"]
+        Returns:
+            Mapping of attribute key to its last set timestamp and value, empty if unknown
+        """
+        return self._attribute_stamps.get(device_id, {})
 
-            device_data = DeviceData(**device_data_dict)
-            log.debug("Device data: %s", device_data)
+    def device_modules(self, device_id: str) -> list[str]:
+        """Return the names of the modules indexed for a device.
 
-            return device_data
+        Args:
+            device_id: The device ID
 
-        except KeyError as error:
-            log.error("Exception while parsing device update: %s", error)
-            raise RyobiInvalidResponseError(f"Invalid device data format for {device_id}: {error}") from error
+        Returns:
+            Module names (e.g., "garageDoor", "garageLight"), empty if not indexed
+        """
+        return list(self._device_modules.get(device_id, {}))
 
-    async def _index_modules(self, device_id: str, dtm: dict) -> bool:
-        """Index and add modules to dictionary for a specific device.
+    def module_index(self, device_id: str) -> dict[str, str]:
+        """Return the module index of a device, e.g. for caching it.
 
         Args:
             device_id: The device ID
-            dtm: Device type map from API response
 
         Returns:
-            True if successful
+            Mapping of module name to its deviceTypeMap key, empty if not indexed
+        """
+        return dict(self._device_modules.get(device_id, {}))
 
-        Raises:
-            RyobiInvalidResponseError: If module parsing fails
+    def restore_module_index(self, device_id: str, modules: dict[str, str]) -> None:
+        """Use a cached module index until the device state is fetched.
+
+        Args:
+            device_id: The device ID
+            modules: Mapping of module name to its deviceTypeMap key
         """
-        # Known modules
-        module_list = [
-            "garageDoor",
-            "backupCharger",
-            "garageLight",
-            "wifiModule",
-            "parkAssistLaser",
-            "inflator",
-            "btSpeaker",
-            "fan",
-        ]
-
-        frame = {}
-        try:
-            for key in dtm:
-                for module in module_list:
-                    if module in key:
-                        frame[module] = key
-        except Exception as err:
-            log.error("Problem parsing module list: %s", err)
-            raise RyobiInvalidResponseError(f"Failed to parse module list for {device_id}: {err}") from err
-
-        self._device_modules[device_id] = frame
-        return True
+        self._device_modules[device_id] = dict(modules)
 
     def get_module(self, device_id: str, module: str) -> int | None:
         """Return module number for device.
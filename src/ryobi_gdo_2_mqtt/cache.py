@@ -0,0 +1,152 @@
+"""On-disk caches kept between restarts."""
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from ryobi_gdo_2_mqtt.logging import log
+
+# Owner read/write only, the file holds a credential
+CACHE_FILE_MODE = 0o600
+
+
+def _read_entry(path: Path, what: str) -> dict | None:
+    """Read a cache file, returning None if it is missing or unreadable."""
+    try:
+        entry = json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as ex:
+        log.warning("Ignoring unreadable %s %s: %s", what, path, ex)
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+def _write_entry(path: Path, entry: dict, what: str) -> None:
+    """Write a cache file, owner-only and replaced atomically."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, CACHE_FILE_MODE)
+        with os.fdopen(fd, "w") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+    except OSError as ex:
+        log.warning("Unable to write %s %s: %s", what, path, ex)
+        tmp_path.unlink(missing_ok=True)
+
+
+class ApiKeyCache:
+    """Remember the API key of the last login so a restart can skip logging in.
+
+    The cached key is not checked when loaded. The websocket authenticating
+    with it is the check, and a rejected key is cleared and replaced by a
+    fresh login.
+    """
+
+    def __init__(self, path: str | Path):
+        """Initialize the cache.
+
+        Args:
+            path: File the key and login metadata are stored in
+        """
+        self.path = Path(path)
+
+    def load(self, username: str) -> str | None:
+        """Return the cached API key for an account.
+
+        Args:
+            username: Ryobi account the key must belong to
+
+        Returns:
+            The API key, or None if nothing usable is cached
+        """
+        entry = _read_entry(self.path, "API key cache")
+        if entry is None or entry.get("username") != username or not entry.get("api_key"):
+            return None
+        return entry["api_key"]
+
+    def store(self, username: str, api_key: str, **metadata: Any) -> None:
+        """Cache an API key, replacing the file atomically.
+
+        Args:
+            username: Ryobi account the key belongs to
+            api_key: The API key
+            **metadata: Extra login details kept alongside the key
+        """
+        entry = {"username": username, "api_key": api_key, "cached_at": time.time(), **metadata}
+        _write_entry(self.path, entry, "API key cache")
+
+    def clear(self) -> None:
+        """Forget the cached API key."""
+        try:
+            self.path.unlink(missing_ok=True)
+        except OSError as ex:
+            log.warning("Unable to remove API key cache %s: %s", self.path, ex)
+
+
+@dataclass
+class DeviceSnapshot:
+    """What the cloud last reported about an account's devices."""
+
+    # device_id -> device name
+    devices: dict[str, str] = field(default_factory=dict)
+    # device_id -> module name -> deviceTypeMap key, e.g. "garageDoor" -> "garageDoor_7"
+    modules: dict[str, dict[str, str]] = field(default_factory=dict)
+    # device_id -> DeviceUpdate field -> last known value
+    states: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+
+class DeviceSnapshotCache:
+    """Remember the device list, module index and last known states between restarts.
+
+    A restart sets devices up from the snapshot without waiting for the cloud,
+    and the snapshot is revalidated against the cloud afterwards.
+    """
+
+    def __init__(self, path: str | Path):
+        """Initialize the cache.
+
+        Args:
+            path: File the snapshot is stored in
+        """
+        self.path = Path(path)
+
+    def load(self, username: str) -> DeviceSnapshot | None:
+        """Return the cached snapshot of an account.
+
+        Args:
+            username: Ryobi account the snapshot must belong to
+
+        Returns:
+            The snapshot, or None if nothing usable is cached
+        """
+        entry = _read_entry(self.path, "device cache")
+        if entry is None or entry.get("username") != username:
+            return None
+        try:
+            snapshot = DeviceSnapshot(
+                devices=dict(entry["devices"]),
+                modules={device_id: dict(modules) for device_id, modules in entry["modules"].items()},
+                states={device_id: dict(state) for device_id, state in entry["states"].items()},
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as ex:
+            log.warning("Ignoring malformed device cache %s: %s", self.path, ex)
+            return None
+        # A device without a module index would have to be fetched anyway
+        if not snapshot.devices or any(device_id not in snapshot.modules for device_id in snapshot.devices):
+            return None
+        return snapshot
+
+    def store(self, username: str, snapshot: DeviceSnapshot) -> None:
+        """Cache a snapshot, replacing the file atomically.
+
+        Args:
+            username: Ryobi account the snapshot belongs to
+            snapshot: The snapshot
+        """
+        entry = {"username": username, "cached_at": time.time(), **asdict(snapshot)}
+        _write_entry(self.path, entry, "device cache")
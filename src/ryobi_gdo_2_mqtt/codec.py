@@ -0,0 +1,95 @@
+"""JSON decoding of websocket frames and REST responses, and classification of frames."""
+
+import asyncio
+import json
+from typing import Any
+
+from ryobi_gdo_2_mqtt.constants import ATTRIBUTE_UPDATE_METHOD, MessageKind
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+    DecodeError: tuple[type[Exception], ...] = (orjson.JSONDecodeError,)
+    _loads = orjson.loads
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    DecodeError = (msgspec.DecodeError,)
+    _loads = msgspec.json.Decoder().decode
+else:
+    BACKEND = "json"
+    DecodeError = (json.JSONDecodeError, UnicodeDecodeError)
+    _loads = json.loads
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a JSON document with the fastest available backend.
+
+    Args:
+        data: Raw frame payload
+
+    Returns:
+        The decoded document
+
+    Raises:
+        DecodeError: If the payload is not valid JSON
+    """
+    return _loads(data)
+
+
+# Documents larger than this many bytes are decoded in a worker thread by ``loads_offloaded``
+OFFLOAD_SIZE = 16 * 1024
+
+
+async def loads_offloaded(data: bytes, offload_size: int = OFFLOAD_SIZE) -> Any:
+    """Decode a JSON document, in a worker thread if it is large.
+
+    Keeps decoding a full device state from blocking the event loop, and
+    with it the websocket traffic of every other device.
+
+    Args:
+        data: Raw document
+        offload_size: Size in bytes above which decoding leaves the event loop
+
+    Returns:
+        The decoded document
+
+    Raises:
+        DecodeError: If the document is not valid JSON
+    """
+    if len(data) > offload_size:
+        return await asyncio.to_thread(_loads, data)
+    return _loads(data)
+
+
+def classify(message: Any) -> MessageKind:
+    """Tell RPC responses, attribute notifications and anything else apart.
+
+    Only looks at top-level keys, so it is cheap enough to run on every frame
+    before any further parsing.
+
+    Args:
+        message: A decoded websocket frame
+
+    Returns:
+        The kind of message
+    """
+    if not isinstance(message, dict):
+        return MessageKind.UNKNOWN
+    method = message.get("method")
+    if method is None:
+        if "result" in message or "error" in message:
+            return MessageKind.RESPONSE
+        return MessageKind.UNKNOWN
+    if method == ATTRIBUTE_UPDATE_METHOD:
+        return MessageKind.NOTIFICATION
+    return MessageKind.UNKNOWN
@@ -0,0 +1,156 @@
+"""Scheduling of the commands sent to a device over the websocket."""
+
+import asyncio
+import itertools
+import time
+from collections import abc
+from dataclasses import dataclass
+from typing import Any
+
+from ryobi_gdo_2_mqtt.logging import log
+
+# Default least seconds between two commands to the same device
+DEFAULT_COMMAND_SPACING = 0.2
+
+# Command attributes sent before any other pending command
+URGENT_ATTRIBUTES = frozenset({"doorCommand"})
+
+
+@dataclass
+class CommandStats:
+    """Counters for one class of command, the module attribute it sets."""
+
+    queued: int = 0
+    # Commands replaced by a later one for the same port and attribute before being sent
+    coalesced: int = 0
+    sent: int = 0
+    failed: int = 0
+    # Seconds from the first queued command until its latest value was sent
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """Return the average seconds a command waited in the queue."""
+        attempts = self.sent + self.failed
+        return self.total_wait / attempts if attempts else 0.0
+
+
+class CommandScheduler:
+    """Send a device's commands one at a time, door commands first.
+
+    Commands waiting for the same port and attribute are collapsed to the
+    latest value, so dragging a slider sends only the value it stopped at.
+    A collapsed command keeps its place and wait time. Door commands go
+    ahead of every other pending command, the rest are sent in the order
+    they were first queued, and at least ``spacing`` seconds pass between
+    two commands. A command's acknowledgement is awaited in its own task,
+    so a slow ack never holds back the next command.
+
+    Commands are queued and sent on the event loop.
+    """
+
+    def __init__(
+        self,
+        send: abc.Callable[[int, int, str, Any], abc.Awaitable[bool | None]],
+        spacing: float = DEFAULT_COMMAND_SPACING,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            send: Sends a command, called with (port_id, module_type, attribute, value)
+            spacing: Least seconds between two commands
+        """
+        self.send = send
+        self.spacing = spacing
+        self.stats: dict[str, CommandStats] = {}
+        # (port_id, attribute) -> (priority, order, queued at, module_type, value)
+        self._pending: dict[tuple[int, str], tuple[int, int, float, int, Any]] = {}
+        self._order = itertools.count()
+        self._wake = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self._sending: set[asyncio.Task] = set()
+        self._sent_at: float | None = None
+
+    def __len__(self) -> int:
+        """Return the number of commands waiting."""
+        return len(self._pending)
+
+    def submit(self, port_id: int, module_type: int, attribute: str, value: Any) -> None:
+        """Queue a command, replacing the one waiting for the same port and attribute.
+
+        Args:
+            port_id: Module port ID
+            module_type: Module type ID
+            attribute: Module attribute to set
+            value: Value to set
+        """
+        stats = self.stats.setdefault(attribute, CommandStats())
+        stats.queued += 1
+        key = (port_id, attribute)
+        waiting = self._pending.get(key)
+        if waiting is not None:
+            stats.coalesced += 1
+            log.debug("Replacing pending %s command for port %s: %s -> %s", attribute, port_id, waiting[4], value)
+            self._pending[key] = (*waiting[:3], module_type, value)
+        else:
+            priority = 0 if attribute in URGENT_ATTRIBUTES else 1
+            self._pending[key] = (priority, next(self._order), time.monotonic(), module_type, value)
+
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        self._wake.set()
+
+    async def _run(self) -> None:
+        """Send pending commands until closed."""
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._pending:
+                if self._sent_at is not None:
+                    wait = self._sent_at + self.spacing - time.monotonic()
+                    if wait > 0:
+                        # A door command queued meanwhile is still sent first
+                        await asyncio.sleep(wait)
+                self._send_next()
+
+    def _send_next(self) -> None:
+        """Start sending the most urgent pending command."""
+        key = min(self._pending, key=lambda pending: self._pending[pending][:2])
+        _, _, queued_at, module_type, value = self._pending.pop(key)
+        port_id, attribute = key
+        stats = self.stats[attribute]
+        waited = time.monotonic() - queued_at
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+
+        self._sent_at = time.monotonic()
+        task = asyncio.get_running_loop().create_task(self._send(port_id, module_type, attribute, value))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, port_id: int, module_type: int, attribute: str, value: Any) -> None:
+        """Send a command and count it as sent or failed once it is acknowledged."""
+        stats = self.stats[attribute]
+        try:
+            sent = await self.send(port_id, module_type, attribute, value)
+        except Exception as ex:  # pylint: disable=broad-except
+            log.error("Error sending %s command: %s", attribute, ex)
+            sent = False
+        if sent is False:
+            stats.failed += 1
+        else:
+            stats.sent += 1
+
+    async def close(self) -> None:
+        """Stop sending, dropping the commands still waiting and no longer awaiting acks."""
+        if self._pending:
+            log.info("Dropping %d pending commands", len(self._pending))
+            self._pending.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for task in self._sending:
+            task.cancel()
+        await asyncio.gather(*self._sending, return_exceptions=True)
@@ -22,14 +22,10 @@ class DoorStates(IntEnum):
     @classmethod
     def to_string(cls, value: int) -> str:
         """Convert door state value to string."""
-        mapping = {
-            cls.CLOSED: "closed",
-            cls.OPEN: "open",
-            cls.CLOSING: "closing",
-            cls.OPENING: "opening",
-            cls.FAULT: "fault",
-        }
-        return mapping.get(value, "unknown")
+        return DOOR_STATE_NAMES.get(value, "unknown")
+
+
+DOOR_STATE_NAMES: dict[int, str] = {state.value: state.name.lower() for state in DoorStates}
 
 
 class DoorCommands(IntEnum):
@@ -65,6 +61,9 @@ class LightCommandPayloads:
 # Battery threshold
 BATTERY_LOW_THRESHOLD = 20
 
+# Devices set up at the same time on startup
+DEFAULT_SETUP_CONCURRENCY = 4
+
 
 class WebSocketState(StrEnum):
     """WebSocket connection states."""
@@ -73,3 +72,33 @@ class WebSocketState(StrEnum):
     DISCONNECTED = "disconnected"
     STARTING = "starting"
     STOPPED = "stopped"
+
+
+class OverflowPolicy(StrEnum):
+    """What a full dispatch queue does with a new message."""
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+
+class EntityKind(StrEnum):
+    """Home Assistant entity types created for a device."""
+
+    COVER = "cover"
+    SWITCH = "switch"
+    BINARY_SENSOR = "binary_sensor"
+    SENSOR = "sensor"
+    NUMBER = "number"
+
+
+class MessageKind(StrEnum):
+    """Kinds of frames received on the websocket."""
+
+    RESPONSE = "response"
+    NOTIFICATION = "notification"
+    UNKNOWN = "unknown"
+
+
+# JSON-RPC method of device attribute notifications
+ATTRIBUTE_UPDATE_METHOD = "wskAttributeUpdateNtfy"
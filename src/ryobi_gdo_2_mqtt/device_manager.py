@@ -1,12 +1,17 @@
 import asyncio
+import contextlib
+import functools
+import time
+from collections import abc
 from concurrent.futures import Future
 from dataclasses import dataclass
+from typing import Any
 
 from ha_mqtt_discoverable import DeviceInfo, Settings as MQTTSettings
 from ha_mqtt_discoverable.sensors import (
     BinarySensor,
     BinarySensorInfo,
-    Cover,
+    Cover as DiscoverableCover,
     CoverInfo,
     Number,
     NumberInfo,
@@ -17,14 +22,23 @@ from ha_mqtt_discoverable.sensors import (
 )
 from paho.mqtt.client import Client, MQTTMessage
 
+from ryobi_gdo_2_mqtt.cache import DeviceSnapshot
+from ryobi_gdo_2_mqtt.command_scheduler import CommandScheduler, CommandStats
 from ryobi_gdo_2_mqtt.constants import (
     BATTERY_LOW_THRESHOLD,
     DoorCommandPayloads,
     DoorCommands,
+    EntityKind,
     LightCommandPayloads,
     LightStates,
 )
+from ryobi_gdo_2_mqtt.door_motion import DEFAULT_MOTION_INTERVAL, DoorMotionCoalescer, MotionStats
 from ryobi_gdo_2_mqtt.logging import log
+from ryobi_gdo_2_mqtt.metrics import StartupMetrics
+from ryobi_gdo_2_mqtt.models import DeviceUpdate
+from ryobi_gdo_2_mqtt.mqtt_client import SharedMQTTClient
+from ryobi_gdo_2_mqtt.outbox import StateOutbox
+from ryobi_gdo_2_mqtt.publisher import MQTTPublisher
 
 
 @dataclass
@@ -36,6 +50,14 @@ class ModuleConfig:
     attribute_name: str
 
 
+@dataclass
+class PublishStats:
+    """Counters for MQTT state publishes."""
+
+    sent: int = 0
+    suppressed: int = 0
+
+
 # Module configurations
 MODULES = {
     "garageDoor": ModuleConfig(
@@ -80,120 +102,303 @@ MODULES = {
     ),
 }
 
+# Payloads accepted by switches: command value sent and state published
+SWITCH_COMMANDS: dict[str, tuple[int, bool]] = {
+    LightCommandPayloads.ON: (LightStates.ON, True),
+    LightCommandPayloads.OFF: (LightStates.OFF, False),
+}
 
-class EntityFactory:
-    """Factory for creating MQTT entities."""
+# Payloads accepted by the door cover: command value sent and state published
+COVER_COMMANDS: dict[str, tuple[int, str]] = {
+    DoorCommandPayloads.OPEN: (DoorCommands.OPEN, "opening"),
+    DoorCommandPayloads.CLOSE: (DoorCommands.CLOSE, "closing"),
+    DoorCommandPayloads.STOP: (DoorCommands.STOP, "stopped"),
+}
 
-    @staticmethod
-    def create_cover(
-        device_id: str, device_name: str, device_info: DeviceInfo, mqtt_settings: MQTTSettings.MQTT, callback
-    ) -> Cover:
-        """Create a cover entity for garage door."""
-        info = CoverInfo(
-            name=f"{device_name} Door",
-            unique_id=f"{device_id}_door",
-            device=device_info,
-        )
-        settings = MQTTSettings(mqtt=mqtt_settings, entity=info)
-        return Cover(settings, callback)
+# Cover states, each published by the cover method of the same name
+COVER_STATES = frozenset({"open", "closed", "opening", "closing", "stopped"})
 
-    @staticmethod
-    def create_switch(
-        device_id: str,
-        device_name: str,
-        device_info: DeviceInfo,
-        mqtt_settings: MQTTSettings.MQTT,
-        callback,
-        entity_type: str,
-    ) -> Switch:
-        """Create a switch entity."""
-        names = {
-            "light": "Light",
-            "vacation": "Vacation Mode",
-            "park_assist": "Park Assist",
-            "inflator": "Inflator",
-            "bt_speaker": "Bluetooth Speaker",
-        }
-        info = SwitchInfo(
-            name=f"{device_name} {names[entity_type]}",
-            unique_id=f"{device_id}_{entity_type}",
-            device=device_info,
-        )
-        settings = MQTTSettings(mqtt=mqtt_settings, entity=info)
-        return Switch(settings, callback)
+# Publish cache key of the door position, published on the cover's position topic
+POSITION_KEY = "cover_position"
 
-    @staticmethod
-    def create_binary_sensor(
-        device_id: str, device_name: str, device_info: DeviceInfo, mqtt_settings: MQTTSettings.MQTT, sensor_type: str
-    ) -> BinarySensor:
-        """Create a binary sensor entity."""
-        names = {
-            "battery": "Battery",
-            "motion": "Motion",
-        }
-        device_classes = {
-            "battery": "battery",
-            "motion": "motion",
-        }
-        info = BinarySensorInfo(
-            name=f"{device_name} {names[sensor_type]}",
-            unique_id=f"{device_id}_{sensor_type}",
-            device_class=device_classes[sensor_type],
-            device=device_info,
-        )
-        settings = MQTTSettings(mqtt=mqtt_settings, entity=info)
-        return BinarySensor(settings)
+# Least seconds between two resyncs of a device, a resync requested sooner is deferred
+DEFAULT_RESYNC_COOLDOWN = 30
+
+# Turns an entity and a state into the state remembered as published, the entity
+# method publishing it and the method's arguments; None for a state the entity can't take
+type StatePublisher = abc.Callable[[Any, Any], tuple[Any, abc.Callable[..., Any], tuple[Any, ...]] | None]
+
+# Turns a Home Assistant command payload into the value sent to the module and
+# the state published right away; None for a payload the entity doesn't accept
+type CommandParser = abc.Callable[[str], tuple[int, Any] | None]
+
+
+class Cover(DiscoverableCover):
+    """Cover that also publishes the door position, 0 closed to 100 open."""
+
+    def __init__(self, settings: MQTTSettings[CoverInfo], command_callback):
+        """Initialize the cover and its position topic."""
+        super().__init__(settings, command_callback)
+        self.position_topic = f"{self._settings.mqtt.state_prefix}/{self._entity_topic}/position"
+
+    def generate_config(self) -> dict[str, Any]:
+        """Add the position topic to the discovery config."""
+        return super().generate_config() | {"position_topic": self.position_topic}
+
+    def set_position(self, position: int) -> None:
+        """Publish the door position, 0 closed to 100 open.
+
+        Args:
+            position: Percent open
+        """
+        self._state_helper(state=position, topic=self.position_topic, retain=self._entity.retain)
+
+
+def _battery_low(level: int) -> bool:
+    """Return whether a battery level should raise the low battery sensor."""
+    return level < BATTERY_LOW_THRESHOLD
+
+
+def _publish_cover_state(cover: Cover, state: str):
+    """Publish a door state through the cover method of the same name."""
+    if state not in COVER_STATES:
+        return None
+    return state, getattr(cover, state), ()
+
+
+def _publish_on_off(entity, state: Any):
+    """Publish a state as on or off."""
+    state = bool(state)
+    return state, entity.on if state else entity.off, ()
+
+
+def _publish_sensor_state(sensor: Sensor, state: Any):
+    """Publish a sensor reading."""
+    return state, sensor.set_state, (state,)
+
+
+def _publish_number_value(number: Number, value: Any):
+    """Publish a number's value."""
+    return value, number.set_value, (value,)
+
+
+def _number_command(payload: str) -> tuple[int, int] | None:
+    """Parse a number command, sending and publishing the value itself."""
+    try:
+        value = int(payload)
+    except ValueError:
+        return None
+    return value, value
 
-    @staticmethod
-    def create_sensor(
-        device_id: str,
-        device_name: str,
-        device_info: DeviceInfo,
-        mqtt_settings: MQTTSettings.MQTT,
-        sensor_type: str,
-        device_class: str | None = None,
-        unit: str | None = None,
-    ) -> Sensor:
-        """Create a sensor entity."""
-        names = {
-            "wifi": "WiFi Signal",
-        }
-        info = SensorInfo(
-            name=f"{device_name} {names[sensor_type]}",
-            unique_id=f"{device_id}_{sensor_type}",
-            device_class=device_class,
-            unit_of_measurement=unit,
-            device=device_info,
-        )
-        settings = MQTTSettings(mqtt=mqtt_settings, entity=info)
-        return Sensor(settings)
+
+@dataclass(frozen=True)
+class EntityDescriptor:
+    """How a device entity maps between device updates, MQTT and module commands."""
+
+    name: str
+    kind: EntityKind
+    module: str
+    entity_type: str
+    display_name: str
+    entity_class: type
+    info_class: type
+    publish: StatePublisher
+    update_field: str | None = None
+    transform: abc.Callable[[Any], Any] | None = None
+    # Entities with a command parser subscribe to commands from Home Assistant
+    command: CommandParser | None = None
+    command_attribute: str | None = None
+    initial_state: Any = None
+    # Extra fields of the entity info, e.g. device_class
+    info: dict[str, Any] | None = None
+    # Order states held during an MQTT outage are published in, lower goes first
+    outbox_priority: int = 1
+
+
+# Every entity a device can have. ``name`` is the RyobiDevice attribute holding it,
+# ``entity_type`` is the suffix of its unique ID, and commands go to ``module``
+# with ``command_attribute`` or the module's default attribute.
+ENTITIES: tuple[EntityDescriptor, ...] = (
+    EntityDescriptor(
+        "cover",
+        EntityKind.COVER,
+        "garageDoor",
+        "door",
+        "Door",
+        Cover,
+        CoverInfo,
+        _publish_cover_state,
+        "door_state",
+        command=COVER_COMMANDS.get,
+        initial_state="closed",
+        outbox_priority=0,
+    ),
+    EntityDescriptor(
+        "motion_sensor",
+        EntityKind.BINARY_SENSOR,
+        "garageDoor",
+        "motion",
+        "Motion",
+        BinarySensor,
+        BinarySensorInfo,
+        _publish_on_off,
+        "motion",
+        info={"device_class": "motion"},
+    ),
+    EntityDescriptor(
+        "vacation_switch",
+        EntityKind.SWITCH,
+        "garageDoor",
+        "vacation",
+        "Vacation Mode",
+        Switch,
+        SwitchInfo,
+        _publish_on_off,
+        "vacation_mode",
+        command=SWITCH_COMMANDS.get,
+        command_attribute="vacationMode",
+        initial_state=False,
+    ),
+    EntityDescriptor(
+        "light",
+        EntityKind.SWITCH,
+        "garageLight",
+        "light",
+        "Light",
+        Switch,
+        SwitchInfo,
+        _publish_on_off,
+        "light_state",
+        command=SWITCH_COMMANDS.get,
+        initial_state=False,
+    ),
+    EntityDescriptor(
+        "battery_sensor",
+        EntityKind.BINARY_SENSOR,
+        "backupCharger",
+        "battery",
+        "Battery",
+        BinarySensor,
+        BinarySensorInfo,
+        _publish_on_off,
+        "battery_level",
+        _battery_low,
+        info={"device_class": "battery"},
+    ),
+    EntityDescriptor(
+        "wifi_sensor",
+        EntityKind.SENSOR,
+        "wifiModule",
+        "wifi",
+        "WiFi Signal",
+        Sensor,
+        SensorInfo,
+        _publish_sensor_state,
+        "wifi_rssi",
+        info={"device_class": "signal_strength", "unit_of_measurement": "dBm"},
+        outbox_priority=2,
+    ),
+    EntityDescriptor(
+        "park_assist_switch",
+        EntityKind.SWITCH,
+        "parkAssistLaser",
+        "park_assist",
+        "Park Assist",
+        Switch,
+        SwitchInfo,
+        _publish_on_off,
+        "park_assist",
+        command=SWITCH_COMMANDS.get,
+    ),
+    EntityDescriptor(
+        "inflator_switch",
+        EntityKind.SWITCH,
+        "inflator",
+        "inflator",
+        "Inflator",
+        Switch,
+        SwitchInfo,
+        _publish_on_off,
+        "inflator",
+        command=SWITCH_COMMANDS.get,
+    ),
+    EntityDescriptor(
+        "bt_speaker_switch",
+        EntityKind.SWITCH,
+        "btSpeaker",
+        "bt_speaker",
+        "Bluetooth Speaker",
+        Switch,
+        SwitchInfo,
+        _publish_on_off,
+        "bt_speaker",
+        command=SWITCH_COMMANDS.get,
+    ),
+    EntityDescriptor(
+        "fan_number",
+        EntityKind.NUMBER,
+        "fan",
+        "fan",
+        "Fan Speed",
+        Number,
+        NumberInfo,
+        _publish_number_value,
+        "fan",
+        command=_number_command,
+        info={"min": 0, "max": 100, "step": 1},
+    ),
+)
+
+ENTITIES_BY_NAME = {descriptor.name: descriptor for descriptor in ENTITIES}
+ENTITIES_BY_FIELD = {descriptor.update_field: descriptor for descriptor in ENTITIES if descriptor.update_field}
+# Fields handled by an entity, including the door position published by the cover
+FIELD_ENTITIES = ENTITIES_BY_FIELD | dict.fromkeys(("door_position", "door_position_max"), ENTITIES_BY_NAME["cover"])
+MODULE_ENTITIES: dict[str, tuple[EntityDescriptor, ...]] = {
+    module: tuple(descriptor for descriptor in ENTITIES if descriptor.module == module)
+    for module in dict.fromkeys(descriptor.module for descriptor in ENTITIES)
+}
+
+
+class EntityFactory:
+    """Factory for creating MQTT entities."""
 
     @staticmethod
-    def create_number(
+    def create(
+        descriptor: EntityDescriptor,
         device_id: str,
         device_name: str,
         device_info: DeviceInfo,
         mqtt_settings: MQTTSettings.MQTT,
-        callback,
-        entity_type: str,
-        min_value: int = 0,
-        max_value: int = 100,
-        step: int = 1,
-    ) -> Number:
-        """Create a number entity."""
-        names = {
-            "fan": "Fan Speed",
-        }
-        info = NumberInfo(
-            name=f"{device_name} {names[entity_type]}",
-            unique_id=f"{device_id}_{entity_type}",
-            min=min_value,
-            max=max_value,
-            step=step,
+        callback=None,
+        entity_classes: abc.Mapping[type, type] | None = None,
+    ):
+        """Create the MQTT entity described by a descriptor.
+
+        Args:
+            descriptor: The entity's descriptor
+            device_id: Ryobi device ID, prefix of the unique ID
+            device_name: Human-readable device name, prefix of the entity name
+            device_info: Home Assistant device the entity belongs to
+            mqtt_settings: MQTT connection settings
+            callback: Command callback, for entities with a command parser
+            entity_classes: Classes to build entities from instead of the descriptor's, keyed by the latter
+
+        Returns:
+            The entity, an instance of the descriptor's entity class or its replacement
+        """
+        info = descriptor.info_class(
+            name=f"{device_name} {descriptor.display_name}",
+            unique_id=f"{device_id}_{descriptor.entity_type}",
             device=device_info,
+            **(descriptor.info or {}),
         )
         settings = MQTTSettings(mqtt=mqtt_settings, entity=info)
-        return Number(settings, callback)
+        entity_class = descriptor.entity_class
+        if entity_classes is not None:
+            entity_class = entity_classes.get(entity_class, entity_class)
+        if descriptor.command is None:
+            return entity_class(settings)
+        return entity_class(settings, callback)
 
 
 class CommandHandler:
@@ -229,12 +434,37 @@ class CommandHandler:
         # Use provided attribute or default from config
         attr = attribute if attribute is not None else module_config.attribute_name
 
-        future = asyncio.run_coroutine_threadsafe(
-            self.device.websocket.send_message(port_id, module_config.module_type, attr, value), self.device.loop
+        scheduler = self.device.command_scheduler
+        if scheduler is not None:
+            args = (port_id, module_config.module_type, attr, value)
+            if self._on_device_loop():
+                scheduler.submit(*args)
+            else:
+                self.device.loop.call_soon_threadsafe(scheduler.submit, *args)
+            return
+
+        coro = self.device.websocket.send_message(
+            port_id, module_config.module_type, attr, value, device_id=self.device.device_id
         )
+
+        # With the in-loop MQTT transport the command arrives on the event loop itself
+        if self._on_device_loop():
+            task = self.device.loop.create_task(coro)
+            self.device._pending_tasks.add(task)
+            task.add_done_callback(self.device._pending_tasks.discard)
+            return
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.device.loop)
         self.device._pending_futures.add(future)
         future.add_done_callback(self.device._pending_futures.discard)
 
+    def _on_device_loop(self) -> bool:
+        """Return whether this runs on the device's event loop rather than an MQTT network thread."""
+        try:
+            return asyncio.get_running_loop() is self.device.loop
+        except RuntimeError:
+            return False
+
 
 class RyobiDevice:
     """Represents a Ryobi garage door opener with MQTT entities."""
@@ -247,6 +477,14 @@ class RyobiDevice:
         websocket,
         api_client,
         loop: asyncio.AbstractEventLoop,
+        republish_after: float = 0,
+        modules: abc.Iterable[str] | None = None,
+        publisher: MQTTPublisher | None = None,
+        outbox: StateOutbox | None = None,
+        motion_interval: float = DEFAULT_MOTION_INTERVAL,
+        command_spacing: float | None = None,
+        metrics: StartupMetrics | None = None,
+        entity_classes: abc.Mapping[type, type] | None = None,
     ):
         """Initialize a Ryobi device with MQTT entities.
 
@@ -257,12 +495,30 @@ class RyobiDevice:
             websocket: WebSocket connection for sending commands
             api_client: API client for getting module information
             loop: Event loop for scheduling coroutines
+            republish_after: Republish an unchanged state on its next update if it was last published
+                at least this many seconds ago, 0 to never. Nothing is republished without an update.
+            modules: Modules the device has, None for every known module
+            publisher: Thread to hand state publishes to, None to publish on the calling thread
+            outbox: Where to hold states while the MQTT client is disconnected, None to publish regardless
+            motion_interval: Least seconds between door publishes while the door moves, 0 for every update
+            command_spacing: Least seconds between commands sent through a scheduler, None to send each at once
+            metrics: Startup timings to record the device's first published state in
+            entity_classes: Classes to build entities from instead of the descriptors', keyed by the latter
         """
         self.device_id = device_id
         self.device_name = device_name
         self.websocket = websocket
         self.api_client = api_client
         self.loop = loop
+        self.republish_after = republish_after
+        self.mqtt_client = mqtt_settings.client
+        self.publisher = publisher
+        self.outbox = outbox
+        self.metrics = metrics
+        # Door position when fully open, positions are published as a percentage of it
+        self.door_position_max: int | None = None
+        self.publish_stats = PublishStats()
+        self._published: dict[str, tuple[Any, float]] = {}
         self._pending_tasks: set[asyncio.Task] = set()
         self._pending_futures: set[Future] = set()
 
@@ -276,262 +532,242 @@ class RyobiDevice:
 
         # Create command handler
         self.command_handler = CommandHandler(self)
-
-        # Create entities using factory
-        self.cover = EntityFactory.create_cover(
-            device_id, device_name, self.device_info, mqtt_settings, self._handle_door_command
-        )
-        self.light = EntityFactory.create_switch(
-            device_id, device_name, self.device_info, mqtt_settings, self._handle_light_command, "light"
-        )
-        self.battery_sensor = EntityFactory.create_binary_sensor(
-            device_id, device_name, self.device_info, mqtt_settings, "battery"
-        )
-        self.motion_sensor = EntityFactory.create_binary_sensor(
-            device_id, device_name, self.device_info, mqtt_settings, "motion"
-        )
-        self.wifi_sensor = EntityFactory.create_sensor(
-            device_id, device_name, self.device_info, mqtt_settings, "wifi", "signal_strength", "dBm"
-        )
-        self.vacation_switch = EntityFactory.create_switch(
-            device_id, device_name, self.device_info, mqtt_settings, self._handle_vacation_command, "vacation"
-        )
-        self.park_assist_switch = EntityFactory.create_switch(
-            device_id, device_name, self.device_info, mqtt_settings, self._handle_park_assist_command, "park_assist"
-        )
-        self.inflator_switch = EntityFactory.create_switch(
-            device_id, device_name, self.device_info, mqtt_settings, self._handle_inflator_command, "inflator"
-        )
-        self.bt_speaker_switch = EntityFactory.create_switch(
-            device_id, device_name, self.device_info, mqtt_settings, self._handle_bt_speaker_command, "bt_speaker"
-        )
-        self.fan_number = EntityFactory.create_number(
-            device_id, device_name, self.device_info, mqtt_settings, self._handle_fan_command, "fan"
+        self.command_scheduler = None
+        if command_spacing is not None:
+            self.command_scheduler = CommandScheduler(
+                functools.partial(websocket.send_message, device_id=device_id), command_spacing
+            )
+
+        # Door state and position updates pass through here, to be coalesced while the door moves
+        self.door_motion = DoorMotionCoalescer(
+            loop,
+            functools.partial(self.publish_state, ENTITIES_BY_NAME["cover"]),
+            self.publish_position,
+            motion_interval,
         )
 
-        # Initialize states
-        self.cover.closed()  # Makes it discoverable
-        self.light.off()
-        self.vacation_switch.off()
+        # Entities are only created for the device's modules
+        for descriptor in ENTITIES:
+            setattr(self, descriptor.name, None)
+        self._mqtt_settings = mqtt_settings
+        self._entity_classes = entity_classes
+        self._connect_callbacks: list[abc.Callable] = []
+        self.modules: set[str] = set()
+        for module in MODULE_ENTITIES if modules is None else modules:
+            self.add_module(module)
 
-    def _handle_door_command(self, client: Client, user_data, message: MQTTMessage):
-        """Handle door commands from Home Assistant."""
-        payload = message.payload.decode()
-        log.info("Received door command for %s: %s", self.device_id, payload)
-
-        if payload == DoorCommandPayloads.OPEN:
-            self.cover.opening()
-            self.command_handler.send_command("garageDoor", DoorCommands.OPEN)
-        elif payload == DoorCommandPayloads.CLOSE:
-            self.cover.closing()
-            self.command_handler.send_command("garageDoor", DoorCommands.CLOSE)
-        elif payload == DoorCommandPayloads.STOP:
-            self.command_handler.send_command("garageDoor", DoorCommands.STOP)
-            self.cover.stopped()
-
-    def _handle_light_command(self, client: Client, user_data, message: MQTTMessage):
-        """Handle light commands from Home Assistant."""
-        payload = message.payload.decode()
-        log.info("Received light command for %s: %s", self.device_id, payload)
-
-        if payload == LightCommandPayloads.ON:
-            self.command_handler.send_command("garageLight", LightStates.ON)
-            self.light.on()
-        elif payload == LightCommandPayloads.OFF:
-            self.command_handler.send_command("garageLight", LightStates.OFF)
-            self.light.off()
+    def add_module(self, module: str) -> bool:
+        """Create the entities of a module and publish their initial states.
 
-    def _handle_vacation_command(self, client: Client, user_data, message: MQTTMessage):
-        """Handle vacation mode commands from Home Assistant."""
-        payload = message.payload.decode()
-        log.info("Received vacation mode command for %s: %s", self.device_id, payload)
-
-        value = 1 if payload == "ON" else 0
-        self.command_handler.send_command("garageDoor", value, "vacationMode")
+        Args:
+            module: Module name (e.g., "garageDoor", "fan")
 
-        if value:
-            self.vacation_switch.on()
+        Returns:
+            True if entities were created, False if the module is unknown or already added
+        """
+        if module in self.modules or module not in MODULE_ENTITIES:
+            return False
+
+        for descriptor in MODULE_ENTITIES[module]:
+            setattr(self, descriptor.name, self._create_entity(descriptor))
+        self.modules.add(module)
+
+        for descriptor in MODULE_ENTITIES[module]:
+            if descriptor.initial_state is not None:
+                self.publish_state(descriptor, descriptor.initial_state)
+        return True
+
+    def _create_entity(self, descriptor: EntityDescriptor):
+        """Create the MQTT entity described by a descriptor."""
+        callback = functools.partial(self._handle_command, descriptor.name)
+        # Remember the entity's connect callbacks, the shared client would keep them forever
+        if isinstance(self.mqtt_client, SharedMQTTClient):
+            collecting = self.mqtt_client.collect_connect_callbacks()
         else:
-            self.vacation_switch.off()
-
-    def _handle_park_assist_command(self, client: Client, user_data, message: MQTTMessage):
-        """Handle park assist commands from Home Assistant."""
-        payload = message.payload.decode()
-        log.info("Received park assist command for %s: %s", self.device_id, payload)
+            collecting = contextlib.nullcontext([])
+        with collecting as connect_callbacks:
+            entity = EntityFactory.create(
+                descriptor,
+                self.device_id,
+                self.device_name,
+                self.device_info,
+                self._mqtt_settings,
+                callback,
+                self._entity_classes,
+            )
+        self._connect_callbacks.extend(connect_callbacks)
+        return entity
+
+    def _publish(self, entity: str, state: Any, publish: abc.Callable[..., Any], *args: Any) -> bool:
+        """Publish an entity state unless it is the state last published.
 
-        value = 1 if payload == "ON" else 0
-        self.command_handler.send_command("parkAssistLaser", value)
+        Args:
+            entity: Name of the entity attribute, used as cache key
+            state: The state being published, compared with the last one
+            publish: Entity method doing the publish
+            *args: Arguments for the publish method
 
-        if value:
-            self.park_assist_switch.on()
+        Returns:
+            True if the state was published, or queued on the publisher thread or in the outbox
+        """
+        now = time.monotonic()
+        last = self._published.get(entity)
+        if last is not None and last[0] == state:
+            if not self.republish_after or now - last[1] < self.republish_after:
+                self.publish_stats.suppressed += 1
+                return False
+
+        self.publish_stats.sent += 1
+        if entity == POSITION_KEY:
+            target, topic, priority = self.cover, self.cover.position_topic, ENTITIES_BY_NAME["cover"].outbox_priority
         else:
-            self.park_assist_switch.off()
-
-    def _handle_inflator_command(self, client: Client, user_data, message: MQTTMessage):
-        """Handle inflator commands from Home Assistant."""
-        payload = message.payload.decode()
-        log.info("Received inflator command for %s: %s", self.device_id, payload)
-
-        value = 1 if payload == "ON" else 0
-        self.command_handler.send_command("inflator", value)
-
-        if value:
-            self.inflator_switch.on()
+            target = getattr(self, entity)
+            topic, priority = target.state_topic, ENTITIES_BY_NAME[entity].outbox_priority
+
+        if self.outbox is not None and not self.mqtt_client.is_connected():
+            # The first state only counts once the outbox is flushed
+            if self.metrics is not None:
+                publish = functools.partial(self._publish_first, publish)
+            self.outbox.put(topic, priority, publish, *args)
+            # The connection may have come back, and the outbox been flushed, since the check
+            if self.mqtt_client.is_connected():
+                self.outbox.flush()
+            self._published[entity] = (state, now)
+            return True
+
+        # paho drops QoS 0 publishes made while disconnected, so only a state
+        # that can reach the broker suppresses the next identical one
+        connected = target.mqtt_client.is_connected()
+        if connected and self.metrics is not None:
+            publish = functools.partial(self._publish_first, publish)
+        if self.publisher is not None:
+            self.publisher.submit(publish, *args)
         else:
-            self.inflator_switch.off()
-
-    def _handle_bt_speaker_command(self, client: Client, user_data, message: MQTTMessage):
-        """Handle bluetooth speaker commands from Home Assistant."""
-        payload = message.payload.decode()
-        log.info("Received bluetooth speaker command for %s: %s", self.device_id, payload)
-
-        value = 1 if payload == "ON" else 0
-        self.command_handler.send_command("btSpeaker", value)
-
-        if value:
-            self.bt_speaker_switch.on()
+            publish(*args)
+        if connected:
+            self._published[entity] = (state, now)
         else:
-            self.bt_speaker_switch.off()
+            self._published.pop(entity, None)
+        return True
 
-    def _handle_fan_command(self, client: Client, user_data, message: MQTTMessage):
-        """Handle fan speed commands from Home Assistant."""
-        speed = int(message.payload.decode())
-        log.info("Received fan speed command for %s: %s", self.device_id, speed)
+    def _publish_first(self, publish: abc.Callable[..., Any], *args: Any) -> None:
+        """Make a publish, then record it as the device's first state if it is."""
+        publish(*args)
+        self.metrics.mark_first_state(self.device_id)
 
-        self.command_handler.send_command("fan", speed)
-        self.fan_number.set_value(speed)
+    def forget_published(self) -> None:
+        """Forget the states last published, so the next update of every entity is published.
 
-    def update_door_state(self, state: str):
-        """Update door state from WebSocket data.
-
-        Args:
-            state: Door state (e.g., "open", "closed", "opening", "closing")
+        Called when the MQTT connection is re-established, as a restarted
+        broker may have lost the retained states.
         """
-        log.debug("Updating door state for %s: %s", self.device_id, state)
-
-        if state == "open":
-            self.cover.open()
-        elif state == "closed":
-            self.cover.closed()
-        elif state == "opening":
-            self.cover.opening()
-        elif state == "closing":
-            self.cover.closing()
-        elif state == "stopped":
-            self.cover.stopped()
-
-    def update_light_state(self, state: bool):
-        """Update light state from WebSocket data.
+        self._published.clear()
 
-        Args:
-            state: Light state (True=on, False=off)
-        """
-        log.debug("Updating light state for %s: %s", self.device_id, state)
-
-        if state:
-            self.light.on()
-        else:
-            self.light.off()
-
-    def update_battery_level(self, level: int):
-        """Update battery level from WebSocket data.
+    def publish_state(self, descriptor: EntityDescriptor, state: Any) -> bool:
+        """Publish a state through the descriptor's state publisher.
 
         Args:
-            level: Battery level percentage
-        """
-        log.debug("Updating battery level for %s: %s", self.device_id, level)
-
-        if level < BATTERY_LOW_THRESHOLD:
-            self.battery_sensor.on()  # Battery low
-        else:
-            self.battery_sensor.off()  # Battery OK
+            descriptor: The entity's descriptor
+            state: Entity state, already transformed
 
-    def update_motion_state(self, state: int):
-        """Update motion sensor state from WebSocket data.
-
-        Args:
-            state: Motion state (1=motion detected, 0=no motion)
+        Returns:
+            True if the state was published
         """
-        log.debug("Updating motion state for %s: %s", self.device_id, state)
+        entity = getattr(self, descriptor.name)
+        if entity is None:
+            return False
 
-        if state:
-            self.motion_sensor.on()
-        else:
-            self.motion_sensor.off()
+        publish = descriptor.publish(entity, state)
+        if publish is None:
+            return False
+        state, method, args = publish
+        return self._publish(descriptor.name, state, method, *args)
 
-    def update_wifi_rssi(self, rssi: int):
-        """Update WiFi signal strength from WebSocket data.
+    def publish_position(self, position: int) -> bool:
+        """Publish the door position on the cover's position topic, as percent open.
 
         Args:
-            rssi: WiFi signal strength in dBm
-        """
-        log.debug("Updating WiFi RSSI for %s: %s", self.device_id, rssi)
-        self.wifi_sensor.set_state(rssi)
-
-    def update_vacation_mode(self, state: int):
-        """Update vacation mode state from WebSocket data.
+            position: Door position as reported, 0 closed to ``door_position_max`` fully open
 
-        Args:
-            state: Vacation mode state (1=enabled, 0=disabled)
+        Returns:
+            True if the position was published, never while the fully open position is unknown
         """
-        log.debug("Updating vacation mode for %s: %s", self.device_id, state)
+        if self.cover is None or not self.door_position_max:
+            return False
+        percent = max(0, min(100, round(position * 100 / self.door_position_max)))
+        return self._publish(POSITION_KEY, percent, self.cover.set_position, percent)
 
-        if state:
-            self.vacation_switch.on()
-        else:
-            self.vacation_switch.off()
+    def update(self, field: str, value: Any) -> bool:
+        """Publish a device update field to the entity it belongs to.
 
-    def update_park_assist(self, state: int):
-        """Update park assist state from WebSocket data.
+        Door state and position go through the motion coalescer.
 
         Args:
-            state: Park assist state (1=enabled, 0=disabled)
-        """
-        log.debug("Updating park assist for %s: %s", self.device_id, state)
-
-        if state:
-            self.park_assist_switch.on()
-        else:
-            self.park_assist_switch.off()
-
-    def update_inflator(self, state: int):
-        """Update inflator state from WebSocket data.
+            field: DeviceUpdate field (e.g., "door_state", "fan")
+            value: Field value from the Ryobi API
 
-        Args:
-            state: Inflator state (1=enabled, 0=disabled)
+        Returns:
+            True if the state was published
         """
-        log.debug("Updating inflator for %s: %s", self.device_id, state)
-
-        if state:
-            self.inflator_switch.on()
-        else:
-            self.inflator_switch.off()
-
-    def update_bt_speaker(self, state: int):
-        """Update bluetooth speaker state from WebSocket data.
+        if field == "door_position_max":
+            self.door_position_max = value
+            return False
+        if field in ("door_state", "door_position"):
+            if self.cover is None:
+                return False
+            log.debug("Updating %s for %s: %s", field, self.device_id, value)
+            if field == "door_state":
+                return self.door_motion.update_state(value)
+            return self.door_motion.update_position(value)
+
+        descriptor = ENTITIES_BY_FIELD.get(field)
+        if descriptor is None:
+            return False
+        log.debug("Updating %s for %s: %s", field, self.device_id, value)
+        state = value if descriptor.transform is None else descriptor.transform(value)
+        return self.publish_state(descriptor, state)
+
+    def _handle_command(self, name: str, client: Client, user_data, message: MQTTMessage):
+        """Handle a command from Home Assistant for one of the device's entities.
+
+        The command is sent to the entity's module and the expected state is
+        published right away.
 
         Args:
-            state: Bluetooth speaker state (1=enabled, 0=disabled)
+            name: Name of the entity attribute the command is for
+            client: MQTT client the command arrived on
+            user_data: paho user data
+            message: The command message
         """
-        log.debug("Updating bluetooth speaker for %s: %s", self.device_id, state)
-
-        if state:
-            self.bt_speaker_switch.on()
-        else:
-            self.bt_speaker_switch.off()
+        descriptor = ENTITIES_BY_NAME[name]
+        payload = message.payload.decode()
+        log.info("Received %s command for %s: %s", descriptor.entity_type, self.device_id, payload)
 
-    def update_fan_speed(self, speed: int):
-        """Update fan speed from WebSocket data.
+        command = descriptor.command(payload)
+        if command is None:
+            log.warning("Ignoring unknown %s command for %s: %s", descriptor.entity_type, self.device_id, payload)
+            return
 
-        Args:
-            speed: Fan speed (0-100)
-        """
-        log.debug("Updating fan speed for %s: %s", self.device_id, speed)
-        self.fan_number.set_value(speed)
+        value, state = command
+        self.command_handler.send_command(descriptor.module, value, descriptor.command_attribute)
+        self.publish_state(descriptor, state)
 
     async def cleanup(self):
         """Clean up device resources."""
         log.debug("Cleaning up device: %s", self.device_id)
+        self.door_motion.cancel()
+        if self.command_scheduler is not None:
+            await self.command_scheduler.close()
+        # A shared client outlives the device, so stop routing its commands
+        if isinstance(self.mqtt_client, SharedMQTTClient):
+            for descriptor in ENTITIES:
+                entity = getattr(self, descriptor.name)
+                if entity is not None and descriptor.command is not None:
+                    self.mqtt_client.retire(entity._command_topic)
+            for connect_callback in self._connect_callbacks:
+                self.mqtt_client.remove_connect_callback(connect_callback)
+            self._connect_callbacks.clear()
+
         # Cancel all pending tasks
         for task in self._pending_tasks:
             if not task.done():
@@ -550,17 +786,118 @@ class RyobiDevice:
 class DeviceManager:
     """Manages multiple Ryobi devices and their MQTT entities."""
 
-    def __init__(self, mqtt_settings: MQTTSettings.MQTT, api_client):
+    def __init__(
+        self,
+        mqtt_settings: MQTTSettings.MQTT,
+        api_client,
+        republish_after: float = 0,
+        shared_connection: bool = False,
+        in_loop_transport: bool = False,
+        publisher_thread: bool = False,
+        outbox: bool = False,
+        motion_interval: float = DEFAULT_MOTION_INTERVAL,
+        command_spacing: float | None = None,
+        resync_cooldown: float = DEFAULT_RESYNC_COOLDOWN,
+        entity_classes: abc.Mapping[type, type] | None = None,
+    ):
         """Initialize the device manager.
 
         Args:
             mqtt_settings: MQTT connection settings
             api_client: API client for getting module information
+            republish_after: Republish an unchanged entity state on its next update if it was last
+                published at least this many seconds ago, 0 to never
+            shared_connection: Publish and subscribe for all entities through one MQTT client
+            in_loop_transport: Drive the shared MQTT client from the event loop, implies shared_connection
+            publisher_thread: Publish entity states from a dedicated thread instead of the event loop
+            outbox: Hold the latest entity states while the broker is unreachable, implies shared_connection
+            motion_interval: Least seconds between door publishes while a door moves, 0 for every update
+            command_spacing: Least seconds between commands to a device, None to send commands without scheduling
+            resync_cooldown: Least seconds between two resyncs of a device
+            entity_classes: Classes to build entities from instead of the descriptors', keyed by the latter
         """
         self.devices: dict[str, RyobiDevice] = {}
         self.mqtt_settings = mqtt_settings
         self.api_client = api_client
+        self.republish_after = republish_after
+        self.motion_interval = motion_interval
+        self.command_spacing = command_spacing
+        self.resync_cooldown = resync_cooldown
+        self.entity_classes = entity_classes
+        self.shared_connection = shared_connection or in_loop_transport or outbox
+        self.in_loop_transport = in_loop_transport
+        self.mqtt_client: SharedMQTTClient | None = None
+        self.publisher = MQTTPublisher() if publisher_thread else None
+        self.outbox = StateOutbox() if outbox else None
         self.parser = None
+        self.metrics: StartupMetrics | None = None
+        # Last known value of every field, per device
+        self.states: dict[str, dict[str, Any]] = {}
+        self._cached_states: dict[str, dict[str, Any]] = {}
+        self._resync_tasks: dict[str, asyncio.Task] = {}
+        self._resynced_at: dict[str, float] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def connect(self) -> None:
+        """Start the publisher thread and the shared MQTT connection, if enabled, before devices are set up."""
+        if self.publisher is not None:
+            self.publisher.start()
+        if not self.shared_connection or self.mqtt_client is not None:
+            return
+        self.mqtt_client = SharedMQTTClient(self.mqtt_settings, in_loop=self.in_loop_transport)
+        self._loop = asyncio.get_running_loop()
+        self.mqtt_client.on_connect = self._forget_published
+        if self.outbox is not None:
+            self.mqtt_client.on_connect = self._flush_outbox
+        self.mqtt_settings = self.mqtt_settings.model_copy(update={"client": self.mqtt_client})
+        await self.mqtt_client.start()
+
+    async def close(self) -> None:
+        """Send queued publishes and close the shared MQTT connection, if one is open."""
+        if self.publisher is not None:
+            await asyncio.to_thread(self.publisher.stop)
+        if self.mqtt_client is not None:
+            await self.mqtt_client.shutdown()
+
+    def _forget_published(self, client, userdata, flags, reason_code, properties=None) -> None:
+        """Have every device publish its next updates, the broker may have lost their states."""
+        for device in list(self.devices.values()):
+            self._loop.call_soon_threadsafe(device.forget_published)
+
+    def _flush_outbox(self, client, userdata, flags, reason_code, properties=None) -> None:
+        """Publish the states held while the shared MQTT connection was down."""
+        depth = len(self.outbox)
+        if depth:
+            log.info("MQTT connection restored, publishing %d held entity states", depth)
+        self.outbox.flush()
+
+    def restore_snapshot(self, snapshot: DeviceSnapshot) -> None:
+        """Set devices up from a cached snapshot instead of fetching their state.
+
+        The snapshot's states are used once, by ``setup_device``, and should be
+        checked against the cloud afterwards with ``revalidate_device``.
+
+        Args:
+            snapshot: Cached module index and states of the devices
+        """
+        for device_id, modules in snapshot.modules.items():
+            self.api_client.restore_module_index(device_id, modules)
+        self._cached_states = {device_id: dict(state) for device_id, state in snapshot.states.items()}
+
+    def snapshot(self, devices: dict[str, str]) -> DeviceSnapshot:
+        """Return what is known about the devices, for caching.
+
+        Args:
+            devices: Dictionary of device_id -> device_name
+
+        Returns:
+            The devices with their module index and last known states
+        """
+        return DeviceSnapshot(
+            devices=dict(devices),
+            modules={device_id: self.api_client.module_index(device_id) for device_id in devices},
+            states={device_id: dict(self.states.get(device_id, {})) for device_id in devices},
+        )
 
     async def setup_device(self, device_id: str, device_name: str, websocket) -> RyobiDevice:
         """Set up a single device with initial state.
@@ -575,50 +912,208 @@ class DeviceManager:
         """
         log.info("Setting up device: %s (%s)", device_name, device_id)
 
-        # Get initial device state and module information
-        log.info("Fetching initial state for device: %s", device_id)
-        device_data = await self.api_client.update_device(device_id)
-        if not device_data:
-            raise ValueError(f"Failed to get initial state for device: {device_id}")
+        # Get initial device state and module information, from the snapshot if there is one
+        started = time.monotonic()
+        cached_state = self._cached_states.pop(device_id, None)
+        if cached_state is not None:
+            log.info("Using cached state for device: %s", device_id)
+            device_data = self._to_update(cached_state)
+        else:
+            log.info("Fetching initial state for device: %s", device_id)
+            device_data = await self.api_client.update_device(device_id)
+            if not device_data:
+                raise ValueError(f"Failed to get initial state for device: {device_id}")
+            self._seed_parser(device_id)
+        fetched = time.monotonic()
 
         # Get current event loop
         loop = asyncio.get_running_loop()
 
-        # Create MQTT device entities
-        device = RyobiDevice(
+        # Create MQTT device entities off the loop, entities may connect to the broker
+        device = await asyncio.to_thread(
+            RyobiDevice,
             device_id=device_id,
             device_name=device_name,
             mqtt_settings=self.mqtt_settings,
             websocket=websocket,
             api_client=self.api_client,
             loop=loop,
+            republish_after=self.republish_after,
+            modules=self.api_client.device_modules(device_id),
+            publisher=self.publisher,
+            outbox=self.outbox,
+            motion_interval=self.motion_interval,
+            command_spacing=self.command_spacing,
+            metrics=self.metrics,
+            entity_classes=self.entity_classes,
         )
+        created = time.monotonic()
         self.devices[device_id] = device
 
         # Set initial states from device data
-        if device_data.door_state is not None:
-            device.update_door_state(device_data.door_state)
-        if device_data.light_state is not None:
-            device.update_light_state(bool(device_data.light_state))
-        if device_data.battery_level is not None:
-            device.update_battery_level(device_data.battery_level)
-        if device_data.motion is not None:
-            device.update_motion_state(device_data.motion)
-        if device_data.wifi_rssi is not None:
-            device.update_wifi_rssi(device_data.wifi_rssi)
-        if device_data.vacation_mode is not None:
-            device.update_vacation_mode(device_data.vacation_mode)
-        if device_data.park_assist is not None:
-            device.update_park_assist(device_data.park_assist)
-        if device_data.inflator is not None:
-            device.update_inflator(device_data.inflator)
-        if device_data.bt_speaker is not None:
-            device.update_bt_speaker(device_data.bt_speaker)
-        if device_data.fan is not None:
-            device.update_fan_speed(device_data.fan)
+        await self._apply_updates(device, device_data)
+
+        if self.metrics is not None:
+            timings = self.metrics.device(device_id)
+            timings.update_device = fetched - started
+            timings.entity_creation = created - fetched
 
         return device
 
+    async def remove_device(self, device_id: str) -> None:
+        """Remove a device and clean up its resources.
+
+        Args:
+            device_id: The device ID
+        """
+        device = self.devices.pop(device_id, None)
+        if device is None:
+            return
+        log.info("Removing device: %s", device_id)
+        self.states.pop(device_id, None)
+        self._resynced_at.pop(device_id, None)
+        task = self._resync_tasks.pop(device_id, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self.parser is not None:
+            self.parser.forget(device_id)
+        await device.cleanup()
+
+    def publish_stats(self) -> PublishStats:
+        """Return publish counters summed over all devices."""
+        total = PublishStats()
+        for device in self.devices.values():
+            total.sent += device.publish_stats.sent
+            total.suppressed += device.publish_stats.suppressed
+        return total
+
+    def motion_stats(self) -> MotionStats:
+        """Return door motion counters summed over all devices."""
+        total = MotionStats()
+        for device in self.devices.values():
+            total.received += device.door_motion.stats.received
+            total.published += device.door_motion.stats.published
+            total.motions += device.door_motion.stats.motions
+        return total
+
+    def command_stats(self) -> dict[str, CommandStats]:
+        """Return scheduled command counters per command class, summed over all devices."""
+        total: dict[str, CommandStats] = {}
+        for device in self.devices.values():
+            if device.command_scheduler is None:
+                continue
+            for attribute, stats in device.command_scheduler.stats.items():
+                summed = total.setdefault(attribute, CommandStats())
+                summed.queued += stats.queued
+                summed.coalesced += stats.coalesced
+                summed.sent += stats.sent
+                summed.failed += stats.failed
+                summed.total_wait += stats.total_wait
+                summed.max_wait = max(summed.max_wait, stats.max_wait)
+        return total
+
+    def _seed_parser(self, device_id: str) -> None:
+        """Hand the attribute stamps of the device's REST state to the parser."""
+        if self.parser is not None:
+            self.parser.seed(device_id, self.api_client.attribute_stamps(device_id))
+
+    def schedule_resync(self, device_id: str) -> None:
+        """Refetch a device's state in the background, once at a time per device.
+
+        A resync requested within ``resync_cooldown`` of the last one waits for
+        the cooldown to pass. Requests made meanwhile are covered by it.
+
+        Args:
+            device_id: The device ID
+        """
+        task = self._resync_tasks.get(device_id)
+        if task is not None and not task.done():
+            return
+        last = self._resynced_at.get(device_id)
+        delay = 0.0 if last is None else last + self.resync_cooldown - time.monotonic()
+        if delay > 0:
+            log.debug("Deferring resync of device %s by %.1fs", device_id, delay)
+        self._resync_tasks[device_id] = asyncio.create_task(self._resync_after(device_id, delay))
+
+    async def _resync_after(self, device_id: str, delay: float) -> None:
+        """Resync a device once a delay has passed."""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.resync_device(device_id)
+
+    async def resync_device(self, device_id: str) -> None:
+        """Fetch a device's full state over REST and publish it.
+
+        Args:
+            device_id: The device ID
+        """
+        log.info("Resyncing state for device: %s", device_id)
+        self._resynced_at[device_id] = time.monotonic()
+        try:
+            device_data = await self.api_client.update_device(device_id)
+        except Exception as ex:  # pylint: disable=broad-except
+            log.error("Failed to resync device %s: %s", device_id, ex)
+            return
+
+        device = self.devices.get(device_id)
+        if not device_data or device is None:
+            return
+        self._seed_parser(device_id)
+        await self._apply_updates(device, device_data)
+
+    async def revalidate_device(self, device_id: str) -> bool:
+        """Check a device set up from the snapshot against its state in the cloud.
+
+        Only fields that differ from the last known state are applied, except
+        those a WebSocket notification set after the cloud state was taken.
+
+        Args:
+            device_id: The device ID
+
+        Returns:
+            True if the device state was fetched
+        """
+        try:
+            device_data = await self.api_client.update_device(device_id)
+        except Exception as ex:  # pylint: disable=broad-except
+            log.error("Failed to revalidate device %s: %s", device_id, ex)
+            return False
+
+        device = self.devices.get(device_id)
+        if not device_data or device is None:
+            return False
+
+        # The fetch may have raced notifications, which must not be rolled back
+        newer = set()
+        if self.parser is not None:
+            newer = self.parser.newer_fields(device_id, self.api_client.attribute_stamps(device_id))
+        self._seed_parser(device_id)
+
+        known = self.states.get(device_id, {})
+        changed = DeviceUpdate()
+        for field in device_data:
+            if field in newer:
+                continue
+            if field not in known or known[field] != device_data[field]:
+                changed.set(field, device_data[field])
+        log.info(
+            "Revalidated device %s, %d field(s) changed, %d newer over WebSocket kept",
+            device_id,
+            len(changed),
+            len(newer),
+        )
+        await self._apply_updates(device, changed)
+        return True
+
+    async def cancel_resyncs(self) -> None:
+        """Cancel resyncs still in flight."""
+        tasks = [task for task in self._resync_tasks.values() if not task.done()]
+        self._resync_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
     async def handle_device_update(self, device_id: str, data: dict) -> None:
         """Process device updates from WebSocket.
 
@@ -632,35 +1127,50 @@ class DeviceManager:
             return
 
         # Parse the WebSocket message using the parser
-        updates = self.parser.parse_attribute_update(data)
+        updates = self.parser.parse_attribute_update(data, device_id)
 
         # Apply updates to the device
-        if "door_state" in updates:
-            device.update_door_state(updates["door_state"])
-
-        if "light_state" in updates:
-            device.update_light_state(updates["light_state"])
-
-        if "battery_level" in updates:
-            device.update_battery_level(updates["battery_level"])
-
-        if "motion" in updates:
-            device.update_motion_state(updates["motion"])
+        added = await self._apply_updates(device, updates)
 
-        if "wifi_rssi" in updates:
-            device.update_wifi_rssi(updates["wifi_rssi"])
+        # A new module needs its port reindexed before it accepts commands
+        if updates.resync or added:
+            self.schedule_resync(device_id)
 
-        if "vacation_mode" in updates:
-            device.update_vacation_mode(updates["vacation_mode"])
-
-        if "park_assist" in updates:
-            device.update_park_assist(updates["park_assist"])
-
-        if "inflator" in updates:
-            device.update_inflator(updates["inflator"])
+    @staticmethod
+    def _to_update(state: dict[str, Any]) -> DeviceUpdate:
+        """Build a device update from cached field values, skipping unknown fields."""
+        update = DeviceUpdate()
+        for field, value in state.items():
+            try:
+                update.set(field, value)
+            except TypeError:
+                log.debug("Ignoring unknown cached field: %s", field)
+        return update
+
+    async def _apply_updates(self, device: RyobiDevice, updates: DeviceUpdate) -> bool:
+        """Push the fields present in an update to the device's entities.
+
+        Entities of a module the device wasn't known to have are created first,
+        off the loop like in ``setup_device``. The values are remembered as the
+        device's last known state.
 
-        if "bt_speaker" in updates:
-            device.update_bt_speaker(updates["bt_speaker"])
+        Args:
+            device: The device to update
+            updates: Parsed device attributes
 
-        if "fan" in updates:
-            device.update_fan_speed(updates["fan"])
+        Returns:
+            True if the update added a module to the device
+        """
+        added = False
+        state = self.states.setdefault(device.device_id, {})
+        for field in updates:
+            state[field] = updates[field]
+            descriptor = FIELD_ENTITIES.get(field)
+            if descriptor is None:
+                continue
+            if descriptor.module not in device.modules:
+                log.info("Adding %s entities to device %s", descriptor.module, device.device_id)
+                # Entities may connect to the broker
+                added = await asyncio.to_thread(device.add_module, descriptor.module) or added
+            device.update(field, updates[field])
+        return added
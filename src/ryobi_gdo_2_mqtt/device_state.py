@@ -0,0 +1,146 @@
+"""Extraction of device state from the REST device document."""
+
+from collections import abc
+from dataclasses import dataclass
+from typing import Any
+
+from ryobi_gdo_2_mqtt.constants import DoorStates
+from ryobi_gdo_2_mqtt.models import DeviceUpdate
+
+# Modules the device document is indexed for, in the order their entities are created
+MODULE_NAMES: tuple[str, ...] = (
+    "garageDoor",
+    "backupCharger",
+    "garageLight",
+    "wifiModule",
+    "parkAssistLaser",
+    "inflator",
+    "btSpeaker",
+    "fan",
+)
+
+
+@dataclass(frozen=True)
+class StatePath:
+    """Where a DeviceUpdate field is read from, ``deviceTypeMap[<module>_<port>].at.<attribute>.value``."""
+
+    field: str
+    module: str
+    attribute: str
+    transform: abc.Callable[[Any], Any] | None = None
+    required: bool = True
+
+
+# Every value read from a device document. A missing required path makes the document invalid.
+STATE_PATHS: tuple[StatePath, ...] = (
+    StatePath("door_state", "garageDoor", "doorState", DoorStates.to_string),
+    StatePath("door_position", "garageDoor", "doorPosition", required=False),
+    StatePath("door_position_max", "garageDoor", "maxDoorPosition", required=False),
+    StatePath("safety", "garageDoor", "sensorFlag"),
+    StatePath("vacation_mode", "garageDoor", "vacationMode"),
+    StatePath("motion", "garageDoor", "motionSensor", required=False),
+    StatePath("light_state", "garageLight", "lightState", bool),
+    StatePath("battery_level", "backupCharger", "chargeLevel", int),
+    StatePath("wifi_rssi", "wifiModule", "rssi"),
+    StatePath("park_assist", "parkAssistLaser", "moduleState"),
+    StatePath("inflator", "inflator", "moduleState"),
+    StatePath("bt_speaker", "btSpeaker", "moduleState"),
+    StatePath("mic_status", "btSpeaker", "micEnable"),
+    StatePath("fan", "fan", "speed"),
+)
+
+
+@dataclass
+class DeviceState:
+    """What a device document says about a device."""
+
+    # Module name -> deviceTypeMap key, e.g. "garageDoor" -> "garageDoor_7"
+    modules: dict[str, str]
+    update: DeviceUpdate
+    # Attribute key, e.g. "garageDoor_7.doorState" -> (lastSet, value)
+    stamps: dict[str, tuple[int | None, Any]]
+
+
+class DeviceStateExtractor:
+    """Read the module index, state fields and attribute stamps out of a device document.
+
+    The paths to read are grouped per module once, so a document is walked
+    only along those paths and the modules a device has. Which module a
+    deviceTypeMap key belongs to is remembered, the same keys recur on every
+    fetch of every device.
+    """
+
+    def __init__(self, paths: abc.Iterable[StatePath] = STATE_PATHS, modules: abc.Iterable[str] = MODULE_NAMES):
+        """Compile the paths.
+
+        Args:
+            paths: Values to read
+            modules: Modules to index, in order
+        """
+        self.modules = tuple(modules)
+        self._paths: dict[str, tuple[StatePath, ...]] = {
+            module: tuple(path for path in paths if path.module == module) for module in self.modules
+        }
+        self._key_modules: dict[str, str | None] = {}
+
+    def _module_of(self, key: str) -> str | None:
+        """Return the module a deviceTypeMap key belongs to, None for other entries."""
+        try:
+            return self._key_modules[key]
+        except KeyError:
+            pass
+        module = next((name for name in self.modules if name in key), None)
+        self._key_modules[key] = module
+        return module
+
+    def index_modules(self, dtm: abc.Mapping[str, Any]) -> dict[str, str]:
+        """Map each known module to its deviceTypeMap key.
+
+        Args:
+            dtm: The device's deviceTypeMap
+
+        Returns:
+            Module name -> deviceTypeMap key, in the order of ``modules``
+        """
+        found: dict[str, str] = {}
+        for key in dtm:
+            module = self._module_of(key)
+            if module is not None:
+                found[module] = key
+        return {module: found[module] for module in self.modules if module in found}
+
+    def extract(self, device: abc.Mapping[str, Any]) -> DeviceState:
+        """Read a device's state from its entry in the device document.
+
+        Args:
+            device: ``result[0]`` of the device response
+
+        Returns:
+            The device's module index, state and attribute stamps
+
+        Raises:
+            KeyError: If a required path is missing
+        """
+        dtm = device["deviceTypeMap"]
+        modules = self.index_modules(dtm)
+        update = DeviceUpdate()
+        stamps: dict[str, tuple[int | None, Any]] = {}
+
+        for module, key in modules.items():
+            attributes = dtm[key].get("at", {})
+            for attribute, entry in attributes.items():
+                if isinstance(entry, dict):
+                    stamps[f"{key}.{attribute}"] = (entry.get("lastSet"), entry.get("value"))
+            for path in self._paths[module]:
+                entry = attributes.get(path.attribute)
+                if entry is None:
+                    if path.required:
+                        raise KeyError(f"{key}.{path.attribute}")
+                    continue
+                value = entry["value"]
+                update.set(path.field, value if path.transform is None else path.transform(value))
+
+        name = device.get("metaData", {}).get("name")
+        if name is not None:
+            update.set("device_name", name)
+        return DeviceState(modules=modules, update=update, stamps=stamps)
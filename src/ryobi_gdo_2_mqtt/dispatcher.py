@@ -0,0 +1,149 @@
+"""Per-device dispatch queues between WebSocket receive and MQTT publish."""
+
+import asyncio
+from collections import abc
+from dataclasses import dataclass
+
+from ryobi_gdo_2_mqtt.constants import OverflowPolicy
+from ryobi_gdo_2_mqtt.logging import log
+
+DEFAULT_QUEUE_SIZE = 100
+
+
+@dataclass
+class QueueStats:
+    """Counters for a single device's dispatch queue."""
+
+    depth: int = 0
+    high_watermark: int = 0
+    enqueued: int = 0
+    processed: int = 0
+    dropped: int = 0
+    errors: int = 0
+
+
+class DeviceDispatcher:
+    """Decouple WebSocket receive from device update handling.
+
+    Each device gets a bounded queue drained by its own worker task, so a slow
+    update for one device never holds up frames for the others.
+    """
+
+    def __init__(
+        self,
+        handler: abc.Callable[[str, dict], abc.Awaitable[None]],
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ):
+        """Initialize the dispatcher.
+
+        Args:
+            handler: Coroutine function called with (device_id, message) for each message
+            maxsize: Maximum queued messages per device
+            overflow: What to do with a new message when a device's queue is full
+        """
+        self.handler = handler
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._stats: dict[str, QueueStats] = {}
+
+    @property
+    def stats(self) -> dict[str, QueueStats]:
+        """Return queue counters per device, with current depths."""
+        for device_id, queue in self._queues.items():
+            self._stats[device_id].depth = queue.qsize()
+        return self._stats
+
+    def _ensure_worker(self, device_id: str) -> asyncio.Queue:
+        """Return the device's queue, starting its worker on first use."""
+        queue = self._queues.get(device_id)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.maxsize)
+            self._queues[device_id] = queue
+            self._stats[device_id] = QueueStats()
+            self._workers[device_id] = asyncio.create_task(self._worker(device_id, queue))
+        return queue
+
+    async def submit(self, device_id: str, message: dict) -> bool:
+        """Queue a message for a device.
+
+        Args:
+            device_id: The device the message belongs to
+            message: The decoded WebSocket message
+
+        Returns:
+            True if the message was queued, False if it was dropped
+        """
+        queue = self._ensure_worker(device_id)
+        stats = self._stats[device_id]
+
+        if queue.full():
+            if self.overflow == OverflowPolicy.BLOCK:
+                await queue.put(message)
+                self._record_enqueue(stats, queue)
+                return True
+
+            stats.dropped += 1
+            log.warning(
+                "Dispatch queue for %s is full (%d), %s (%d dropped so far)",
+                device_id,
+                self.maxsize,
+                self.overflow,
+                stats.dropped,
+            )
+            if self.overflow == OverflowPolicy.DROP_NEWEST:
+                return False
+            queue.get_nowait()
+            queue.task_done()
+
+        queue.put_nowait(message)
+        self._record_enqueue(stats, queue)
+        return True
+
+    @staticmethod
+    def _record_enqueue(stats: QueueStats, queue: asyncio.Queue) -> None:
+        """Update counters after a message was queued."""
+        stats.enqueued += 1
+        stats.high_watermark = max(stats.high_watermark, queue.qsize())
+
+    async def _worker(self, device_id: str, queue: asyncio.Queue) -> None:
+        """Drain a device's queue, handling one message at a time."""
+        stats = self._stats[device_id]
+        while True:
+            message = await queue.get()
+            try:
+                await self.handler(device_id, message)
+                stats.processed += 1
+            except Exception as ex:  # pylint: disable=broad-except
+                stats.errors += 1
+                log.exception("Error handling update for %s: %s", device_id, ex)
+            finally:
+                queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued message has been handled."""
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    async def discard(self, device_id: str) -> None:
+        """Stop a device's worker and drop its queued messages.
+
+        Args:
+            device_id: The device ID
+        """
+        worker = self._workers.pop(device_id, None)
+        self._queues.pop(device_id, None)
+        self._stats.pop(device_id, None)
+        if worker is not None:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Stop all workers, keeping the counters of their queues."""
+        workers = list(self._workers.values())
+        self._workers.clear()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
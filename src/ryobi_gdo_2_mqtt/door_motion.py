@@ -0,0 +1,133 @@
+"""Coalescing of the door updates streamed while a door moves."""
+
+import asyncio
+import time
+from collections import abc
+from dataclasses import dataclass
+
+# Door states during which updates are coalesced
+MOVING_STATES = frozenset({"opening", "closing"})
+
+# Default seconds between cover publishes while the door moves
+DEFAULT_MOTION_INTERVAL = 1.0
+
+
+@dataclass
+class MotionStats:
+    """Counters for door updates and the cover publishes made for them."""
+
+    received: int = 0
+    published: int = 0
+    motions: int = 0
+
+    @property
+    def reduction(self) -> float:
+        """Return the share of door updates that did not need a publish of their own."""
+        return 1 - self.published / self.received if self.received else 0.0
+
+
+class DoorMotionCoalescer:
+    """Publish a moving door's state and position at most once per interval.
+
+    While the door is opening or closing, Ryobi streams its position a few
+    times per second. Updates during a motion only replace the pending state
+    and position, which are published when the interval since the last
+    publish has passed. The start of a motion and its end are published
+    right away, the end together with the final position. Outside a motion
+    every update is published as it arrives.
+
+    Runs on the event loop, which also runs the delayed publishes.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        publish_state: abc.Callable[[str], bool],
+        publish_position: abc.Callable[[int], bool],
+        interval: float = DEFAULT_MOTION_INTERVAL,
+    ):
+        """Initialize the coalescer.
+
+        Args:
+            loop: Event loop running the delayed publishes
+            publish_state: Publishes a door state, returns whether it was published
+            publish_position: Publishes a raw door position, scaling it to percent open, returns whether it was published
+            interval: Least seconds between publishes while the door moves, 0 to publish every update
+        """
+        self.loop = loop
+        self.publish_state = publish_state
+        self.publish_position = publish_position
+        self.interval = interval
+        self.stats = MotionStats()
+        self.moving = False
+        self._state: str | None = None
+        self._position: int | None = None
+        self._published_at = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def update_state(self, state: str) -> bool:
+        """Take a door state reported by the device.
+
+        Args:
+            state: Door state name, e.g. "opening"
+
+        Returns:
+            True if a publish was made now
+        """
+        self.stats.received += 1
+        self._state = state
+        moving = state in MOVING_STATES
+        if moving == self.moving:
+            return self._publish_due() if moving else self.flush()
+
+        self.moving = moving
+        if moving:
+            self.stats.motions += 1
+        return self.flush()
+
+    def update_position(self, position: int) -> bool:
+        """Take a door position reported by the device.
+
+        Args:
+            position: Door position as reported, 0 closed to the device's maximum position fully open
+
+        Returns:
+            True if a publish was made now
+        """
+        self.stats.received += 1
+        self._position = position
+        return self._publish_due() if self.moving else self.flush()
+
+    def _publish_due(self) -> bool:
+        """Publish if the interval has passed, otherwise make sure a publish is scheduled."""
+        wait = self._published_at + self.interval - time.monotonic()
+        if wait <= 0:
+            return self.flush()
+        if self._timer is None:
+            self._timer = self.loop.call_later(wait, self.flush)
+        return False
+
+    def flush(self) -> bool:
+        """Publish the pending position and state now.
+
+        Returns:
+            True if anything was published
+        """
+        self.cancel()
+        published = False
+        if self._position is not None:
+            published = self.publish_position(self._position) or published
+            self._position = None
+        if self._state is not None:
+            published = self.publish_state(self._state) or published
+            self._state = None
+        if published:
+            self.stats.published += 1
+            self._published_at = time.monotonic()
+        return published
+
+    def cancel(self) -> None:
+        """Drop the scheduled publish, if any."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
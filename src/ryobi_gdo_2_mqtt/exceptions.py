@@ -29,3 +29,9 @@ class RyobiInvalidResponseError(RyobiApiError):
     """Invalid response from API."""
 
     pass
+
+
+class RyobiRpcError(RyobiApiError):
+    """WebSocket JSON-RPC request returned an error."""
+
+    pass
@@ -0,0 +1,128 @@
+"""Encoding of the JSON-RPC request frames sent over the websocket."""
+
+import json
+from functools import lru_cache
+from typing import Any
+
+# Distinct commands and subscriptions remembered encoded; a device only has a few dozen
+FRAME_CACHE_SIZE = 1024
+
+# Message type of a module command
+MODULE_COMMAND_MSG_TYPE = 16
+
+
+def request_body(method: str, params: dict) -> str:
+    """Encode everything of a request frame that follows its ID.
+
+    The ID changes with every request, so frames are split around it: the
+    body is encoded once and ``frame`` puts the ID in front of it.
+
+    Args:
+        method: JSON-RPC method name
+        params: Request parameters
+
+    Returns:
+        The encoded method and params, closing the frame
+    """
+    # Drop the opening brace, ``frame`` supplies it along with the ID
+    return json.dumps({"method": method, "params": params})[1:]
+
+
+def frame(request_id: int, body: str) -> str:
+    """Put a request ID in front of an encoded body.
+
+    Args:
+        request_id: JSON-RPC request ID
+        body: Encoded method and params from ``request_body``
+
+    Returns:
+        The frame, the same text ``json.dumps`` gives for the whole request
+    """
+    return f'{{"jsonrpc": "2.0", "id": {request_id}, {body}'
+
+
+@lru_cache(maxsize=FRAME_CACHE_SIZE, typed=True)
+def command_body(port_id: int, module_type: int, attribute: str, value: Any, topic: str) -> str:
+    """Return the encoded body of a module command, encoding each distinct command once.
+
+    ``typed`` keeps ``True`` and ``1`` apart, they encode differently.
+
+    Args:
+        port_id: Module port ID
+        module_type: Module type ID
+        attribute: Module attribute to set
+        value: Value to set
+        topic: Device the command is for
+
+    Returns:
+        The encoded method and params
+    """
+    params = {
+        "msgType": MODULE_COMMAND_MSG_TYPE,
+        "moduleType": module_type,
+        "portId": port_id,
+        "moduleMsg": {attribute: value},
+        "topic": topic,
+    }
+    return request_body("gdoModuleCommand", params)
+
+
+@lru_cache(maxsize=FRAME_CACHE_SIZE)
+def subscribe_body(topic: str) -> str:
+    """Return the encoded body of a subscription, encoding each topic once.
+
+    Args:
+        topic: Notification topic, e.g. ``<device_id>.wskAttributeUpdateNtfy``
+
+    Returns:
+        The encoded method and params
+    """
+    return request_body("wskSubscribe", {"topic": topic})
+
+
+@lru_cache(maxsize=FRAME_CACHE_SIZE)
+def unsubscribe_body(topic: str) -> str:
+    """Return the encoded body of an unsubscription, encoding each topic once.
+
+    Args:
+        topic: Notification topic, e.g. ``<device_id>.wskAttributeUpdateNtfy``
+
+    Returns:
+        The encoded method and params
+    """
+    return request_body("wskUnsubscribe", {"topic": topic})
+
+
+def redact_api_key(message: dict | str) -> str:
+    """Encode a message for logging, with any API key blanked.
+
+    Args:
+        message: A request, or its encoded frame
+
+    Returns:
+        The encoded message without the API key
+    """
+    if isinstance(message, str):
+        message = json.loads(message)
+    params = message.get("params")
+    if isinstance(params, dict) and "apiKey" in params:
+        message = {**message, "params": {**params, "apiKey": ""}}
+    return json.dumps(message)
+
+
+class Redacted:
+    """Log argument that redacts a message only when the record is emitted."""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message: dict | str):
+        """Wrap a message.
+
+        Args:
+            message: A request, or its encoded frame
+        """
+        self.message = message
+
+    def __str__(self) -> str:
+        """Return the message without its API key."""
+        return redact_api_key(self.message)
@@ -0,0 +1,148 @@
+"""Startup phase timings."""
+
+import asyncio
+import json
+import time
+from collections import abc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from ryobi_gdo_2_mqtt.logging import log
+
+# Taken when the package is first imported, as close to process start as we get
+PROCESS_START = time.monotonic()
+
+# Seconds to wait for every device's websocket before reporting startup anyway
+STARTUP_REPORT_TIMEOUT = 60
+
+
+@dataclass
+class DeviceTimings:
+    """Startup timings of a single device, in seconds."""
+
+    update_device: float | None = None
+    entity_creation: float | None = None
+    websocket_connect: float | None = None
+    first_state: float | None = None
+
+
+class StartupMetrics:
+    """Collect how long each startup phase took.
+
+    Phases are timed with ``phase``. Device timings are recorded as each
+    device comes up, and ``first_state`` is measured from process start.
+    """
+
+    def __init__(self, started: float = PROCESS_START):
+        """Initialize the metrics.
+
+        Args:
+            started: Monotonic time startup is measured from
+        """
+        self.started = started
+        self.phases: dict[str, float] = {}
+        self.devices: dict[str, DeviceTimings] = {}
+        self._connected = asyncio.Event()
+
+    @contextmanager
+    def phase(self, name: str) -> abc.Iterator[None]:
+        """Time a block of startup work.
+
+        Args:
+            name: Phase name, e.g. "login"
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.monotonic() - start
+
+    def device(self, device_id: str) -> DeviceTimings:
+        """Return a device's timings, creating them on first use.
+
+        Args:
+            device_id: The device ID
+        """
+        timings = self.devices.get(device_id)
+        if timings is None:
+            timings = self.devices[device_id] = DeviceTimings()
+        return timings
+
+    def mark_first_state(self, device_id: str) -> None:
+        """Record the time from process start to a device's first state publish.
+
+        Args:
+            device_id: The device ID
+        """
+        timings = self.device(device_id)
+        if timings.first_state is None:
+            timings.first_state = time.monotonic() - self.started
+
+    def mark_websocket_connected(self, device_ids: abc.Iterable[str], seconds: float | None) -> None:
+        """Record the connect and subscribe time of the websocket carrying some devices.
+
+        Only the first connect of each device counts, reconnects are ignored.
+
+        Args:
+            device_ids: Devices subscribed over the websocket
+            seconds: Time from opening the websocket until it was subscribed
+        """
+        for device_id in device_ids:
+            timings = self.device(device_id)
+            if timings.websocket_connect is None:
+                timings.websocket_connect = seconds
+        self._connected.set()
+
+    async def wait_connected(self, device_ids: abc.Collection[str], timeout: float = STARTUP_REPORT_TIMEOUT) -> bool:
+        """Wait until the websocket of each of the given devices has connected.
+
+        Args:
+            device_ids: Devices to wait for
+            timeout: Seconds to wait
+
+        Returns:
+            True if every device connected within the timeout
+        """
+
+        async def wait() -> None:
+            while any(self.device(device_id).websocket_connect is None for device_id in device_ids):
+                self._connected.clear()
+                await self._connected.wait()
+
+        try:
+            await asyncio.wait_for(wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def summary(self) -> dict:
+        """Return the timings as plain data."""
+        return {
+            "phases": dict(self.phases),
+            "devices": {device_id: asdict(timings) for device_id, timings in self.devices.items()},
+        }
+
+    def report(self, path: str | None = None) -> None:
+        """Log the timings and, if a path is given, write them as JSON.
+
+        Args:
+            path: File to write the summary to
+        """
+        phases = ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.phases.items())
+        log.info("Startup timings: %s", phases or "none")
+        for device_id, timings in self.devices.items():
+            log.info(
+                "Startup timings for %s: %s",
+                device_id,
+                ", ".join(
+                    f"{name}={'-' if seconds is None else f'{seconds:.3f}s'}"
+                    for name, seconds in asdict(timings).items()
+                ),
+            )
+
+        if path:
+            try:
+                Path(path).write_text(json.dumps(self.summary(), indent=2))
+            except OSError as ex:
+                log.error("Unable to write startup metrics to %s: %s", path, ex)
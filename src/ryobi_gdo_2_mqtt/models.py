@@ -1,5 +1,8 @@
 """Data Transfer Objects for Ryobi GDO 2 MQTT integration."""
 
+from collections import abc
+from typing import Any
+
 from pydantic import BaseModel
 
 
@@ -78,19 +81,98 @@ class DeviceCommand(BaseModel):
     value: str | int | bool
 
 
-class DeviceData(BaseModel):
-    """Structured device data from API."""
-
-    door_state: str | None = None
-    light_state: bool | None = None
-    battery_level: int | None = None
-    safety: int | None = None
-    vacation_mode: int | None = None
-    motion: int | None = None
-    wifi_rssi: int | None = None
-    park_assist: int | None = None
-    inflator: int | None = None
-    bt_speaker: int | None = None
-    mic_status: int | None = None
-    fan: int | None = None
-    device_name: str | None = None
+# Attributes a device update can carry; the position is the field's bit in the presence mask.
+# door_position comes before door_state so the final position of a motion is applied before its end.
+UPDATE_FIELDS: tuple[str, ...] = (
+    "door_position_max",
+    "door_position",
+    "door_state",
+    "light_state",
+    "battery_level",
+    "safety",
+    "vacation_mode",
+    "motion",
+    "wifi_rssi",
+    "park_assist",
+    "inflator",
+    "bt_speaker",
+    "mic_status",
+    "fan",
+    "device_name",
+)
+
+_FIELD_BITS: dict[str, int] = {field: 1 << index for index, field in enumerate(UPDATE_FIELDS)}
+
+
+class DeviceUpdate(abc.Mapping):
+    """Device attributes from a websocket notification or the REST device state.
+
+    A slotted record with a presence bitmask, so consumers iterate only the
+    fields that were set. Unset fields read as None. ``resync`` is set when the
+    source detected missed updates and the device state should be refetched.
+    """
+
+    __slots__ = (*UPDATE_FIELDS, "present", "resync")
+
+    def __init__(self, **values: Any):
+        """Initialize the update.
+
+        Args:
+            **values: Initial field values
+
+        Raises:
+            TypeError: If a value is given for an unknown field
+        """
+        self.present = 0
+        self.resync = False
+        if values:
+            for field, value in values.items():
+                self.set(field, value)
+
+    def set(self, field: str, value: Any) -> None:
+        """Set a field and mark it present.
+
+        Raises:
+            TypeError: If the field is unknown
+        """
+        bit = _FIELD_BITS.get(field)
+        if bit is None:
+            raise TypeError(f"Unknown device update field: {field}")
+        setattr(self, field, value)
+        self.present |= bit
+
+    def __getattr__(self, name: str) -> Any:
+        """Return None for fields that were not set."""
+        if name in _FIELD_BITS:
+            return None
+        raise AttributeError(name)
+
+    def __getitem__(self, field: str) -> Any:
+        """Return a present field's value."""
+        if not self.present & _FIELD_BITS.get(field, 0):
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __contains__(self, field: object) -> bool:
+        """Return whether a field is present."""
+        return bool(self.present & _FIELD_BITS.get(field, 0)) if isinstance(field, str) else False
+
+    def __iter__(self) -> abc.Iterator[str]:
+        """Iterate over present fields in field order."""
+        mask = self.present
+        while mask:
+            lowest = mask & -mask
+            yield UPDATE_FIELDS[lowest.bit_length() - 1]
+            mask ^= lowest
+
+    def __len__(self) -> int:
+        """Return the number of present fields."""
+        return self.present.bit_count()
+
+    def __repr__(self) -> str:
+        """Return the present fields."""
+        return f"DeviceUpdate({', '.join(f'{field}={self[field]!r}' for field in self)})"
+
+
+# Kept for callers of the REST device state
+DeviceData = DeviceUpdate
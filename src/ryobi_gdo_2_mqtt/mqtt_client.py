@@ -0,0 +1,275 @@
+"""MQTT client shared by every entity of every device."""
+
+import asyncio
+import contextlib
+import ssl
+import threading
+from collections import abc
+
+import paho.mqtt.client as mqtt
+from ha_mqtt_discoverable import Settings as MQTTSettings
+from paho.mqtt.enums import CallbackAPIVersion
+
+from ryobi_gdo_2_mqtt.logging import log
+
+# Seconds to wait for the broker to accept the shared connection at startup
+MQTT_CONNECT_TIMEOUT = 10
+
+# Seconds between keepalive checks when the client is driven by the event loop
+MISC_INTERVAL = 1
+
+# Bounds of the reconnect backoff when the client is driven by the event loop
+RECONNECT_DELAY_MIN = 1
+RECONNECT_DELAY_MAX = 120
+
+
+class SharedMQTTClient(mqtt.Client):
+    """A single paho client, connection and network thread for all entities.
+
+    ha_mqtt_discoverable entities given an external client assume they own it:
+    subscribers replace ``on_connect`` and every entity disconnects the client
+    when it is garbage collected. This client collects every ``on_connect``
+    callback and runs all of them on (re)connect so each command topic is
+    resubscribed, and ignores ``disconnect``/``loop_stop`` until ``shutdown``.
+    Callbacks of removed entities are dropped with ``remove_connect_callback``.
+
+    With ``in_loop`` the client runs without a network thread: the socket is
+    watched by the asyncio event loop, so command callbacks run on the loop and
+    publishes are written when the socket is writable instead of blocking it.
+    """
+
+    def __init__(self, settings: MQTTSettings.MQTT, in_loop: bool = False):
+        """Initialize the client.
+
+        Args:
+            settings: MQTT connection settings
+            in_loop: Drive the connection from the running event loop instead of a network thread
+        """
+        super().__init__(callback_api_version=CallbackAPIVersion.VERSION2, client_id=settings.client_name or "")
+        self.settings = settings
+        self.in_loop = in_loop
+        self._event_loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._misc_task: asyncio.Task | None = None
+        self._connect_callbacks: list[abc.Callable] = []
+        self._callbacks_lock = threading.Lock()
+        # Devices are set up in worker threads, each collecting its entities' callbacks
+        self._collecting = threading.local()
+        self._retired_topics: set[str] = set()
+        self._connected = threading.Event()
+        self._closing = False
+
+        if settings.tls_key:
+            self.tls_set(
+                ca_certs=settings.tls_ca_cert,
+                certfile=settings.tls_certfile,
+                keyfile=settings.tls_key,
+                cert_reqs=ssl.CERT_REQUIRED,
+                tls_version=ssl.PROTOCOL_TLS,
+            )
+        elif settings.use_tls:
+            self.tls_set(ca_certs=settings.tls_ca_cert, cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLS)
+        if settings.username:
+            self.username_pw_set(settings.username, password=settings.password)
+
+    @property
+    def on_connect(self) -> abc.Callable:
+        """Return the callback running every registered connect callback."""
+        return self._dispatch_connect
+
+    @on_connect.setter
+    def on_connect(self, func: abc.Callable | None) -> None:
+        """Register a connect callback instead of replacing the others."""
+        if func is None:
+            return
+        with self._callbacks_lock:
+            # Bound methods are new objects on each access but compare equal
+            if func not in self._connect_callbacks:
+                self._connect_callbacks.append(func)
+        collected = getattr(self._collecting, "callbacks", None)
+        if collected is not None:
+            collected.append(func)
+
+    def remove_connect_callback(self, func: abc.Callable) -> None:
+        """Stop running a connect callback, e.g. one of a removed entity.
+
+        Args:
+            func: The callback, as registered through ``on_connect``
+        """
+        with self._callbacks_lock:
+            if func in self._connect_callbacks:
+                self._connect_callbacks.remove(func)
+
+    @contextlib.contextmanager
+    def collect_connect_callbacks(self) -> abc.Iterator[list[abc.Callable]]:
+        """Collect the connect callbacks registered by the current thread within the block.
+
+        Entities register their callbacks themselves, so this is how their owner
+        learns which ones to remove along with them.
+
+        Yields:
+            The list the callbacks are added to
+        """
+        collected: list[abc.Callable] = []
+        self._collecting.callbacks = collected
+        try:
+            yield collected
+        finally:
+            self._collecting.callbacks = None
+
+    def _dispatch_connect(self, client, userdata, flags, reason_code, properties=None) -> None:
+        """Run every connect callback once the broker accepted the connection."""
+        if reason_code.is_failure:
+            log.error("MQTT broker refused the connection: %s", reason_code)
+            return
+        log.info("Shared MQTT connection established")
+        for callback in list(self._connect_callbacks):
+            try:
+                callback(client, userdata, flags, reason_code, properties)
+            except Exception as ex:  # pylint: disable=broad-except
+                log.error("Error in MQTT connect callback: %s", ex)
+        # Only now, so start() returns after resubscribing and flushing held states
+        self._connected.set()
+
+    def subscribe(self, topic, *args, **kwargs):
+        """Subscribe, skipping command topics of removed entities."""
+        if isinstance(topic, str) and topic in self._retired_topics:
+            return mqtt.MQTT_ERR_SUCCESS, None
+        return super().subscribe(topic, *args, **kwargs)
+
+    def message_callback_add(self, sub: str, callback) -> None:
+        """Route a topic to a callback, reviving the topic if it was retired."""
+        self._retired_topics.discard(sub)
+        super().message_callback_add(sub, callback)
+
+    def retire(self, topic: str) -> None:
+        """Stop receiving a command topic for good, e.g. when its device is removed.
+
+        Args:
+            topic: The command topic
+        """
+        self._retired_topics.add(topic)
+        self.message_callback_remove(topic)
+        super().unsubscribe(topic)
+
+    async def start(self, timeout: float = MQTT_CONNECT_TIMEOUT) -> bool:
+        """Connect to the broker and start the network thread, or watch the socket from the event loop.
+
+        Publishes made before the connection is up are queued by paho.
+
+        Args:
+            timeout: Seconds to wait for the broker to accept the connection
+
+        Returns:
+            True if connected within the timeout
+        """
+        log.info("Connecting shared MQTT client to %s:%s", self.settings.host, self.settings.port)
+        if self.in_loop:
+            self._attach_loop()
+            try:
+                await asyncio.to_thread(self.connect, self.settings.host, self.settings.port)
+            except OSError as ex:
+                log.warning("Unable to connect to MQTT broker: %s", ex)
+            self._misc_task = self._event_loop.create_task(self._misc())
+        else:
+            self.connect_async(self.settings.host, self.settings.port)
+            super().loop_start()
+        connected = await asyncio.to_thread(self._connected.wait, timeout)
+        if not connected:
+            log.warning("MQTT broker not connected after %ss, continuing to retry in the background", timeout)
+        return connected
+
+    def disconnect(self, *args, **kwargs):
+        """Ignore disconnects from entities, only shutdown() disconnects."""
+        if not self._closing:
+            return mqtt.MQTT_ERR_SUCCESS
+        return super().disconnect(*args, **kwargs)
+
+    def loop_stop(self):
+        """Ignore loop stops from entities, only shutdown() stops the network thread."""
+        if not self._closing:
+            return mqtt.MQTT_ERR_SUCCESS
+        return super().loop_stop()
+
+    async def shutdown(self) -> None:
+        """Disconnect from the broker and stop the network thread."""
+        self._closing = True
+        if not self.in_loop:
+            super().disconnect()
+            await asyncio.to_thread(super().loop_stop)
+            return
+
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+            await asyncio.gather(self._misc_task, return_exceptions=True)
+        if super().disconnect() == mqtt.MQTT_ERR_SUCCESS:
+            # Flush the DISCONNECT packet, paho closes the socket once it is sent
+            self.loop_write()
+
+    def _attach_loop(self) -> None:
+        """Hand socket events to the running event loop instead of a network thread."""
+        self._event_loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self.on_socket_open = self._socket_open
+        self.on_socket_close = self._socket_close
+        self.on_socket_register_write = self._socket_register_write
+        self.on_socket_unregister_write = self._socket_unregister_write
+
+    def _call_in_loop(self, func: abc.Callable, *args) -> None:
+        """Run a function on the event loop, directly when already on its thread.
+
+        The connect and reconnect calls run in a worker thread, so socket events
+        can arrive from outside the loop.
+        """
+        if threading.get_ident() == self._loop_thread:
+            func(*args)
+        else:
+            self._event_loop.call_soon_threadsafe(func, *args)
+
+    def _socket_open(self, client, userdata, sock) -> None:
+        """Start reading from a newly opened socket."""
+        self._call_in_loop(self._event_loop.add_reader, sock.fileno(), self._on_readable)
+
+    def _socket_close(self, client, userdata, sock) -> None:
+        """Stop watching a socket paho is about to close."""
+        fd = sock.fileno()
+        self._call_in_loop(self._event_loop.remove_reader, fd)
+        self._call_in_loop(self._event_loop.remove_writer, fd)
+
+    def _socket_register_write(self, client, userdata, sock) -> None:
+        """Write queued packets once the socket is writable."""
+        self._call_in_loop(self._event_loop.add_writer, sock.fileno(), self._on_writable)
+
+    def _socket_unregister_write(self, client, userdata, sock) -> None:
+        """Stop waiting for the socket to be writable, the outgoing queue is empty."""
+        self._call_in_loop(self._event_loop.remove_writer, sock.fileno())
+
+    def _on_readable(self) -> None:
+        """Read incoming packets, running message callbacks on the event loop."""
+        self.loop_read()
+        # TLS may have decrypted more data than was read, which select() won't report
+        sock = self.socket()
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            self._event_loop.call_soon(self._on_readable)
+
+    def _on_writable(self) -> None:
+        """Write queued packets."""
+        self.loop_write()
+
+    async def _misc(self) -> None:
+        """Send keepalive pings and reconnect with backoff after the connection drops."""
+        delay = RECONNECT_DELAY_MIN
+        while not self._closing:
+            await asyncio.sleep(MISC_INTERVAL)
+            if self.loop_misc() != mqtt.MQTT_ERR_NO_CONN or self._closing:
+                continue
+
+            self._connected.clear()
+            log.info("Reconnecting shared MQTT client to %s:%s", self.settings.host, self.settings.port)
+            try:
+                await asyncio.to_thread(self.reconnect)
+                delay = RECONNECT_DELAY_MIN
+            except OSError as ex:
+                log.warning("Unable to reconnect to MQTT broker, retrying in %ss: %s", delay, ex)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
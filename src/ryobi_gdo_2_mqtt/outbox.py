@@ -0,0 +1,105 @@
+"""Holding entity states while the MQTT broker is unreachable."""
+
+import itertools
+import threading
+import time
+from collections import abc
+from dataclasses import dataclass
+from typing import Any
+
+from ryobi_gdo_2_mqtt.logging import log
+
+
+@dataclass
+class OutboxStats:
+    """Counters for the state outbox."""
+
+    # States put in the outbox, and how many of them replaced a state still waiting
+    queued: int = 0
+    compacted: int = 0
+    flushed: int = 0
+    flushes: int = 0
+    errors: int = 0
+    max_depth: int = 0
+    last_flush_seconds: float = 0.0
+    max_flush_seconds: float = 0.0
+
+    @property
+    def compaction_ratio(self) -> float:
+        """Return how many states were queued per state kept, 1.0 if none replaced another."""
+        kept = self.queued - self.compacted
+        return self.queued / kept if kept else 1.0
+
+
+class StateOutbox:
+    """Keep the latest state per state topic until the broker is reachable again.
+
+    paho drops QoS 0 publishes made while disconnected, and entity states are
+    published with QoS 0. States published during an outage are put here
+    instead, one per state topic, so the outbox never holds more than one
+    entry per entity however many updates arrive. Flushing publishes them
+    lowest priority first, then in the order they were first queued.
+
+    States are put from the event loop and flushed from the MQTT network
+    thread, so the entries are guarded by a lock. Publishes run outside it.
+    """
+
+    def __init__(self):
+        """Initialize an empty outbox."""
+        self.stats = OutboxStats()
+        self._entries: dict[str, tuple[int, int, abc.Callable[..., Any], tuple[Any, ...]]] = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of states waiting."""
+        return len(self._entries)
+
+    def put(self, topic: str, priority: int, publish: abc.Callable[..., Any], *args: Any) -> None:
+        """Hold a state, replacing the one waiting for the same topic.
+
+        Args:
+            topic: State topic of the entity
+            priority: Flush order, lower goes first
+            publish: Entity method doing the publish
+            *args: Arguments for the publish method
+        """
+        with self._lock:
+            waiting = self._entries.get(topic)
+            order = next(self._order) if waiting is None else waiting[1]
+            self._entries[topic] = (priority, order, publish, args)
+            self.stats.queued += 1
+            if waiting is not None:
+                self.stats.compacted += 1
+            self.stats.max_depth = max(self.stats.max_depth, len(self._entries))
+
+    def flush(self) -> int:
+        """Publish every waiting state in priority order.
+
+        Returns:
+            Number of states published
+        """
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry[:2])
+            self._entries.clear()
+        if not entries:
+            return 0
+
+        started = time.monotonic()
+        published = 0
+        for _, _, publish, args in entries:
+            try:
+                publish(*args)
+            except Exception as ex:  # pylint: disable=broad-except
+                self.stats.errors += 1
+                log.error("Error publishing queued entity state: %s", ex)
+                continue
+            published += 1
+        elapsed = time.monotonic() - started
+
+        self.stats.flushes += 1
+        self.stats.flushed += published
+        self.stats.last_flush_seconds = elapsed
+        self.stats.max_flush_seconds = max(self.stats.max_flush_seconds, elapsed)
+        log.info("Published %d entity states held while MQTT was disconnected in %.1fms", published, elapsed * 1000)
+        return published
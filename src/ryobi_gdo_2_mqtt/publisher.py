@@ -0,0 +1,123 @@
+"""Publishing of entity states from a dedicated thread."""
+
+import threading
+import time
+from collections import abc, deque
+from dataclasses import dataclass
+from typing import Any
+
+from ryobi_gdo_2_mqtt.logging import log
+
+# Most publishes run back to back as one batch
+PUBLISH_BATCH_SIZE = 64
+
+# Seconds to wait for queued publishes to be sent when stopping
+STOP_TIMEOUT = 5
+
+
+@dataclass
+class PublisherStats:
+    """Counters for the publisher thread."""
+
+    published: int = 0
+    errors: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+    # Seconds from submit until the publish call returned
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        """Return the average seconds from submit until published."""
+        return self.total_latency / self.published if self.published else 0.0
+
+
+class MQTTPublisher:
+    """Run entity publishes on a worker thread instead of the event loop.
+
+    Publishes are handed over through a deque, whose append and popleft need
+    no lock, and run in submit order. The worker drains the deque in batches
+    without waking in between, and paho writes every packet queued by then
+    in a single pass of its network loop.
+    """
+
+    def __init__(self, batch_size: int = PUBLISH_BATCH_SIZE):
+        """Initialize the publisher.
+
+        Args:
+            batch_size: Most publishes run back to back as one batch
+        """
+        self.batch_size = batch_size
+        self.stats = PublisherStats()
+        self._queue: deque[tuple[float, abc.Callable[..., Any], tuple[Any, ...]]] = deque()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the worker thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="mqtt-publisher", daemon=True)
+        self._thread.start()
+
+    def submit(self, publish: abc.Callable[..., Any], *args: Any) -> None:
+        """Queue a publish to run on the worker thread.
+
+        Args:
+            publish: Entity method doing the publish
+            *args: Arguments for the publish method
+        """
+        self._queue.append((time.monotonic(), publish, args))
+        self._wake.set()
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> None:
+        """Send what is queued and stop the worker thread.
+
+        Blocks until the thread exits, so call it off the event loop.
+
+        Args:
+            timeout: Seconds to wait for the thread
+        """
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                log.warning("MQTT publisher did not stop within %ss, %d publishes dropped", timeout, len(self._queue))
+            self._thread = None
+
+    def _run(self) -> None:
+        """Drain the queue until stopped."""
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while self._queue:
+                self._drain()
+            if self._stopping:
+                return
+
+    def _drain(self) -> None:
+        """Run one batch of queued publishes."""
+        batch = 0
+        while batch < self.batch_size:
+            try:
+                submitted, publish, args = self._queue.popleft()
+            except IndexError:
+                break
+            batch += 1
+            try:
+                publish(*args)
+            except Exception as ex:  # pylint: disable=broad-except
+                self.stats.errors += 1
+                log.error("Error publishing entity state: %s", ex)
+                continue
+            latency = time.monotonic() - submitted
+            self.stats.published += 1
+            self.stats.total_latency += latency
+            self.stats.max_latency = max(self.stats.max_latency, latency)
+
+        if batch:
+            self.stats.batches += 1
+            self.stats.largest_batch = max(self.stats.largest_batch, batch)
@@ -0,0 +1,66 @@
+"""Rate limiting of requests to the Ryobi cloud."""
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class RequestStats:
+    """Counters for Ryobi REST requests."""
+
+    sent: int = 0
+    coalesced: int = 0
+    throttled: int = 0
+    throttled_seconds: float = 0.0
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average, with bursts of up to ``burst``.
+
+    Callers waiting for a token are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """Initialize the bucket, full.
+
+        Args:
+            rate: Tokens added per second
+            burst: Most tokens the bucket holds
+
+        Raises:
+            ValueError: If rate is not positive or burst is below 1
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be greater than 0")
+        if burst < 1:
+            raise ValueError("Burst must be 1 or greater")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Take a token, waiting for one if the bucket is empty.
+
+        Returns:
+            Seconds spent waiting, 0 if a token was available
+        """
+        async with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+
+            wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+            self._refill()
+            self._tokens = max(0.0, self._tokens - 1)
+            return wait
@@ -9,11 +9,17 @@ from aiohttp import TCPConnector
 from ha_mqtt_discoverable import Settings as MQTTSettings
 
 from ryobi_gdo_2_mqtt.api import RyobiApiClient
+from ryobi_gdo_2_mqtt.cache import ApiKeyCache, DeviceSnapshot, DeviceSnapshotCache
+from ryobi_gdo_2_mqtt.constants import DEFAULT_SETUP_CONCURRENCY
 from ryobi_gdo_2_mqtt.device_manager import DeviceManager
+from ryobi_gdo_2_mqtt.dispatcher import DeviceDispatcher
 from ryobi_gdo_2_mqtt.exceptions import RyobiApiError
 from ryobi_gdo_2_mqtt.logging import log
+from ryobi_gdo_2_mqtt.metrics import StartupMetrics
+from ryobi_gdo_2_mqtt.rate_limit import TokenBucket
 from ryobi_gdo_2_mqtt.service import ServiceCoordinator
 from ryobi_gdo_2_mqtt.settings import Settings
+from ryobi_gdo_2_mqtt.websocket import RyobiWebSocket
 from ryobi_gdo_2_mqtt.websocket_parser import WebSocketMessageParser
 
 
@@ -75,6 +81,8 @@ class ApplicationBootstrap:
         self.parser: WebSocketMessageParser | None = None
         self.device_manager: DeviceManager | None = None
         self.coordinator: ServiceCoordinator | None = None
+        self.metrics = StartupMetrics()
+        self.device_cache = DeviceSnapshotCache(settings.device_cache_file) if settings.device_cache_file else None
 
     def configure_logging(self) -> None:
         """Configure application logging."""
@@ -106,15 +114,26 @@ class ApplicationBootstrap:
         Raises:
             SystemExit: If authentication fails
         """
+        key_cache = ApiKeyCache(self.settings.api_key_cache_file) if self.settings.api_key_cache_file else None
+        rate_limiter = None
+        if self.settings.api_rate_limit > 0:
+            rate_limiter = TokenBucket(self.settings.api_rate_limit, self.settings.api_rate_burst)
         self.api_client = RyobiApiClient(
             username=self.settings.email,
             password=self.settings.password.get_secret_value(),
             session=session,
+            key_cache=key_cache,
+            rate_limiter=rate_limiter,
         )
 
+        if key_cache is not None and self.api_client.use_cached_api_key():
+            log.info("Using cached Ryobi API key, logging in again only if it is rejected")
+            return
+
         log.info("Authenticating with Ryobi API...")
         try:
-            await self.api_client.get_api_key()
+            with self.metrics.phase("login"):
+                await self.api_client.get_api_key()
             log.info("Successfully authenticated with Ryobi API")
         except RyobiApiError as e:
             log.error("Failed to authenticate with Ryobi API: %s", e)
@@ -131,13 +150,27 @@ class ApplicationBootstrap:
         """
         log.info("Fetching all devices...")
         try:
-            all_devices = await self.api_client.get_devices()
+            with self.metrics.phase("get_devices"):
+                all_devices = await self.api_client.get_devices()
             log.info("Found devices: %s", all_devices)
             return all_devices
         except RyobiApiError as e:
             log.error("Failed to get devices: %s", e)
             sys.exit(1)
 
+    def load_snapshot(self) -> DeviceSnapshot | None:
+        """Load the devices cached by the previous run, if caching is enabled.
+
+        Returns:
+            The cached snapshot, or None if devices have to be discovered
+        """
+        if self.device_cache is None:
+            return None
+        snapshot = self.device_cache.load(self.settings.email)
+        if snapshot is not None:
+            log.info("Using cached devices, revalidating them in the background: %s", snapshot.devices)
+        return snapshot
+
     def initialize_mqtt(self) -> None:
         """Initialize MQTT settings."""
         self.mqtt_settings = MQTTSettings.MQTT(
@@ -156,13 +189,33 @@ class ApplicationBootstrap:
         self.device_manager = DeviceManager(
             mqtt_settings=self.mqtt_settings,
             api_client=self.api_client,
+            republish_after=self.settings.mqtt_republish_after,
+            shared_connection=self.settings.mqtt_shared_connection,
+            in_loop_transport=self.settings.mqtt_in_loop_transport,
+            publisher_thread=self.settings.mqtt_publisher_thread,
+            outbox=self.settings.mqtt_outbox,
+            motion_interval=self.settings.door_motion_interval,
+            command_spacing=self.settings.command_spacing if self.settings.command_scheduler else None,
         )
         self.device_manager.parser = self.parser
+        self.device_manager.metrics = self.metrics
+
+        # Queue device updates so slow MQTT publishes don't stall WebSocket reads
+        dispatcher = None
+        if self.settings.dispatch_queue_size > 0:
+            dispatcher = DeviceDispatcher(
+                handler=self.device_manager.handle_device_update,
+                maxsize=self.settings.dispatch_queue_size,
+                overflow=self.settings.dispatch_overflow,
+            )
 
         # Create service coordinator
         self.coordinator = ServiceCoordinator(
             api_client=self.api_client,
             device_manager=self.device_manager,
+            multiplex=self.settings.websocket_multiplex,
+            topics_per_connection=self.settings.websocket_topics_per_connection,
+            dispatcher=dispatcher,
         )
 
 
@@ -173,15 +226,31 @@ class ServiceRunner:
         self,
         coordinator: ServiceCoordinator,
         resource_manager: ResourceManager,
+        setup_concurrency: int = DEFAULT_SETUP_CONCURRENCY,
+        metrics: StartupMetrics | None = None,
+        metrics_file: str = "",
+        device_cache: DeviceSnapshotCache | None = None,
     ):
         """Initialize the service runner.
 
         Args:
             coordinator: Service coordinator
             resource_manager: Resource manager
+            setup_concurrency: Maximum devices set up at the same time
+            metrics: Startup timings to report once every device is connected
+            metrics_file: File the startup timings are written to, empty to only log them
+            device_cache: Where to keep the devices between restarts, None to not keep them
         """
         self.coordinator = coordinator
         self.resource_manager = resource_manager
+        self.setup_concurrency = setup_concurrency
+        self.metrics = metrics
+        self.metrics_file = metrics_file
+        self.device_cache = device_cache
+        # device_id -> device_name of every device set up
+        self.devices: dict[str, str] = {}
+        self._ready: list[str] = []
+        self._listening: set[RyobiWebSocket] = set()
 
     async def setup_devices(
         self,
@@ -192,35 +261,107 @@ class ServiceRunner:
     ) -> None:
         """Setup all devices and start WebSocket connections.
 
+        Devices are set up concurrently, bounded by ``setup_concurrency``, and
+        each device's WebSocket starts listening as soon as that device is ready.
+        A device failing to set up doesn't affect the others.
+
         Args:
             devices: Dictionary of device_id -> device_name
             username: Ryobi username
             apikey: Ryobi API key
             session: aiohttp ClientSession
         """
-        for device_id, device_name in devices.items():
-            # Setup device through coordinator
-            try:
-                ws = await self.coordinator.setup_device(
-                    device_id=device_id,
-                    device_name=device_name,
-                    username=username,
-                    apikey=apikey,
-                    session=session,
-                )
-            except (ValueError, RyobiApiError) as e:
-                log.error("Failed to setup device %s: %s", device_id, e)
-                continue
+        semaphore = asyncio.Semaphore(self.setup_concurrency)
+
+        async def setup(device_id: str, device_name: str) -> None:
+            async with semaphore:
+                try:
+                    ws = await self.coordinator.setup_device(
+                        device_id=device_id,
+                        device_name=device_name,
+                        username=username,
+                        apikey=apikey,
+                        session=session,
+                    )
+                except (ValueError, RyobiApiError) as e:
+                    log.error("Failed to setup device %s: %s", device_id, e)
+                    return
+            self.devices[device_id] = device_name
+            self._ready.append(device_id)
+            self._start_listening(ws)
+
+        await asyncio.gather(*(setup(device_id, device_name) for device_id, device_name in devices.items()))
+
+    async def revalidate(self, username: str, apikey: str, session: aiohttp.ClientSession) -> None:
+        """Check devices set up from the cache against the cloud and apply the differences.
+
+        Devices no longer in the account are removed, new ones are set up, and
+        the state of the others is refetched. The snapshot is saved afterwards.
 
-            # Start WebSocket listening
-            task = asyncio.create_task(ws.listen())
-            self.resource_manager.add_task(task)
+        Args:
+            username: Ryobi username
+            apikey: Ryobi API key
+            session: aiohttp ClientSession
+        """
+        try:
+            devices = await self.coordinator.api_client.get_devices()
+        except RyobiApiError as e:
+            log.error("Failed to revalidate cached devices: %s", e)
+            return
+
+        for device_id in [device_id for device_id in self.devices if device_id not in devices]:
+            log.info("Device %s is no longer in the account", device_id)
+            await self.coordinator.remove_device(device_id)
+            del self.devices[device_id]
+            if device_id in self._ready:
+                self._ready.remove(device_id)
+
+        semaphore = asyncio.Semaphore(self.setup_concurrency)
+
+        async def revalidate_device(device_id: str) -> None:
+            async with semaphore:
+                await self.coordinator.device_manager.revalidate_device(device_id)
+
+        known = list(self.devices)
+        await asyncio.gather(*(revalidate_device(device_id) for device_id in known))
+        for device_id in known:
+            self.devices[device_id] = devices[device_id]
+
+        added = {device_id: name for device_id, name in devices.items() if device_id not in self.devices}
+        if added:
+            log.info("Setting up devices not in the cache: %s", added)
+            await self.setup_devices(added, username, apikey, session)
+        self.save_snapshot()
+
+    def save_snapshot(self) -> None:
+        """Save the devices and their last known state, if caching is enabled."""
+        if self.device_cache is None or not self.devices:
+            return
+        snapshot = self.coordinator.device_manager.snapshot(self.devices)
+        self.device_cache.store(self.coordinator.api_client.username, snapshot)
+
+    def _start_listening(self, ws: RyobiWebSocket) -> None:
+        """Start WebSocket listening, once per connection when devices share one."""
+        if ws in self._listening:
+            return
+        self._listening.add(ws)
+        task = asyncio.create_task(ws.listen())
+        self.resource_manager.add_task(task)
+
+    async def report_startup(self) -> None:
+        """Report startup timings once every set up device's WebSocket connected."""
+        if self.metrics is None:
+            return
+        if not await self.metrics.wait_connected(self._ready):
+            log.warning("Not every device connected in time, reporting startup timings so far")
+        self.metrics.report(self.metrics_file)
 
     async def run(self) -> None:
         """Run the main service loop."""
         try:
             await asyncio.gather(*self.resource_manager._tasks)
         except asyncio.CancelledError:
+            self.save_snapshot()
             log.info("Shutting down WebSocket connections...")
             await self.resource_manager.cleanup()
 
@@ -264,29 +405,48 @@ class RyobiGDO2MQTT:
             # Authenticate
             await bootstrap.authenticate(session)
 
-            # Discover devices
-            all_devices = await bootstrap.discover_devices()
+            # Discover devices, unless the previous run cached them
+            snapshot = bootstrap.load_snapshot()
+            all_devices = snapshot.devices if snapshot is not None else await bootstrap.discover_devices()
 
             # Initialize MQTT and components
             bootstrap.initialize_mqtt()
             bootstrap.initialize_components()
+            if snapshot is not None:
+                bootstrap.device_manager.restore_snapshot(snapshot)
 
             # Store coordinator in resource manager
             self.resource_manager.coordinator = bootstrap.coordinator
+            with bootstrap.metrics.phase("mqtt_connect"):
+                await bootstrap.device_manager.connect()
 
             # Create service runner
             runner = ServiceRunner(
                 coordinator=bootstrap.coordinator,
                 resource_manager=self.resource_manager,
+                setup_concurrency=settings.setup_concurrency,
+                metrics=bootstrap.metrics,
+                metrics_file=settings.startup_metrics_file,
+                device_cache=bootstrap.device_cache,
             )
 
             # Setup devices and start WebSocket connections
-            await runner.setup_devices(
-                devices=all_devices,
-                username=settings.email,
-                apikey=bootstrap.api_client.api_key,
-                session=session,
-            )
+            with bootstrap.metrics.phase("device_setup"):
+                await runner.setup_devices(
+                    devices=all_devices,
+                    username=settings.email,
+                    apikey=bootstrap.api_client.api_key,
+                    session=session,
+                )
+            self.resource_manager.add_task(asyncio.create_task(runner.report_startup()))
+            if settings.stats_interval > 0:
+                report = bootstrap.coordinator.report_stats(settings.stats_interval)
+                self.resource_manager.add_task(asyncio.create_task(report))
+            if snapshot is not None:
+                revalidate = runner.revalidate(settings.email, bootstrap.api_client.api_key, session)
+                self.resource_manager.add_task(asyncio.create_task(revalidate))
+            else:
+                runner.save_snapshot()
 
             # Run main service loop
             await runner.run()
@@ -1,5 +1,7 @@
 """Service coordinator for managing API client, WebSocket connections, and device manager."""
 
+import asyncio
+from dataclasses import asdict
 from typing import Any
 
 from aiohttp import ClientSession
@@ -7,23 +9,48 @@ from aiohttp import ClientSession
 from ryobi_gdo_2_mqtt.api import RyobiApiClient
 from ryobi_gdo_2_mqtt.constants import WebSocketState
 from ryobi_gdo_2_mqtt.device_manager import DeviceManager
+from ryobi_gdo_2_mqtt.dispatcher import DeviceDispatcher
 from ryobi_gdo_2_mqtt.logging import log
 from ryobi_gdo_2_mqtt.websocket import SIGNAL_CONNECTION_STATE, RyobiWebSocket
+from ryobi_gdo_2_mqtt.websocket_pool import DEFAULT_TOPICS_PER_CONNECTION, RyobiWebSocketPool
+
+
+def _counters(stats: Any) -> dict[str, Any]:
+    """Return a stats dataclass's fields and derived properties as plain data."""
+    counters = asdict(stats)
+    for name, attribute in vars(type(stats)).items():
+        if isinstance(attribute, property):
+            counters[name] = getattr(stats, name)
+    return counters
 
 
 class ServiceCoordinator:
     """Coordinates API client, WebSocket connections, and device manager."""
 
-    def __init__(self, api_client: RyobiApiClient, device_manager: DeviceManager):
+    def __init__(
+        self,
+        api_client: RyobiApiClient,
+        device_manager: DeviceManager,
+        multiplex: bool = False,
+        topics_per_connection: int = DEFAULT_TOPICS_PER_CONNECTION,
+        dispatcher: DeviceDispatcher | None = None,
+    ):
         """Initialize the service coordinator.
 
         Args:
             api_client: The Ryobi API client
             device_manager: The device manager
+            multiplex: Share pooled WebSockets per account instead of opening one per device
+            topics_per_connection: Maximum devices per pooled WebSocket, 0 for a single connection
+            dispatcher: Queues device updates off the WebSocket receive path; None handles them inline
         """
         self.api_client = api_client
         self.device_manager = device_manager
+        self.multiplex = multiplex
+        self.topics_per_connection = topics_per_connection
+        self.dispatcher = dispatcher
         self.websockets: dict[str, RyobiWebSocket] = {}
+        self.pools: dict[str, RyobiWebSocketPool] = {}
 
     def create_websocket_callback(self, device_id: str):
         """Create a callback function for a specific device's WebSocket.
@@ -40,16 +67,82 @@ class ServiceCoordinator:
             if signal == SIGNAL_CONNECTION_STATE:
                 if data == WebSocketState.CONNECTED:
                     log.info("WebSocket connected for device: %s", device_id)
+                    self._record_connect([device_id], self.websockets.get(device_id))
                 elif data == WebSocketState.STOPPED:
                     log.warning("WebSocket stopped for device: %s. Reason: %s", device_id, error)
                 else:
                     log.debug("WebSocket state for %s: %s", device_id, data)
             elif signal == "data":
                 log.debug("Received data for device %s: %s", device_id, data)
-                await self.device_manager.handle_device_update(device_id, data)
+                await self.dispatch(device_id, data)
+
+        return callback
+
+    async def dispatch(self, device_id: str, data: Any) -> None:
+        """Hand a device's WebSocket message to the dispatcher, or handle it inline.
+
+        Args:
+            device_id: The device ID
+            data: The decoded WebSocket message
+        """
+        if self.dispatcher is not None:
+            await self.dispatcher.submit(device_id, data)
+        else:
+            await self.device_manager.handle_device_update(device_id, data)
+
+    def create_shared_websocket_callback(self, username: str, get_websocket):
+        """Create a callback function for a WebSocket shared by several devices.
+
+        Args:
+            username: The account the WebSocket is authenticated as
+            get_websocket: Returns the WebSocket, used to route notifications to devices
+
+        Returns:
+            Async callback function
+        """
+
+        async def callback(signal: str, data: Any, error: Any = None) -> None:
+            """Handle WebSocket callbacks and route data to the owning device."""
+            if signal == SIGNAL_CONNECTION_STATE:
+                devices = get_websocket().devices
+                if data == WebSocketState.CONNECTED:
+                    log.info("Shared WebSocket connected for %s: %d devices", username, len(devices))
+                    self._record_connect(devices, get_websocket())
+                elif data == WebSocketState.STOPPED:
+                    log.warning("Shared WebSocket stopped for %s. Reason: %s", username, error)
+                else:
+                    log.debug("Shared WebSocket state for %s: %s", username, data)
+            elif signal == "data":
+                device_id = get_websocket().device_for(data)
+                if device_id is None:
+                    log.debug("Ignoring WebSocket message not addressed to a device: %s", data)
+                    return
+                log.debug("Received data for device %s: %s", device_id, data)
+                await self.dispatch(device_id, data)
 
         return callback
 
+    def _record_connect(self, device_ids: list[str], ws: RyobiWebSocket | None) -> None:
+        """Record how long a WebSocket took to connect and subscribe its devices."""
+        metrics = self.device_manager.metrics
+        if metrics is not None and ws is not None:
+            metrics.mark_websocket_connected(device_ids, ws.connect_seconds)
+
+    def _get_pool(self, username: str, apikey: str, session: ClientSession) -> RyobiWebSocketPool:
+        """Return the account's WebSocket pool, creating it on first use."""
+        pool = self.pools.get(username)
+        if pool is None:
+            pool = RyobiWebSocketPool(
+                callback_factory=lambda get_websocket: self.create_shared_websocket_callback(username, get_websocket),
+                username=username,
+                apikey=apikey,
+                session=session,
+                topics_per_connection=self.topics_per_connection,
+                reauthenticate=self.api_client.refresh_api_key,
+            )
+            self.pools[username] = pool
+        return pool
+
     async def setup_device(
         self, device_id: str, device_name: str, username: str, apikey: str, session: ClientSession
     ) -> RyobiWebSocket:
@@ -63,8 +156,16 @@ class ServiceCoordinator:
             session: aiohttp ClientSession
 
         Returns:
-            The created WebSocket instance
+            The WebSocket instance carrying this device's updates
         """
+        if self.multiplex:
+            pool = self._get_pool(username, apikey, session)
+
+            # Commands go through the pool so they follow the device across rebalancing.
+            # Only subscribe once the device exists, so routed updates have somewhere to go.
+            await self.device_manager.setup_device(device_id, device_name, pool)
+            return await pool.add_device(device_id)
+
         # Create WebSocket
         ws = RyobiWebSocket(
             callback=self.create_websocket_callback(device_id),
@@ -72,6 +173,7 @@ class ServiceCoordinator:
             apikey=apikey,
             device=device_id,
             session=session,
+            reauthenticate=self.api_client.refresh_api_key,
         )
         self.websockets[device_id] = ws
 
@@ -80,14 +182,91 @@ class ServiceCoordinator:
 
         return ws
 
+    async def remove_device(self, device_id: str) -> None:
+        """Remove a device, closing or rebalancing the WebSocket that carried it.
+
+        Args:
+            device_id: The device ID
+        """
+        ws = self.websockets.pop(device_id, None)
+        if ws is not None:
+            await ws.close()
+        for pool in self.pools.values():
+            if pool.shard_for(device_id) is not None:
+                await pool.remove_device(device_id)
+
+        if self.dispatcher is not None:
+            await self.dispatcher.discard(device_id)
+        await self.device_manager.remove_device(device_id)
+
     async def cleanup(self):
         """Clean up coordinator resources."""
         log.info("Cleaning up service coordinator...")
 
+        # Stop dispatching before the devices go away
+        if self.dispatcher is not None:
+            await self.dispatcher.close()
+
         # Clean up devices
+        await self.device_manager.cancel_resyncs()
         for device in self.device_manager.devices.values():
             await device.cleanup()
 
         # Close WebSockets
         for ws in self.websockets.values():
             await ws.close()
+        for pool in self.pools.values():
+            await pool.close()
+
+        # Close the shared MQTT connection after every device stopped publishing
+        await self.device_manager.close()
+
+        self.log_stats()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return the runtime counters as plain data.
+
+        Counters are grouped per component, dispatch queues per device and
+        scheduled commands per command class. Disabled components are left out.
+        """
+        device_manager = self.device_manager
+        stats = {"api_requests": _counters(self.api_client.request_stats)}
+        if self.dispatcher is not None:
+            for device_id, queue in self.dispatcher.stats.items():
+                stats[f"dispatch {device_id}"] = _counters(queue)
+        if device_manager.parser is not None:
+            stats["websocket_updates"] = {
+                "stale_dropped": device_manager.parser.stale_dropped,
+                "gaps_detected": device_manager.parser.gaps_detected,
+            }
+        stats["entity_states"] = _counters(device_manager.publish_stats())
+        if device_manager.publisher is not None:
+            stats["mqtt_publisher"] = _counters(device_manager.publisher.stats)
+        if device_manager.outbox is not None:
+            stats["mqtt_outbox"] = _counters(device_manager.outbox.stats) | {"depth": len(device_manager.outbox)}
+        stats["door_motion"] = _counters(device_manager.motion_stats())
+        for attribute, commands in device_manager.command_stats().items():
+            stats[f"commands {attribute}"] = _counters(commands)
+        return stats
+
+    def log_stats(self) -> None:
+        """Log the runtime counters, one line per group."""
+        for name, counters in self.stats().items():
+            log.info(
+                "Stats %s: %s",
+                name,
+                ", ".join(
+                    f"{counter}={value:.3f}" if isinstance(value, float) else f"{counter}={value}"
+                    for counter, value in counters.items()
+                ),
+            )
+
+    async def report_stats(self, interval: float) -> None:
+        """Log the runtime counters every interval until cancelled.
+
+        Args:
+            interval: Seconds between two reports
+        """
+        while True:
+            await asyncio.sleep(interval)
+            self.log_stats()
@@ -1,6 +1,8 @@
 from pydantic import Field, SecretStr, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from ryobi_gdo_2_mqtt.constants import DEFAULT_SETUP_CONCURRENCY, OverflowPolicy
+
 
 class Settings(BaseSettings):
     """Application settings for Ryobi GDO 2 MQTT integration."""
@@ -21,7 +23,61 @@ class Settings(BaseSettings):
     mqtt_port: int = Field(default=1883, description="MQTT broker port")
     mqtt_user: str = Field(default="", description="MQTT broker username")
     mqtt_password: SecretStr = Field(default="", description="MQTT broker password")
+    mqtt_shared_connection: bool = Field(
+        default=False, description="Use one MQTT connection for all entities of all devices"
+    )
+    mqtt_in_loop_transport: bool = Field(
+        default=False, description="Run the shared MQTT connection on the event loop instead of a network thread"
+    )
+    mqtt_publisher_thread: bool = Field(
+        default=False, description="Publish entity states from a dedicated thread instead of the event loop"
+    )
+    mqtt_outbox: bool = Field(
+        default=False, description="Hold the latest entity states while the MQTT broker is unreachable"
+    )
+    mqtt_republish_after: int = Field(
+        default=0,
+        description="Republish an unchanged entity state on its next update if last published this many seconds ago, 0 to never",
+    )
+    door_motion_interval: float = Field(
+        default=1.0, description="Least seconds between door publishes while the door moves, 0 to publish every update"
+    )
+    command_scheduler: bool = Field(
+        default=False, description="Queue commands per device, merging repeats and sending door commands first"
+    )
+    command_spacing: float = Field(
+        default=0.2, description="Least seconds between two commands to a device when commands are queued"
+    )
+    api_key_cache_file: str = Field(
+        default="", description="File to keep the Ryobi API key in between restarts, empty to always log in"
+    )
+    device_cache_file: str = Field(
+        default="", description="File to keep devices and their last known state in between restarts, empty to disable"
+    )
+    api_rate_limit: float = Field(
+        default=0, description="Average Ryobi REST requests per second allowed, 0 to not limit requests"
+    )
+    api_rate_burst: int = Field(default=5, description="Ryobi REST requests allowed at once before rate limiting")
     log_level: str = Field(default="INFO", description="Logging level")
+    websocket_multiplex: bool = Field(
+        default=False, description="Share pooled websocket connections per account for all devices"
+    )
+    websocket_topics_per_connection: int = Field(
+        default=50, description="Maximum devices per pooled websocket connection, 0 for a single connection"
+    )
+    dispatch_queue_size: int = Field(
+        default=100, description="Maximum queued websocket updates per device, 0 to handle updates inline"
+    )
+    dispatch_overflow: OverflowPolicy = Field(
+        default=OverflowPolicy.DROP_OLDEST, description="What a full per-device update queue does with new updates"
+    )
+    setup_concurrency: int = Field(
+        default=DEFAULT_SETUP_CONCURRENCY, description="Maximum devices set up at the same time on startup"
+    )
+    startup_metrics_file: str = Field(default="", description="Write startup timings as JSON to this file")
+    stats_interval: float = Field(
+        default=600, description="Seconds between logging runtime counters, 0 to only log them on shutdown"
+    )
 
     @field_validator("mqtt_port")
     @classmethod
@@ -31,6 +87,78 @@ class Settings(BaseSettings):
             raise ValueError("Port must be between 1 and 65535")
         return v
 
+    @field_validator("mqtt_republish_after")
+    @classmethod
+    def validate_mqtt_republish_after(cls, v):
+        """Validate the republish age is not negative."""
+        if v < 0:
+            raise ValueError("MQTT republish age must be 0 or greater")
+        return v
+
+    @field_validator("door_motion_interval")
+    @classmethod
+    def validate_door_motion_interval(cls, v):
+        """Validate the door motion interval is not negative."""
+        if v < 0:
+            raise ValueError("Door motion interval must be 0 or greater")
+        return v
+
+    @field_validator("command_spacing")
+    @classmethod
+    def validate_command_spacing(cls, v):
+        """Validate the command spacing is not negative."""
+        if v < 0:
+            raise ValueError("Command spacing must be 0 or greater")
+        return v
+
+    @field_validator("stats_interval")
+    @classmethod
+    def validate_stats_interval(cls, v):
+        """Validate the stats interval is not negative."""
+        if v < 0:
+            raise ValueError("Stats interval must be 0 or greater")
+        return v
+
+    @field_validator("api_rate_limit")
+    @classmethod
+    def validate_api_rate_limit(cls, v):
+        """Validate the API rate limit is not negative."""
+        if v < 0:
+            raise ValueError("API rate limit must be 0 or greater")
+        return v
+
+    @field_validator("api_rate_burst")
+    @classmethod
+    def validate_api_rate_burst(cls, v):
+        """Validate at least one request is allowed at once."""
+        if v < 1:
+            raise ValueError("API rate burst must be 1 or greater")
+        return v
+
+    @field_validator("websocket_topics_per_connection")
+    @classmethod
+    def validate_topics_per_connection(cls, v):
+        """Validate the websocket shard size is not negative."""
+        if v < 0:
+            raise ValueError("Topics per connection must be 0 or greater")
+        return v
+
+    @field_validator("dispatch_queue_size")
+    @classmethod
+    def validate_dispatch_queue_size(cls, v):
+        """Validate the dispatch queue size is not negative."""
+        if v < 0:
+            raise ValueError("Dispatch queue size must be 0 or greater")
+        return v
+
+    @field_validator("setup_concurrency")
+    @classmethod
+    def validate_setup_concurrency(cls, v):
+        """Validate at least one device is set up at a time."""
+        if v < 1:
+            raise ValueError("Setup concurrency must be 1 or greater")
+        return v
+
     @field_validator("log_level")
     @classmethod
     def validate_log_level(cls, v):
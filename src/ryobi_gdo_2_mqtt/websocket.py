@@ -3,15 +3,26 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
 import json
+import time
 from collections import abc
 
 import aiohttp
 
-from ryobi_gdo_2_mqtt.constants import DEVICE_SET_ENDPOINT, HOST_URI, WebSocketState
+from ryobi_gdo_2_mqtt import codec, frames
+from ryobi_gdo_2_mqtt.constants import (
+    ATTRIBUTE_UPDATE_METHOD,
+    DEVICE_SET_ENDPOINT,
+    HOST_URI,
+    MessageKind,
+    WebSocketState,
+)
+from ryobi_gdo_2_mqtt.exceptions import RyobiAuthenticationError, RyobiRpcError
 from ryobi_gdo_2_mqtt.logging import log
 
 MAX_FAILED_ATTEMPTS = 5
+RPC_TIMEOUT = 10
 INFO_LOOP_RUNNING = "Event loop already running, not creating new one."
 
 # Websocket errors
@@ -31,25 +42,112 @@ class RyobiWebSocket:
     """Represent a websocket connection to Ryobi servers."""
 
     # FIX: Modified constructor to accept aiohttp session
-    def __init__(self, callback, username: str, apikey: str, device: str, session: aiohttp.ClientSession) -> None:
-        """Initialize a RyobiWebSocket instance."""
+    def __init__(
+        self,
+        callback,
+        username: str,
+        apikey: str,
+        device: str | None,
+        session: aiohttp.ClientSession,
+        reauthenticate: abc.Callable[[str], abc.Awaitable[str | None]] | None = None,
+    ) -> None:
+        """Initialize a RyobiWebSocket instance.
+
+        Args:
+            callback: Async callback receiving state changes and messages
+            username: Ryobi account username
+            apikey: Ryobi API key
+            device: Initial device to subscribe to, or None for an empty multiplexed socket
+            session: aiohttp ClientSession
+            reauthenticate: Called with a rejected API key, returns a new key or None
+        """
         # FIX: Use the passed session instead of creating a new one
         self.session = session
         self.url = f"wss://{HOST_URI}/{DEVICE_SET_ENDPOINT}"
         self._user = username
         self._apikey = apikey
-        self._device_id = device
+        self._device_ids: list[str] = [device] if device else []
         self.callback: abc.Callable = callback
+        self.reauthenticate = reauthenticate
+        self._reauthenticated = False
         self._state = None
         self._error_reason = None
         self._ws_client = None
         self.failed_attempts = 0
+        self.connect_seconds: float | None = None
+        self._request_ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        # (API key, encoded auth body), encoded again only when the key changes
+        self._auth_body: tuple[str, str] | None = None
 
     @property
     def state(self) -> WebSocketState | None:
         """Return the current state."""
         return self._state
 
+    @property
+    def devices(self) -> list[str]:
+        """Return the devices subscribed over this connection."""
+        return list(self._device_ids)
+
+    async def add_device(self, device_id: str) -> None:
+        """Add a device to this connection.
+
+        The device is subscribed immediately if the connection is already up,
+        otherwise it is picked up by the subscribe step of the next connect.
+
+        Args:
+            device_id: The device ID to subscribe to
+        """
+        if device_id in self._device_ids:
+            return
+        self._device_ids.append(device_id)
+        if self._state == STATE_CONNECTED:
+            try:
+                await self._subscribe_device(device_id)
+            except (TimeoutError, aiohttp.ClientConnectionError) as error:
+                # The next reconnect subscribes every device again
+                log.warning("Websocket subscription for %s failed: %s", device_id, error)
+
+    async def remove_device(self, device_id: str) -> None:
+        """Stop receiving notifications for a device on this connection.
+
+        Notifications stop being routed immediately. If the connection is up,
+        the device is also unsubscribed, so the server stops sending them.
+
+        Args:
+            device_id: The device ID to remove
+        """
+        if device_id not in self._device_ids:
+            return
+        self._device_ids.remove(device_id)
+        if self._state == STATE_CONNECTED:
+            try:
+                await self._unsubscribe_device(device_id)
+            except (TimeoutError, aiohttp.ClientConnectionError) as error:
+                # A connection that dropped has no subscriptions left
+                log.warning("Websocket unsubscription for %s failed: %s", device_id, error)
+
+    def device_for(self, message: dict) -> str | None:
+        """Return which of this connection's devices a notification belongs to.
+
+        Args:
+            message: Decoded websocket message
+
+        Returns:
+            The device ID from ``params.varName`` (or the ``topic`` prefix),
+            or None if the message is not a notification for one of our devices
+        """
+        params = message.get("params")
+        if not isinstance(params, dict):
+            return None
+        device_id = params.get("varName")
+        if not device_id and isinstance(params.get("topic"), str):
+            device_id = params["topic"].split(".", 1)[0]
+        if device_id in self._device_ids:
+            return device_id
+        return None
+
     async def set_state(self, value: WebSocketState) -> None:
         """Set the state and notify callback."""
         self._state = value
@@ -62,6 +160,7 @@ class RyobiWebSocket:
         await self.set_state(STATE_STARTING)
 
         header = {"Connection": "keep-alive, Upgrade", "handshakeTimeout": "10000"}
+        started = time.monotonic()
 
         try:
             async with self.session.ws_connect(
@@ -72,33 +171,34 @@ class RyobiWebSocket:
             ) as ws_client:
                 self._ws_client = ws_client
 
-                # Auth to server and subscribe to topic
-                if self._state != STATE_CONNECTED:
-                    await self.websocket_auth()
-                    await asyncio.sleep(0.5)
-                    await self.websocket_subscribe()
-
-                await self.set_state(STATE_CONNECTED)
-                self.failed_attempts = 0
-
-                async for message in ws_client:
-                    if self._state == STATE_STOPPED:
-                        break
+                # Read frames in the background so handshake responses can be awaited
+                receiver = asyncio.create_task(self._receive(ws_client))
+                try:
+                    # Auth to server and subscribe to topic
+                    if self._state != STATE_CONNECTED:
+                        await self.websocket_auth()
+                        await self.websocket_subscribe()
 
-                    if message.type == aiohttp.WSMsgType.TEXT:
-                        msg = message.json()
-                        await self.callback("data", msg)
+                    self.connect_seconds = time.monotonic() - started
+                    await self.set_state(STATE_CONNECTED)
+                    self.failed_attempts = 0
+                    self._reauthenticated = False
 
-                    elif message.type == aiohttp.WSMsgType.CLOSED:
-                        log.warning("Websocket connection closed")
-                        break
-
-                    elif message.type == aiohttp.WSMsgType.ERROR:
-                        log.error("Websocket error")
-                        break
+                    await receiver
+                finally:
+                    if not receiver.done():
+                        receiver.cancel()
+                    await asyncio.gather(receiver, return_exceptions=True)
+        except RyobiAuthenticationError as error:
+            log.error("Websocket authentication rejected: %s", error)
+            if not await self._retry_with_new_key():
+                self._error_reason = ERROR_AUTH_FAILURE
+                await self.set_state(STATE_STOPPED)
         except aiohttp.ClientResponseError as error:
             if error.status == 401:
                 log.error("Credentials rejected: %s", error)
+                if await self._retry_with_new_key():
+                    return
                 self._error_reason = ERROR_AUTH_FAILURE
             else:
                 log.error("Unexpected response received: %s", error)
@@ -133,6 +233,129 @@ class RyobiWebSocket:
                 await self.set_state(STATE_DISCONNECTED)
                 await asyncio.sleep(5)
 
+    async def _retry_with_new_key(self) -> bool:
+        """Get a new API key after a rejection, once until the next successful connect.
+
+        Returns:
+            True if a new key was obtained and the connection should be retried
+        """
+        if self.reauthenticate is None or self._reauthenticated or self._state == STATE_STOPPED:
+            return False
+        self._reauthenticated = True
+        apikey = await self.reauthenticate(self._apikey)
+        if not apikey:
+            return False
+        self._apikey = apikey
+        await self.set_state(STATE_DISCONNECTED)
+        return True
+
+    async def _receive(self, ws_client) -> None:
+        """Read frames until the connection closes, resolving RPC responses."""
+        try:
+            async for message in ws_client:
+                if self._state == STATE_STOPPED:
+                    break
+
+                if message.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                    await self._handle_frame(message.data)
+
+                elif message.type == aiohttp.WSMsgType.CLOSED:
+                    log.warning("Websocket connection closed")
+                    break
+
+                elif message.type == aiohttp.WSMsgType.ERROR:
+                    log.error("Websocket error")
+                    break
+        except Exception as error:
+            self._fail_pending(error)
+            raise
+        finally:
+            self._fail_pending(aiohttp.ClientConnectionError("Websocket connection closed"))
+
+    async def _handle_frame(self, data: bytes | str) -> None:
+        """Decode a frame and route it by kind before any further parsing."""
+        try:
+            msg = codec.loads(data)
+        except codec.DecodeError as error:
+            log.warning("Websocket received undecodable frame: %s", error)
+            return
+
+        kind = codec.classify(msg)
+        if kind == MessageKind.NOTIFICATION:
+            await self.callback("data", msg)
+        elif kind == MessageKind.RESPONSE:
+            if not self._resolve_response(msg):
+                log.debug("Websocket response for unknown request %s", msg.get("id"))
+        else:
+            log.debug("Websocket ignoring message: %s", msg.get("method") if isinstance(msg, dict) else msg)
+
+    def _resolve_response(self, message: dict) -> bool:
+        """Complete the pending request a JSON-RPC response belongs to.
+
+        Returns:
+            True if the message was a response to one of our requests
+        """
+        future = self._pending.pop(message.get("id"), None)
+        if future is None:
+            return False
+        if not future.done():
+            if "error" in message:
+                future.set_exception(RyobiRpcError(f"Request {message.get('id')} failed: {message['error']}"))
+            else:
+                future.set_result(message["result"])
+        return True
+
+    def _fail_pending(self, error: BaseException) -> None:
+        """Fail every request still waiting for a response."""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, method: str, params: dict, timeout: float = RPC_TIMEOUT):
+        """Send a JSON-RPC request and wait for its response.
+
+        Args:
+            method: JSON-RPC method name
+            params: Request parameters
+            timeout: Seconds to wait for the response
+
+        Returns:
+            The response's result
+
+        Raises:
+            RyobiRpcError: If the server answered with an error
+            TimeoutError: If no response arrived in time
+            aiohttp.ClientConnectionError: If the request could not be sent or the connection closed
+        """
+        return await self._request_encoded(method, frames.request_body(method, params), timeout)
+
+    async def _request_encoded(self, method: str, body: str, timeout: float = RPC_TIMEOUT):
+        """Send a request whose method and params are already encoded and wait for its response.
+
+        Args:
+            method: JSON-RPC method name, for errors
+            body: Encoded method and params, see ``frames.request_body``
+            timeout: Seconds to wait for the response
+
+        Returns:
+            The response's result
+
+        Raises:
+            RyobiRpcError: If the server answered with an error
+            TimeoutError: If no response arrived in time
+            aiohttp.ClientConnectionError: If the request could not be sent or the connection closed
+        """
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            if not await self.websocket_send(frames.frame(request_id, body)):
+                raise aiohttp.ClientConnectionError(f"Unable to send {method} request")
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
     async def listen(self):
         """Start the listening websocket."""
         self.failed_attempts = 0
@@ -142,36 +365,75 @@ class RyobiWebSocket:
     async def close(self):
         """Close the listening websocket."""
         await self.set_state(STATE_STOPPED)
+        if self._ws_client is not None and not self._ws_client.closed:
+            await self._ws_client.close()
 
     async def websocket_auth(self) -> None:
-        """Authenticate with Ryobi server."""
+        """Authenticate with Ryobi server.
+
+        Raises:
+            RyobiAuthenticationError: If the server rejects the credentials
+        """
         log.debug("Websocket attempting authenticate with server.")
-        auth_request = {
-            "jsonrpc": "2.0",
-            "id": 3,
-            "method": "srvWebSocketAuth",
-            "params": {"varName": self._user, "apiKey": self._apikey},
-        }
-        await self.websocket_send(auth_request)
+        if self._auth_body is None or self._auth_body[0] != self._apikey:
+            body = frames.request_body("srvWebSocketAuth", {"varName": self._user, "apiKey": self._apikey})
+            self._auth_body = (self._apikey, body)
+        try:
+            result = await self._request_encoded("srvWebSocketAuth", self._auth_body[1])
+        except RyobiRpcError as error:
+            raise RyobiAuthenticationError(str(error)) from error
+        if not isinstance(result, dict) or result.get("result") != "OK":
+            raise RyobiAuthenticationError(f"Unexpected authentication result: {result}")
+        log.debug("Websocket authenticated.")
 
     async def websocket_subscribe(self) -> None:
-        """Send subscription for device updates."""
-        log.debug("Websocket subscribing to notifications for %s", self._device_id)
-        subscribe = {
-            "jsonrpc": "2.0",
-            "id": 3,
-            "method": "wskSubscribe",
-            "params": {"topic": self._device_id + ".wskAttributeUpdateNtfy"},
-        }
-        await self.websocket_send(subscribe)
-
-    async def websocket_send(self, message: dict) -> bool:
-        """Send websocket message."""
-        json_message = json.dumps(message)
-        log.debug("Websocket sending data: %s", self.redact_api_key(message))
+        """Send subscriptions for updates of every device on this connection.
+
+        Devices added while the subscriptions are in flight are subscribed too.
+        """
+        subscribed: set[str] = set()
+        while pending := [device_id for device_id in self._device_ids if device_id not in subscribed]:
+            subscribed.update(pending)
+            await asyncio.gather(*(self._subscribe_device(device_id) for device_id in pending))
 
+    async def _subscribe_device(self, device_id: str) -> None:
+        """Subscribe to a single device's updates and wait for the server to confirm."""
+        log.debug("Websocket subscribing to notifications for %s", device_id)
         try:
-            await self._ws_client.send_str(json_message)
+            await self._request_encoded("wskSubscribe", frames.subscribe_body(f"{device_id}.{ATTRIBUTE_UPDATE_METHOD}"))
+        except RyobiRpcError as error:
+            log.error("Websocket subscription for %s rejected: %s", device_id, error)
+            return
+        log.debug("Websocket subscribed to notifications for %s", device_id)
+
+    async def _unsubscribe_device(self, device_id: str) -> None:
+        """Unsubscribe from a single device's updates and wait for the server to confirm."""
+        log.debug("Websocket unsubscribing from notifications for %s", device_id)
+        try:
+            await self._request_encoded(
+                "wskUnsubscribe", frames.unsubscribe_body(f"{device_id}.{ATTRIBUTE_UPDATE_METHOD}")
+            )
+        except RyobiRpcError as error:
+            log.error("Websocket unsubscription for %s rejected: %s", device_id, error)
+            return
+        log.debug("Websocket unsubscribed from notifications for %s", device_id)
+
+    async def websocket_send(self, message: dict | str) -> bool:
+        """Send websocket message.
+
+        Args:
+            message: Encoded frame, or a message to encode
+
+        Returns:
+            True if the message was sent
+        """
+        if not isinstance(message, str):
+            message = json.dumps(message)
+        # Redacted only if the record is emitted
+        log.debug("Websocket sending data: %s", frames.Redacted(message))
+
+        try:
+            await self._ws_client.send_str(message)
             log.debug("Websocket message sent.")
             return True
         except Exception as err:
@@ -180,38 +442,50 @@ class RyobiWebSocket:
             await self.set_state(STATE_DISCONNECTED)
         return False
 
-    def redact_api_key(self, message: dict) -> dict:
+    def redact_api_key(self, message: dict | str) -> str:
         """Clear API key data from logs."""
-        if "params" in message:
-            if "apiKey" in message["params"]:
-                message["params"]["apiKey"] = ""
-        return json.dumps(message)
+        return frames.redact_api_key(message)
+
+    async def send_message(self, port_id, module_type, attribute: str, value, device_id: str | None = None):
+        """Send message to API.
 
-    async def send_message(self, *args):
-        """Send message to API."""
+        Args:
+            port_id: Module port ID
+            module_type: Module type ID
+            attribute: Module attribute to set
+            value: Value to set
+            device_id: Target device, defaults to the first device on this connection
+
+        Returns:
+            True once the server acknowledged the command
+        """
         if self._state != STATE_CONNECTED:
             log.warning("Websocket not yet connected, unable to send command.")
-            return
+            return False
 
-        log.debug("Send message args: %s", args)
-
-        ws_command = {
-            "jsonrpc": "2.0",
-            "method": "gdoModuleCommand",
-            "params": {
-                "msgType": 16,
-                "moduleType": int(args[1]),
-                "portId": int(args[0]),
-                "moduleMsg": {args[2]: args[3]},
-                "topic": self._device_id,
-            },
-        }
+        topic = device_id or (self._device_ids[0] if self._device_ids else None)
+        if topic is None:
+            log.warning("Websocket has no device to send the command to.")
+            return False
+
+        # Repeated commands reuse their encoded body
+        body = frames.command_body(int(port_id), int(module_type), attribute, value, topic)
         log.debug(
-            "Sending command: %s value: %s portId: %s moduleType: %s",
-            args[2],
-            args[3],
-            args[0],
-            args[1],
+            "Sending command to %s: %s value: %s portId: %s moduleType: %s",
+            topic,
+            attribute,
+            value,
+            port_id,
+            module_type,
         )
-        log.debug("Full message: %s", ws_command)
-        await self.websocket_send(ws_command)
+        started = time.monotonic()
+        try:
+            await self._request_encoded("gdoModuleCommand", body)
+        except RyobiRpcError as error:
+            log.error("Command %s for %s rejected: %s", attribute, topic, error)
+            return False
+        except (TimeoutError, aiohttp.ClientConnectionError) as error:
+            log.warning("Command %s for %s not acknowledged: %s", attribute, topic, error or "timed out")
+            return False
+        log.debug("Command %s for %s acknowledged in %.0f ms", attribute, topic, (time.monotonic() - started) * 1000)
+        return True
@@ -1,101 +1,227 @@
 """WebSocket message parser for Ryobi API."""
 
+import logging
+from collections import abc
+from functools import lru_cache
 from typing import Any
 
-from ryobi_gdo_2_mqtt.constants import DoorStates
+from ryobi_gdo_2_mqtt.constants import ATTRIBUTE_UPDATE_METHOD, DOOR_STATE_NAMES
 from ryobi_gdo_2_mqtt.logging import log
+from ryobi_gdo_2_mqtt.models import DeviceUpdate
+
+# Distinct attribute keys seen across all devices; a fleet only has a few dozen
+KEY_CACHE_SIZE = 1024
+
+# Notification params that are not module attributes
+_SKIPPED_KEYS = frozenset({"topic", "varName", "id"})
+
+# Discrete state attributes whose lastValue is checked for missed updates. Continuous
+# values like doorPosition skip intermediate values while streaming, so they never chain.
+_GAP_CHECKED_ATTRIBUTES = frozenset({"doorState", "lightState", "vacationMode", "motionSensor", "sensorFlag"})
+
+# A compiled key: the update field it sets and an optional value conversion.
+# A conversion returning None drops the value; a field of None marks the key unhandled.
+type KeyHandler = tuple[str | None, abc.Callable[[Any], Any] | None]
+
+_UNHANDLED: KeyHandler = (None, None)
+
+# Attribute-specific updates per module, checked in order against the key
+_MODULE_ATTRIBUTES: tuple[tuple[str, dict[str, KeyHandler]], ...] = (
+    (
+        "garageDoor",
+        {
+            "doorState": ("door_state", DOOR_STATE_NAMES.get),
+            "doorPosition": ("door_position", None),
+            "maxDoorPosition": ("door_position_max", None),
+            "motionSensor": ("motion", None),
+            "vacationMode": ("vacation_mode", None),
+            "sensorFlag": ("safety", None),
+        },
+    ),
+    ("garageLight", {"lightState": ("light_state", bool)}),
+    ("backupCharger", {"chargeLevel": ("battery_level", int)}),
+)
+
+# Modules where any attribute update sets the field
+_MODULE_FIELDS: tuple[tuple[str, str], ...] = (
+    ("parkAssistLaser", "park_assist"),
+    ("btSpeaker", "bt_speaker"),
+    ("inflator", "inflator"),
+    ("fan", "fan"),
+)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def compile_key(key: str) -> KeyHandler | None:
+    """Work out once what an attribute key (e.g. ``garageDoor_7.doorState``) updates.
+
+    Args:
+        key: Raw key from the notification params
+
+    Returns:
+        The key's handler, or None if the key should be ignored
+    """
+    if key in _SKIPPED_KEYS:
+        return None
+
+    attribute = key.split(".")[1] if "." in key else key
+
+    for module, attributes in _MODULE_ATTRIBUTES:
+        if module in key:
+            # Other attributes of these modules are ignored
+            return attributes.get(attribute)
+
+    for module, field in _MODULE_FIELDS:
+        if module in key:
+            return (field, None)
+
+    return _UNHANDLED
 
 
 class WebSocketMessageParser:
-    """Parses WebSocket messages from Ryobi API."""
+    """Parses WebSocket messages from Ryobi API.
+
+    When given the device a message belongs to, the parser remembers the last
+    applied ``lastSet`` and value of every handled attribute. Replayed or
+    out-of-order notifications are dropped, and a ``lastValue`` of a state
+    attribute that doesn't match the remembered value marks the update for
+    a resync.
+    """
 
     def __init__(self):
         """Initialize the parser."""
-        pass
+        # device_id -> attribute key -> (lastSet, raw value)
+        self._applied: dict[str, dict[str, tuple[int | None, Any]]] = {}
+        self.stale_dropped = 0
+        self.gaps_detected = 0
+
+    def seed(self, device_id: str, stamps: abc.Mapping[str, tuple[int | None, Any]]) -> None:
+        """Remember attribute stamps from a full device state, e.g. the REST API.
+
+        Stamps older than what was already applied from notifications are ignored.
+
+        Args:
+            device_id: The device ID
+            stamps: (lastSet, value) per attribute key
+        """
+        applied = self._applied.setdefault(device_id, {})
+        for key, (last_set, value) in stamps.items():
+            if compile_key(key) is None:
+                continue
+            current = applied.get(key)
+            if current is None or current[0] is None or (last_set is not None and last_set >= current[0]):
+                applied[key] = (last_set, value)
+
+    def newer_fields(self, device_id: str, stamps: abc.Mapping[str, tuple[int | None, Any]]) -> set[str]:
+        """Return the fields notifications set more recently than a full device state.
+
+        Args:
+            device_id: The device ID
+            stamps: (lastSet, value) per attribute key of the full state
 
-    def parse_attribute_update(self, data: dict) -> dict[str, Any]:
+        Returns:
+            Fields whose applied ``lastSet`` is newer than the one in the stamps
+        """
+        applied = self._applied.get(device_id, {})
+        newer: set[str] = set()
+        for key, (last_set, _) in stamps.items():
+            current = applied.get(key)
+            if current is None or current[0] is None or last_set is None or current[0] <= last_set:
+                continue
+            handler = compile_key(key)
+            if handler is not None and handler[0] is not None:
+                newer.add(handler[0])
+        return newer
+
+    def forget(self, device_id: str) -> None:
+        """Drop everything remembered about a device.
+
+        Args:
+            device_id: The device ID
+        """
+        self._applied.pop(device_id, None)
+
+    def _accept(self, applied: dict, device_id: str, key: str, item: dict, updates: DeviceUpdate) -> bool:
+        """Check a notification item against the last applied one for its attribute.
+
+        Returns:
+            False if the item is stale or a duplicate and must be dropped
+        """
+        last_set = item.get("lastSet")
+        previous = applied.get(key)
+        if previous is not None:
+            previous_set, previous_value = previous
+            if last_set is not None and previous_set is not None and last_set <= previous_set:
+                self.stale_dropped += 1
+                log.debug("Dropping stale update for %s %s (lastSet %s <= %s)", device_id, key, last_set, previous_set)
+                return False
+            if (
+                "lastValue" in item
+                and item["lastValue"] != previous_value
+                and key.rpartition(".")[2] in _GAP_CHECKED_ATTRIBUTES
+            ):
+                self.gaps_detected += 1
+                updates.resync = True
+                log.warning(
+                    "Missed update for %s %s: expected lastValue %s, got %s",
+                    device_id,
+                    key,
+                    previous_value,
+                    item["lastValue"],
+                )
+        applied[key] = (last_set, item.get("value"))
+        return True
+
+    def parse_attribute_update(self, data: dict, device_id: str | None = None) -> DeviceUpdate:
         """Parse wskAttributeUpdateNtfy messages.
 
         Args:
             data: WebSocket message data
+            device_id: Device the message belongs to, enables stale update detection
 
         Returns:
-            Dictionary with parsed updates: {
-                'door_state': str,
-                'light_state': bool,
-                'battery_level': int,
-                'motion': int,
-                'vacation_mode': int,
-                'safety': int,
-                'park_assist': int,
-                'bt_speaker': int,
-                'inflator': int,
-                'fan': int,
-            }
+            DeviceUpdate with the attributes the message changed: door_state (str),
+            light_state (bool), battery_level (int), and door_position, motion, vacation_mode,
+            safety, park_assist, bt_speaker, inflator and fan (int)
         """
-        updates = {}
+        updates = DeviceUpdate()
 
         try:
-            if data.get("method") != "wskAttributeUpdateNtfy":
+            if data.get("method") != ATTRIBUTE_UPDATE_METHOD:
                 return updates
 
-            params = data.get("params", {})
+            applied = self._applied.setdefault(device_id, {}) if device_id else None
+            debug = log.isEnabledFor(logging.DEBUG)
+            for key, item in data.get("params", {}).items():
+                handler = compile_key(key)
+                if handler is None:
+                    continue
 
-            for key in params:
-                if key in ["topic", "varName", "id"]:
+                field, convert = handler
+                if isinstance(item, dict):
+                    value = item.get("value")
+                    if (
+                        field is not None
+                        and applied is not None
+                        and not self._accept(applied, device_id, key, item, updates)
+                    ):
+                        continue
+                else:
+                    value = item
+
+                if field is None:
+                    if debug:
+                        log.debug("Unhandled module update: %s = %s", key, value)
                     continue
 
-                log.debug("Websocket parsing update for item %s: %s", key, params[key])
+                if convert is not None:
+                    value = convert(value)
+                    if value is None:
+                        continue
 
-                # Extract module name from key (e.g., "garageDoor_1.doorState")
-                if "." in key:
-                    module_name = key.split(".")[1]
-                else:
-                    module_name = key
-
-                value = params[key].get("value") if isinstance(params[key], dict) else params[key]
-
-                # Garage Door updates
-                if "garageDoor" in key:
-                    if module_name == "doorState":
-                        door_state = DoorStates.to_string(value)
-                        if door_state != "unknown":
-                            updates["door_state"] = door_state
-                    elif module_name == "motionSensor":
-                        updates["motion"] = value
-                        log.debug("Motion sensor: %s", value)
-                    elif module_name == "vacationMode":
-                        updates["vacation_mode"] = value
-                        log.debug("Vacation mode: %s", value)
-                    elif module_name == "sensorFlag":
-                        updates["safety"] = value
-                        log.debug("Safety sensor: %s", value)
-
-                # Garage Light updates
-                elif "garageLight" in key:
-                    if module_name == "lightState":
-                        updates["light_state"] = bool(value)
-
-                # Battery updates
-                elif "backupCharger" in key:
-                    if module_name == "chargeLevel":
-                        updates["battery_level"] = int(value)
-
-                # Other modules
-                elif "parkAssistLaser" in key:
-                    updates["park_assist"] = value
-                    log.debug("Park assist: %s", value)
-                elif "btSpeaker" in key:
-                    updates["bt_speaker"] = value
-                    log.debug("Bluetooth speaker: %s", value)
-                elif "inflator" in key:
-                    updates["inflator"] = value
-                    log.debug("Inflator: %s", value)
-                elif "fan" in key:
-                    updates["fan"] = value
-                    log.debug("Fan: %s", value)
-                else:
-                    log.debug("Unhandled module update: %s = %s", key, value)
+                if debug:
+                    log.debug("Websocket update %s (%s): %s", field, key, value)
+                updates.set(field, value)
 
         except Exception as ex:
             log.error("Error parsing WebSocket message: %s", ex)
@@ -0,0 +1,185 @@
+"""Sharded pool of websocket connections to Ryobi servers."""
+
+from __future__ import annotations
+
+import math
+from collections import abc
+
+import aiohttp
+
+from ryobi_gdo_2_mqtt.logging import log
+from ryobi_gdo_2_mqtt.websocket import RyobiWebSocket
+
+DEFAULT_TOPICS_PER_CONNECTION = 50
+
+
+class RyobiWebSocketPool:
+    """Spread device subscriptions for one account across several websocket connections.
+
+    Each connection (shard) runs its own listen loop, so a dropped shard only
+    reconnects and resubscribes its own devices while the others keep streaming.
+    """
+
+    def __init__(
+        self,
+        callback_factory: abc.Callable[[abc.Callable[[], RyobiWebSocket]], abc.Callable],
+        username: str,
+        apikey: str,
+        session: aiohttp.ClientSession,
+        topics_per_connection: int = DEFAULT_TOPICS_PER_CONNECTION,
+        reauthenticate: abc.Callable[[str], abc.Awaitable[str | None]] | None = None,
+    ) -> None:
+        """Initialize the pool.
+
+        Args:
+            callback_factory: Builds a shard's callback from a getter returning that shard
+            username: Ryobi account username
+            apikey: Ryobi API key
+            session: aiohttp ClientSession
+            topics_per_connection: Maximum devices per connection, 0 for a single unbounded connection
+            reauthenticate: Called by a connection with a rejected API key, returns a new key or None
+        """
+        self._callback_factory = callback_factory
+        self._user = username
+        self._apikey = apikey
+        self.session = session
+        self.topics_per_connection = topics_per_connection
+        self.reauthenticate = reauthenticate
+        self._shards: list[RyobiWebSocket] = []
+
+    @property
+    def shards(self) -> list[RyobiWebSocket]:
+        """Return the pool's connections."""
+        return list(self._shards)
+
+    @property
+    def devices(self) -> list[str]:
+        """Return every device in the pool."""
+        return [device_id for shard in self._shards for device_id in shard.devices]
+
+    def shard_for(self, device_id: str) -> RyobiWebSocket | None:
+        """Return the connection carrying a device, if any."""
+        for shard in self._shards:
+            if device_id in shard.devices:
+                return shard
+        return None
+
+    def _has_capacity(self, shard: RyobiWebSocket) -> bool:
+        """Return whether a shard can take another device."""
+        return self.topics_per_connection <= 0 or len(shard.devices) < self.topics_per_connection
+
+    def _create_shard(self) -> RyobiWebSocket:
+        """Create a new, empty connection."""
+        shard: RyobiWebSocket | None = None
+        shard = RyobiWebSocket(
+            callback=self._callback_factory(lambda: shard),
+            username=self._user,
+            apikey=self._apikey,
+            device=None,
+            session=self.session,
+            reauthenticate=self.reauthenticate,
+        )
+        self._shards.append(shard)
+        log.debug("Created websocket shard %d for %s", len(self._shards), self._user)
+        return shard
+
+    async def add_device(self, device_id: str) -> RyobiWebSocket:
+        """Assign a device to the least loaded connection with room for it.
+
+        Args:
+            device_id: The device ID to subscribe to
+
+        Returns:
+            The connection the device was assigned to, which may be newly created
+            and not yet listening
+        """
+        shard = self.shard_for(device_id)
+        if shard is not None:
+            return shard
+
+        candidates = [shard for shard in self._shards if self._has_capacity(shard)]
+        if candidates:
+            shard = min(candidates, key=lambda candidate: len(candidate.devices))
+        else:
+            shard = self._create_shard()
+
+        await shard.add_device(device_id)
+        return shard
+
+    async def remove_device(self, device_id: str) -> None:
+        """Remove a device from the pool and rebalance the remaining devices.
+
+        Args:
+            device_id: The device ID to remove
+        """
+        shard = self.shard_for(device_id)
+        if shard is None:
+            return
+        await shard.remove_device(device_id)
+        await self.rebalance()
+
+    async def rebalance(self) -> None:
+        """Fold under-used connections into the others and even out the rest.
+
+        The pool shrinks to the fewest connections that fit every device, then
+        devices are moved from the busiest connection to the idlest until no
+        connection carries more than one device over another. A moved device is
+        unsubscribed on its old connection before it is subscribed on the new
+        one, so no two connections stream it at once.
+        """
+        device_count = len(self.devices)
+        if self.topics_per_connection <= 0:
+            target = min(1, device_count)
+        else:
+            target = math.ceil(device_count / self.topics_per_connection)
+
+        while len(self._shards) > target:
+            # Prefer retiring the newest of equally loaded connections
+            retiring = min(reversed(self._shards), key=lambda shard: len(shard.devices))
+            self._shards.remove(retiring)
+
+            for device_id in retiring.devices:
+                await retiring.remove_device(device_id)
+                shard = min(
+                    (shard for shard in self._shards if self._has_capacity(shard)),
+                    key=lambda candidate: len(candidate.devices),
+                )
+                await shard.add_device(device_id)
+                log.debug("Moved device %s to another websocket shard", device_id)
+
+            await retiring.close()
+            log.info("Retired websocket shard for %s, %d remaining", self._user, len(self._shards))
+
+        while len(self._shards) > 1:
+            busiest = max(self._shards, key=lambda shard: len(shard.devices))
+            idlest = min(self._shards, key=lambda shard: len(shard.devices))
+            if len(busiest.devices) - len(idlest.devices) <= 1:
+                break
+            device_id = busiest.devices[-1]
+            await busiest.remove_device(device_id)
+            await idlest.add_device(device_id)
+            log.debug("Moved device %s to a less loaded websocket shard", device_id)
+
+    async def send_message(self, port_id, module_type, attribute: str, value, device_id: str | None = None):
+        """Send a command over the connection carrying the device.
+
+        Args:
+            port_id: Module port ID
+            module_type: Module type ID
+            attribute: Module attribute to set
+            value: Value to set
+            device_id: Target device
+
+        Returns:
+            True once the server acknowledged the command
+        """
+        shard = self.shard_for(device_id) if device_id else None
+        if shard is None:
+            log.warning("No websocket connection carries device %s, unable to send command.", device_id)
+            return False
+        return await shard.send_message(port_id, module_type, attribute, value, device_id=device_id)
+
+    async def close(self) -> None:
+        """Close every connection in the pool."""
+        for shard in self._shards:
+            await shard.close()
@@ -0,0 +1,59 @@
+"""Micro-benchmark for WebSocketMessageParser.
+
+Replays the recorded ``ws_message_*.json`` fixtures through the parser and
+reports messages per second. Not collected by pytest; run it directly:
+
+    python src/tests/bench_websocket_parser.py [--seconds 2]
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from ryobi_gdo_2_mqtt.websocket_parser import WebSocketMessageParser
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_messages() -> list[dict]:
+    """Load every recorded websocket message fixture."""
+    messages = []
+    for path in sorted(FIXTURES_DIR.glob("ws_message_*.json")):
+        with open(path) as f:
+            messages.append(json.load(f))
+    return messages
+
+
+def run(seconds: float) -> float:
+    """Parse the fixtures repeatedly for about ``seconds`` and return messages per second."""
+    parser = WebSocketMessageParser()
+    messages = load_messages()
+    parsed = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            for message in messages:
+                parser.parse_attribute_update(message)
+        parsed += 1000 * len(messages)
+    return parsed / (time.perf_counter() - started)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--seconds", type=float, default=2.0, help="How long to run each round")
+    arg_parser.add_argument("--rounds", type=int, default=5, help="Number of rounds, the best is reported")
+    args = arg_parser.parse_args()
+
+    # Measure the parsing itself, not log formatting
+    logging.getLogger("ryobi_gdo_2_mqtt").setLevel(logging.INFO)
+
+    best = max(run(args.seconds) for _ in range(args.rounds))
+    print(f"{len(load_messages())} fixtures, best of {args.rounds}: {best:,.0f} msgs/sec")
+
+
+if __name__ == "__main__":
+    main()
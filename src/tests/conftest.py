@@ -2,8 +2,12 @@
 
 import json
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
+from ha_mqtt_discoverable.sensors import BinarySensor, Number, Sensor, Switch
+
+from ryobi_gdo_2_mqtt.device_manager import Cover
 
 
 @pytest.fixture
@@ -16,3 +20,39 @@ def load_fixture(fixtures_dir: Path, filename: str) -> dict:
     """Load a JSON fixture file."""
     with open(fixtures_dir / filename) as f:
         return json.load(f)
+
+
+@pytest.fixture
+def entity_classes():
+    """Build entities from a mock per entity class, so no entity connects to a broker."""
+    return {entity_class: MagicMock() for entity_class in (Cover, Switch, BinarySensor, Sensor, Number)}
+
+
+@pytest.fixture
+def mock_cover(entity_classes):
+    """Mock covers are built from."""
+    return entity_classes[Cover]
+
+
+@pytest.fixture
+def mock_switch(entity_classes):
+    """Mock switches are built from."""
+    return entity_classes[Switch]
+
+
+@pytest.fixture
+def mock_binary_sensor(entity_classes):
+    """Mock binary sensors are built from."""
+    return entity_classes[BinarySensor]
+
+
+@pytest.fixture
+def mock_sensor(entity_classes):
+    """Mock sensors are built from."""
+    return entity_classes[Sensor]
+
+
+@pytest.fixture
+def mock_number(entity_classes):
+    """Mock numbers are built from."""
+    return entity_classes[Number]
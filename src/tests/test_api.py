@@ -1,12 +1,20 @@
 """Tests for Ryobi API client."""
 
-from unittest.mock import AsyncMock, MagicMock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from aiohttp import ClientSession
 
+from ryobi_gdo_2_mqtt import codec
 from ryobi_gdo_2_mqtt.api import RyobiApiClient
-from ryobi_gdo_2_mqtt.exceptions import RyobiAuthenticationError, RyobiDeviceNotFoundError, RyobiInvalidResponseError
+from ryobi_gdo_2_mqtt.cache import ApiKeyCache
+from ryobi_gdo_2_mqtt.exceptions import (
+    RyobiAuthenticationError,
+    RyobiConnectionError,
+    RyobiDeviceNotFoundError,
+    RyobiInvalidResponseError,
+)
 from tests.conftest import load_fixture
 
 
@@ -89,6 +97,18 @@ class TestRyobiApiClient:
         assert device_data.battery_level == 0
         assert device_data.device_name == "Acura"
 
+    @pytest.mark.asyncio
+    async def test_update_device_records_attribute_stamps(self, api_client, fixtures_dir):
+        """Test that update_device keeps lastSet and value per websocket attribute key."""
+        mock_response = load_fixture(fixtures_dir, "device_update_c4be84986d2e.json")
+        api_client._process_request = AsyncMock(return_value=mock_response)
+
+        await api_client.update_device("c4be84986d2e")
+
+        stamps = api_client.attribute_stamps("c4be84986d2e")
+        assert stamps["garageDoor_7.doorState"] == (1762949612498, 0)
+        assert api_client.attribute_stamps("unknown") == {}
+
     @pytest.mark.asyncio
     async def test_update_device_indexes_modules(self, api_client, fixtures_dir):
         """Test that update_device correctly indexes modules."""
@@ -134,6 +154,20 @@ class TestRyobiApiClient:
 
         assert port_id is None
 
+    @pytest.mark.asyncio
+    async def test_device_modules_lists_indexed_modules(self, api_client, fixtures_dir):
+        """Test that only the modules present in the device type map are listed."""
+        mock_response = load_fixture(fixtures_dir, "device_update_c4be84986d2e.json")
+        api_client._process_request = AsyncMock(return_value=mock_response)
+        await api_client.update_device("c4be84986d2e")
+
+        modules = api_client.device_modules("c4be84986d2e")
+
+        assert "garageDoor" in modules
+        assert "garageLight" in modules
+        assert "fan" not in modules
+        assert api_client.device_modules("unknown_device") == []
+
     def test_get_module_type_returns_correct_type(self, api_client):
         """Test getting module type ID."""
         assert api_client.get_module_type("garageDoor") == 5
@@ -146,6 +180,216 @@ class TestRyobiApiClient:
         assert api_client.get_module_type("unknownModule") is None
 
 
+class TestRequestCoalescing:
+    """Tests for sharing and rate limiting REST requests."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_request(self, api_client):
+        """Test that concurrent callers of the same request get one result."""
+        release = asyncio.Event()
+
+        async def send(url, method, data):
+            await release.wait()
+            return {"result": url}
+
+        api_client._send_request = AsyncMock(side_effect=send)
+
+        requests = [asyncio.create_task(api_client._process_request("https://a/1", "get", {})) for _ in range(3)]
+        other = asyncio.create_task(api_client._process_request("https://a/2", "get", {}))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*requests) == [{"result": "https://a/1"}] * 3
+        assert await other == {"result": "https://a/2"}
+        assert api_client._send_request.await_count == 2
+        assert api_client.request_stats.coalesced == 2
+        assert api_client._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_sequential_requests_are_not_shared(self, api_client):
+        """Test that a finished request is sent again by the next caller."""
+        api_client._send_request = AsyncMock(return_value={"result": []})
+
+        await api_client._process_request("https://a/1", "get", {})
+        await api_client._process_request("https://a/1", "get", {})
+
+        assert api_client._send_request.await_count == 2
+        assert api_client.request_stats.coalesced == 0
+
+    @pytest.mark.asyncio
+    async def test_shared_request_failure_reaches_every_caller(self, api_client):
+        """Test that a failed request raises for every caller sharing it."""
+        release = asyncio.Event()
+
+        async def send(url, method, data):
+            await release.wait()
+            raise RyobiConnectionError("offline")
+
+        api_client._send_request = AsyncMock(side_effect=send)
+
+        requests = [asyncio.create_task(api_client._process_request("https://a/1", "get", {})) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*requests, return_exceptions=True)
+
+        assert all(isinstance(result, RyobiConnectionError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_request(self, api_client):
+        """Test that the remaining callers still get the result when one is cancelled."""
+        release = asyncio.Event()
+
+        async def send(url, method, data):
+            await release.wait()
+            return {"result": "ok"}
+
+        api_client._send_request = AsyncMock(side_effect=send)
+
+        first = asyncio.create_task(api_client._process_request("https://a/1", "get", {}))
+        second = asyncio.create_task(api_client._process_request("https://a/1", "get", {}))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == {"result": "ok"}
+        assert first.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_counts_throttled_requests(self, mock_session):
+        """Test that requests waiting on the rate limiter are counted."""
+        limiter = MagicMock()
+        limiter.acquire = AsyncMock(side_effect=[0.0, 0.5])
+        client = RyobiApiClient("test@example.com", "testpass", mock_session, rate_limiter=limiter)
+        response = MagicMock(status=200)
+        response.read = AsyncMock(return_value=b'{"result": []}')
+        mock_session.get = MagicMock()
+        mock_session.get.return_value.__aenter__ = AsyncMock(return_value=response)
+        mock_session.get.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        await client._process_request("https://a/1", "get", {})
+        await client._process_request("https://a/1", "get", {})
+
+        assert client.request_stats.sent == 2
+        assert client.request_stats.throttled == 1
+        assert client.request_stats.throttled_seconds == 0.5
+
+
+class TestResponseDecoding:
+    """Tests for decoding REST responses."""
+
+    @staticmethod
+    def respond(session, body: bytes, status: int = 200):
+        """Make the session's GET answer with a body."""
+        response = MagicMock(status=status)
+        response.read = AsyncMock(return_value=body)
+        session.get = MagicMock()
+        session.get.return_value.__aenter__ = AsyncMock(return_value=response)
+        session.get.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    @pytest.mark.asyncio
+    async def test_device_response_decoded_off_loop(self, api_client, mock_session, fixtures_dir):
+        """Test that a full device state is decoded from bytes in a worker thread."""
+        body = (fixtures_dir / "device_update_c4be84986d2e.json").read_bytes()
+        assert len(body) > codec.OFFLOAD_SIZE
+        self.respond(mock_session, body)
+
+        with patch("ryobi_gdo_2_mqtt.codec.asyncio.to_thread", wraps=asyncio.to_thread) as mock_to_thread:
+            reply = await api_client._process_request("https://a/device", "get", {})
+
+        mock_to_thread.assert_called_once()
+        assert reply == load_fixture(fixtures_dir, "device_update_c4be84986d2e.json")
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_response(self, api_client, mock_session):
+        """Test that a body that is not JSON is rejected."""
+        self.respond(mock_session, b"<html>Bad Gateway</html>")
+
+        with pytest.raises(RyobiInvalidResponseError, match="Invalid JSON response: <html>Bad Gateway</html>"):
+            await api_client._process_request("https://a/device", "get", {})
+
+    @pytest.mark.asyncio
+    async def test_non_object_response(self, api_client, mock_session):
+        """Test that a JSON body that is not an object is rejected."""
+        self.respond(mock_session, b"[1, 2]")
+
+        with pytest.raises(RyobiInvalidResponseError, match="Response is not a dictionary"):
+            await api_client._process_request("https://a/device", "get", {})
+
+    @pytest.mark.asyncio
+    async def test_http_error_response(self, api_client, mock_session):
+        """Test that an error status is rejected even with a JSON body."""
+        self.respond(mock_session, b'{"result": "error"}', status=500)
+
+        with pytest.raises(RyobiInvalidResponseError, match="HTTP error 500"):
+            await api_client._process_request("https://a/device", "get", {})
+
+
+class TestApiKeyCaching:
+    """Tests for reusing the API key between restarts."""
+
+    @pytest.fixture
+    def cached_client(self, mock_session, tmp_path):
+        """Create an API client with a key cache."""
+        return RyobiApiClient(
+            username="test@example.com",
+            password="testpass",
+            session=mock_session,
+            key_cache=ApiKeyCache(tmp_path / "api_key.json"),
+        )
+
+    def test_use_cached_api_key_without_cache(self, api_client):
+        """Test that no key is used when caching is disabled."""
+        assert api_client.use_cached_api_key() is False
+        assert api_client.api_key is None
+
+    def test_use_cached_api_key_empty_cache(self, cached_client):
+        """Test that nothing is used before a key was cached."""
+        assert cached_client.use_cached_api_key() is False
+        assert cached_client.api_key is None
+
+    @pytest.mark.asyncio
+    async def test_get_api_key_stores_in_cache(self, cached_client, fixtures_dir):
+        """Test that a login is cached and reused by the next client."""
+        cached_client._process_request = AsyncMock(return_value=load_fixture(fixtures_dir, "login_response.json"))
+
+        await cached_client.get_api_key()
+
+        restarted = RyobiApiClient("test@example.com", "testpass", MagicMock(), key_cache=cached_client.key_cache)
+        assert restarted.use_cached_api_key() is True
+        assert restarted.api_key == "1234567890"
+
+    @pytest.mark.asyncio
+    async def test_refresh_api_key_logs_in_again(self, cached_client, fixtures_dir):
+        """Test that a rejected key is replaced by a fresh login."""
+        cached_client.key_cache.store("test@example.com", "stale")
+        cached_client.use_cached_api_key()
+        cached_client._process_request = AsyncMock(return_value=load_fixture(fixtures_dir, "login_response.json"))
+
+        assert await cached_client.refresh_api_key("stale") == "1234567890"
+        assert cached_client.key_cache.load("test@example.com") == "1234567890"
+
+    @pytest.mark.asyncio
+    async def test_refresh_api_key_single_flight(self, cached_client, fixtures_dir):
+        """Test that connections rejected with the same key share one login."""
+        cached_client.api_key = "stale"
+        cached_client._process_request = AsyncMock(return_value=load_fixture(fixtures_dir, "login_response.json"))
+
+        keys = await asyncio.gather(*(cached_client.refresh_api_key("stale") for _ in range(3)))
+
+        assert keys == ["1234567890"] * 3
+        cached_client._process_request.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_refresh_api_key_login_failure(self, cached_client):
+        """Test that a failed login clears the cache and returns None."""
+        cached_client.key_cache.store("test@example.com", "stale")
+        cached_client.use_cached_api_key()
+        cached_client._process_request = AsyncMock(return_value=None)
+
+        assert await cached_client.refresh_api_key("stale") is None
+        assert cached_client.key_cache.load("test@example.com") is None
+
+
 class TestApiClientModuleConfig:
     """Tests for API client module configuration integration."""
 
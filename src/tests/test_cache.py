@@ -0,0 +1,103 @@
+"""Tests for the on-disk caches."""
+
+import json
+import stat
+
+from ryobi_gdo_2_mqtt.cache import CACHE_FILE_MODE, ApiKeyCache, DeviceSnapshot, DeviceSnapshotCache
+
+
+class TestApiKeyCache:
+    """Tests for ApiKeyCache."""
+
+    def test_store_and_load(self, tmp_path):
+        """Test that a stored key is loaded back for the same account."""
+        cache = ApiKeyCache(tmp_path / "api_key.json")
+
+        cache.store("test@example.com", "1234567890", created_date="2024-01-01")
+
+        assert cache.load("test@example.com") == "1234567890"
+        entry = json.loads((tmp_path / "api_key.json").read_text())
+        assert entry["created_date"] == "2024-01-01"
+        assert "cached_at" in entry
+
+    def test_store_is_owner_only(self, tmp_path):
+        """Test that the cache file is only readable by its owner."""
+        cache = ApiKeyCache(tmp_path / "api_key.json")
+
+        cache.store("test@example.com", "1234567890")
+
+        assert stat.S_IMODE((tmp_path / "api_key.json").stat().st_mode) == CACHE_FILE_MODE
+        assert not (tmp_path / ".api_key.json.tmp").exists()
+
+    def test_store_creates_parent_directory(self, tmp_path):
+        """Test that a missing cache directory is created."""
+        cache = ApiKeyCache(tmp_path / "state" / "api_key.json")
+
+        cache.store("test@example.com", "1234567890")
+
+        assert cache.load("test@example.com") == "1234567890"
+
+    def test_load_missing_file(self, tmp_path):
+        """Test that nothing is loaded before a key was stored."""
+        assert ApiKeyCache(tmp_path / "api_key.json").load("test@example.com") is None
+
+    def test_load_other_account(self, tmp_path):
+        """Test that a key cached for another account is ignored."""
+        cache = ApiKeyCache(tmp_path / "api_key.json")
+        cache.store("other@example.com", "1234567890")
+
+        assert cache.load("test@example.com") is None
+
+    def test_load_corrupt_file(self, tmp_path):
+        """Test that an unreadable cache file is ignored."""
+        (tmp_path / "api_key.json").write_text("not json")
+
+        assert ApiKeyCache(tmp_path / "api_key.json").load("test@example.com") is None
+
+    def test_clear(self, tmp_path):
+        """Test that clearing removes the cached key."""
+        cache = ApiKeyCache(tmp_path / "api_key.json")
+        cache.store("test@example.com", "1234567890")
+
+        cache.clear()
+        cache.clear()
+
+        assert cache.load("test@example.com") is None
+
+
+class TestDeviceSnapshotCache:
+    """Tests for DeviceSnapshotCache."""
+
+    def test_store_and_load(self, tmp_path):
+        """Test that a stored snapshot is loaded back for the same account."""
+        cache = DeviceSnapshotCache(tmp_path / "devices.json")
+        snapshot = DeviceSnapshot(
+            devices={"c4be84986d2e": "Acura"},
+            modules={"c4be84986d2e": {"garageDoor": "garageDoor_7"}},
+            states={"c4be84986d2e": {"door_state": "closed", "safety": 2}},
+        )
+
+        cache.store("test@example.com", snapshot)
+
+        assert cache.load("test@example.com") == snapshot
+        assert stat.S_IMODE((tmp_path / "devices.json").stat().st_mode) == CACHE_FILE_MODE
+
+    def test_load_other_account(self, tmp_path):
+        """Test that a snapshot cached for another account is ignored."""
+        cache = DeviceSnapshotCache(tmp_path / "devices.json")
+        cache.store("other@example.com", DeviceSnapshot(devices={"a": "A"}, modules={"a": {}}))
+
+        assert cache.load("test@example.com") is None
+
+    def test_load_requires_module_index_of_every_device(self, tmp_path):
+        """Test that a snapshot missing a device's modules is not used."""
+        cache = DeviceSnapshotCache(tmp_path / "devices.json")
+        cache.store("test@example.com", DeviceSnapshot(devices={"a": "A", "b": "B"}, modules={"a": {}}))
+
+        assert cache.load("test@example.com") is None
+
+    def test_load_malformed_file(self, tmp_path):
+        """Test that a snapshot with the wrong shape is ignored."""
+        (tmp_path / "devices.json").write_text(json.dumps({"username": "test@example.com", "devices": []}))
+
+        assert DeviceSnapshotCache(tmp_path / "devices.json").load("test@example.com") is None
@@ -0,0 +1,70 @@
+"""Tests for websocket frame and REST response decoding."""
+
+from unittest.mock import patch
+
+import pytest
+
+from ryobi_gdo_2_mqtt import codec
+from ryobi_gdo_2_mqtt.constants import MessageKind
+from tests.conftest import load_fixture
+
+
+class TestLoads:
+    """Tests for loads."""
+
+    def test_loads_bytes_and_str(self):
+        """Test that frames decode the same from bytes and str."""
+        assert codec.loads(b'{"id": 3, "result": {"result": "OK"}}') == {"id": 3, "result": {"result": "OK"}}
+        assert codec.loads('{"id": 3}') == {"id": 3}
+
+    def test_loads_invalid(self):
+        """Test that invalid frames raise the backend's decode error."""
+        with pytest.raises(codec.DecodeError):
+            codec.loads(b"{not json")
+
+
+class TestLoadsOffloaded:
+    """Tests for loads_offloaded."""
+
+    @pytest.mark.asyncio
+    async def test_small_document_decoded_inline(self):
+        """Test that small documents don't pay for a thread hop."""
+        with patch("ryobi_gdo_2_mqtt.codec.asyncio.to_thread") as mock_to_thread:
+            assert await codec.loads_offloaded(b'{"result": []}') == {"result": []}
+
+        mock_to_thread.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_large_document_decoded_in_thread(self):
+        """Test that documents above the threshold are decoded in a worker thread."""
+        data = b'{"result": "' + b"x" * 100 + b'"}'
+
+        with patch("ryobi_gdo_2_mqtt.codec.asyncio.to_thread", wraps=codec.asyncio.to_thread) as mock_to_thread:
+            assert await codec.loads_offloaded(data, offload_size=64) == {"result": "x" * 100}
+
+        mock_to_thread.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_invalid_document(self):
+        """Test that invalid documents raise the backend's decode error from the thread too."""
+        with pytest.raises(codec.DecodeError):
+            await codec.loads_offloaded(b"{not json" * 10, offload_size=8)
+
+
+class TestClassify:
+    """Tests for classify."""
+
+    def test_response(self, fixtures_dir):
+        """Test that RPC acknowledgements are classified as responses."""
+        assert codec.classify(load_fixture(fixtures_dir, "ws_message_1762952686.json")) == MessageKind.RESPONSE
+        assert codec.classify({"id": 4, "error": {"code": -1}}) == MessageKind.RESPONSE
+
+    def test_notification(self, fixtures_dir):
+        """Test that attribute updates are classified as notifications."""
+        assert codec.classify(load_fixture(fixtures_dir, "ws_message_1762952732.json")) == MessageKind.NOTIFICATION
+
+    def test_unknown(self):
+        """Test that other methods and non-objects are unknown."""
+        assert codec.classify({"method": "srvPing", "params": {}}) == MessageKind.UNKNOWN
+        assert codec.classify({"id": 1}) == MessageKind.UNKNOWN
+        assert codec.classify([1, 2]) == MessageKind.UNKNOWN
@@ -0,0 +1,134 @@
+"""Tests for the per-device command scheduler."""
+
+import asyncio
+from unittest.mock import AsyncMock, call
+
+import pytest
+
+from ryobi_gdo_2_mqtt.command_scheduler import CommandScheduler
+
+
+async def settle(scheduler: CommandScheduler) -> None:
+    """Wait until every pending command was sent."""
+    while len(scheduler):
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+
+
+class TestCommandScheduler:
+    """Tests for CommandScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_commands_collapse_to_latest(self):
+        """Test that pending commands for the same port and attribute send only the latest value."""
+        send = AsyncMock(return_value=True)
+        scheduler = CommandScheduler(send, spacing=0)
+
+        for speed in (10, 20, 30):
+            scheduler.submit(3, 3, "speed", speed)
+        scheduler.submit(7, 5, "lightState", 1)
+        await settle(scheduler)
+        await scheduler.close()
+
+        assert send.mock_calls == [call(3, 3, "speed", 30), call(7, 5, "lightState", 1)]
+        assert scheduler.stats["speed"].queued == 3
+        assert scheduler.stats["speed"].coalesced == 2
+        assert scheduler.stats["speed"].sent == 1
+
+    @pytest.mark.asyncio
+    async def test_door_commands_go_first(self):
+        """Test that a door command queued behind other commands is sent before them."""
+        send = AsyncMock(return_value=True)
+        scheduler = CommandScheduler(send, spacing=0.05)
+
+        scheduler.submit(3, 3, "speed", 10)
+        # The first command is sent right away, the rest wait for the spacing
+        await asyncio.sleep(0)
+        scheduler.submit(1, 1, "moduleState", 1)
+        scheduler.submit(3, 3, "speed", 40)
+        scheduler.submit(7, 5, "doorCommand", 2)
+        await settle(scheduler)
+        await scheduler.close()
+
+        assert send.mock_calls == [
+            call(3, 3, "speed", 10),
+            call(7, 5, "doorCommand", 2),
+            call(1, 1, "moduleState", 1),
+            call(3, 3, "speed", 40),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_commands_spaced(self):
+        """Test that commands are at least the spacing apart and their wait is recorded."""
+        sent_at = []
+        loop = asyncio.get_running_loop()
+        send = AsyncMock(side_effect=lambda *args: sent_at.append(loop.time()))
+        scheduler = CommandScheduler(send, spacing=0.05)
+
+        scheduler.submit(7, 5, "lightState", 1)
+        scheduler.submit(7, 5, "doorCommand", 1)
+        await settle(scheduler)
+        await scheduler.close()
+
+        assert sent_at[1] - sent_at[0] >= 0.045
+        assert scheduler.stats["lightState"].max_wait >= 0.045
+        assert scheduler.stats["doorCommand"].mean_wait < 0.045
+
+    @pytest.mark.asyncio
+    async def test_failed_command_does_not_stop_worker(self):
+        """Test that a failing or unsent command is counted and later commands are still sent."""
+        send = AsyncMock(side_effect=[RuntimeError("connection lost"), False, True])
+        scheduler = CommandScheduler(send, spacing=0)
+
+        scheduler.submit(7, 5, "doorCommand", 1)
+        await settle(scheduler)
+        scheduler.submit(7, 5, "doorCommand", 0)
+        await settle(scheduler)
+        scheduler.submit(7, 5, "doorCommand", 2)
+        await settle(scheduler)
+        await scheduler.close()
+
+        assert send.call_count == 3
+        assert scheduler.stats["doorCommand"].failed == 2
+        assert scheduler.stats["doorCommand"].sent == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_ack_does_not_hold_back_next_command(self):
+        """Test that a command waiting for its ack doesn't delay the next one past the spacing."""
+        acked = asyncio.Event()
+
+        async def send(port_id, module_type, attribute, value):
+            if attribute == "lightState":
+                await acked.wait()
+            return True
+
+        send = AsyncMock(side_effect=send)
+        scheduler = CommandScheduler(send, spacing=0.01)
+
+        scheduler.submit(7, 5, "lightState", 1)
+        await asyncio.sleep(0)
+        scheduler.submit(7, 5, "doorCommand", 1)
+        await settle(scheduler)
+
+        assert send.mock_calls == [call(7, 5, "lightState", 1), call(7, 5, "doorCommand", 1)]
+        assert scheduler.stats["doorCommand"].sent == 1
+        assert scheduler.stats["lightState"].sent == 0
+
+        acked.set()
+        await asyncio.sleep(0)
+        assert scheduler.stats["lightState"].sent == 1
+        await scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drops_pending(self):
+        """Test that closing drops the commands still waiting."""
+        send = AsyncMock(return_value=True)
+        scheduler = CommandScheduler(send, spacing=10)
+
+        scheduler.submit(7, 5, "lightState", 1)
+        await asyncio.sleep(0.01)
+        scheduler.submit(7, 5, "lightState", 0)
+        await scheduler.close()
+
+        send.assert_called_once_with(7, 5, "lightState", 1)
+        assert len(scheduler) == 0
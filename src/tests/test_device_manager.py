@@ -1,10 +1,29 @@
 """Tests for device manager."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import functools
+import threading
+from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import pytest
 
-from ryobi_gdo_2_mqtt.device_manager import DeviceManager, RyobiDevice
+from ryobi_gdo_2_mqtt.cache import DeviceSnapshot
+from ryobi_gdo_2_mqtt.command_scheduler import CommandScheduler
+from ryobi_gdo_2_mqtt.device_manager import (
+    ENTITIES,
+    ENTITIES_BY_FIELD,
+    ENTITIES_BY_NAME,
+    MODULE_ENTITIES,
+    MODULES,
+    DeviceManager,
+    PublishStats,
+    RyobiDevice,
+)
+from ryobi_gdo_2_mqtt.exceptions import RyobiApiError
+from ryobi_gdo_2_mqtt.metrics import StartupMetrics
+from ryobi_gdo_2_mqtt.models import UPDATE_FIELDS, DeviceUpdate
+from ryobi_gdo_2_mqtt.outbox import StateOutbox
+from ryobi_gdo_2_mqtt.websocket_parser import WebSocketMessageParser
 from tests.conftest import load_fixture
 
 
@@ -22,6 +41,7 @@ def mock_api_client():
     client = MagicMock()
     client.get_module = MagicMock(return_value=7)
     client.get_module_type = MagicMock(return_value=5)
+    client.device_modules = MagicMock(return_value=list(MODULE_ENTITIES))
     return client
 
 
@@ -42,11 +62,15 @@ def device_manager(mock_mqtt_settings, mock_api_client):
 class TestRyobiDevice:
     """Tests for RyobiDevice."""
 
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
     def test_device_initialization(
-        self, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client
+        self,
+        mock_binary_sensor,
+        mock_switch,
+        mock_cover,
+        mock_mqtt_settings,
+        mock_websocket,
+        mock_api_client,
+        entity_classes,
     ):
         """Test device initialization creates all entities."""
         import asyncio
@@ -60,6 +84,7 @@ class TestRyobiDevice:
             websocket=mock_websocket,
             api_client=mock_api_client,
             loop=loop,
+            entity_classes=entity_classes,
         )
 
         assert device.device_id == "test_device"
@@ -70,12 +95,7 @@ class TestRyobiDevice:
 
         loop.close()
 
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
-    def test_update_door_state(
-        self, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client
-    ):
+    def test_update_door_state(self, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes):
         """Test updating door state."""
         import asyncio
 
@@ -91,25 +111,21 @@ class TestRyobiDevice:
             websocket=mock_websocket,
             api_client=mock_api_client,
             loop=loop,
+            entity_classes=entity_classes,
         )
 
         # Reset mock after initialization
         mock_cover_instance.reset_mock()
 
-        device.update_door_state("open")
+        device.update("door_state", "open")
         mock_cover_instance.open.assert_called_once()
 
-        device.update_door_state("closed")
+        device.update("door_state", "closed")
         mock_cover_instance.closed.assert_called_once()
 
         loop.close()
 
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
-    def test_update_light_state(
-        self, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client
-    ):
+    def test_update_light_state(self, mock_switch, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes):
         """Test updating light state."""
         import asyncio
 
@@ -125,24 +141,22 @@ class TestRyobiDevice:
             websocket=mock_websocket,
             api_client=mock_api_client,
             loop=loop,
+            entity_classes=entity_classes,
         )
 
         # Reset mock after initialization
         mock_switch_instance.reset_mock()
 
-        device.update_light_state(True)
+        device.update("light_state", True)
         mock_switch_instance.on.assert_called_once()
 
-        device.update_light_state(False)
+        device.update("light_state", False)
         mock_switch_instance.off.assert_called_once()
 
         loop.close()
 
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
     def test_update_battery_level(
-        self, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client
+        self, mock_binary_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
     ):
         """Test updating battery level."""
         import asyncio
@@ -159,18 +173,419 @@ class TestRyobiDevice:
             websocket=mock_websocket,
             api_client=mock_api_client,
             loop=loop,
+            entity_classes=entity_classes,
         )
 
         # Low battery
-        device.update_battery_level(15)
+        device.update("battery_level", 15)
         mock_battery_instance.on.assert_called_once()
 
         # Normal battery
-        device.update_battery_level(75)
+        device.update("battery_level", 75)
         mock_battery_instance.off.assert_called_once()
 
         loop.close()
 
+    def test_unchanged_states_are_not_republished(
+        self, mock_cover, mock_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that repeating the last published state is suppressed."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            entity_classes=entity_classes,
+        )
+        cover = mock_cover.return_value
+        wifi = mock_sensor.return_value
+
+        # The initial closed state was already published while creating the entities
+        device.update("door_state", "closed")
+        device.update("wifi_rssi", -60)
+        device.update("wifi_rssi", -60)
+        device.update("wifi_rssi", -61)
+
+        cover.closed.assert_called_once()
+        assert [call.args for call in wifi.set_state.call_args_list] == [(-60,), (-61,)]
+        assert device.publish_stats.suppressed == 2
+        assert device.publish_stats.sent == 5
+
+        loop.close()
+
+    def test_publisher_receives_publishes(
+        self, mock_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that a device with a publisher hands publishes over instead of making them."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        publisher = MagicMock()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            modules=["wifiModule"],
+            publisher=publisher,
+            entity_classes=entity_classes,
+        )
+        wifi = mock_sensor.return_value
+
+        device.update("wifi_rssi", -60)
+        device.update("wifi_rssi", -60)
+
+        publisher.submit.assert_called_once_with(wifi.set_state, -60)
+        wifi.set_state.assert_not_called()
+
+        loop.close()
+
+    def test_outbox_holds_states_while_disconnected(
+        self, mock_switch, mock_cover, mock_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that states published while disconnected are held and published door first on flush."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        client = MagicMock()
+        client.is_connected.return_value = False
+        cover = mock_cover.return_value
+        cover.state_topic = "door/state"
+        wifi = mock_sensor.return_value
+        wifi.state_topic = "wifi/state"
+        mock_switch.return_value.state_topic = "vacation/state"
+        outbox = StateOutbox()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings.model_copy(update={"client": client}),
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            modules=["wifiModule", "garageDoor"],
+            outbox=outbox,
+            entity_classes=entity_classes,
+        )
+
+        device.update("wifi_rssi", -60)
+        device.update("wifi_rssi", -61)
+        device.update("door_state", "open")
+
+        assert len(outbox) == 3
+        cover.open.assert_not_called()
+        wifi.set_state.assert_not_called()
+
+        order = MagicMock()
+        order.attach_mock(cover.open, "open")
+        order.attach_mock(cover.closed, "closed")
+        order.attach_mock(wifi.set_state, "set_state")
+        order.attach_mock(mock_switch.return_value.off, "off")
+        client.is_connected.return_value = True
+        assert outbox.flush() == 3
+
+        assert order.mock_calls == [call.open(), call.off(), call.set_state(-61)]
+        assert outbox.stats.compacted == 2
+
+        loop.close()
+
+    def test_first_state_recorded_when_publisher_thread_publishes(
+        self, mock_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that a state queued on the publisher thread only counts as first state once published."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        publisher = MagicMock()
+        metrics = StartupMetrics()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            modules=["wifiModule"],
+            publisher=publisher,
+            metrics=metrics,
+            entity_classes=entity_classes,
+        )
+
+        device.update("wifi_rssi", -60)
+        assert metrics.device("test_device").first_state is None
+
+        publish, *args = publisher.submit.call_args.args
+        publish(*args)
+
+        mock_sensor.return_value.set_state.assert_called_once_with(-60)
+        assert metrics.device("test_device").first_state is not None
+
+        loop.close()
+
+    def test_first_state_recorded_when_outbox_flushed(
+        self, mock_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that a state held in the outbox only counts as first state once flushed."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        client = MagicMock()
+        client.is_connected.return_value = False
+        mock_sensor.return_value.state_topic = "wifi/state"
+        outbox = StateOutbox()
+        metrics = StartupMetrics()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings.model_copy(update={"client": client}),
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            modules=["wifiModule"],
+            outbox=outbox,
+            metrics=metrics,
+            entity_classes=entity_classes,
+        )
+
+        device.update("wifi_rssi", -60)
+        assert metrics.device("test_device").first_state is None
+
+        client.is_connected.return_value = True
+        outbox.flush()
+
+        mock_sensor.return_value.set_state.assert_called_once_with(-60)
+        assert metrics.device("test_device").first_state is not None
+
+        loop.close()
+
+    def test_door_position_published_as_percent(
+        self, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that door positions are published as percent open once the fully open position is known."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            modules=["garageDoor"],
+            entity_classes=entity_classes,
+        )
+        cover = mock_cover.return_value
+
+        assert device.update("door_position", 40) is False
+        device.update("door_position_max", 80)
+        assert device.update("door_position", 40) is True
+        device.update("door_position", 90)
+
+        assert [c.args for c in cover.set_position.call_args_list] == [(50,), (100,)]
+
+        loop.close()
+
+    @patch("ryobi_gdo_2_mqtt.device_manager.time")
+    def test_republish_after_republishes_unchanged_state(
+        self, mock_time, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that an unchanged state is published again on its next update once republish_after passed."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        mock_time.monotonic.return_value = 1000.0
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            republish_after=60,
+            entity_classes=entity_classes,
+        )
+        cover = mock_cover.return_value
+
+        mock_time.monotonic.return_value = 1030.0
+        device.update("door_state", "closed")
+        mock_time.monotonic.return_value = 1061.0
+        device.update("door_state", "closed")
+
+        assert cover.closed.call_count == 2
+
+        loop.close()
+
+    def test_state_published_while_disconnected_is_published_again(
+        self, mock_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that a state paho may have dropped doesn't suppress the next identical one."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            entity_classes=entity_classes,
+        )
+        wifi = mock_sensor.return_value
+
+        wifi.mqtt_client.is_connected.return_value = False
+        device.update("wifi_rssi", -60)
+        wifi.mqtt_client.is_connected.return_value = True
+        device.update("wifi_rssi", -60)
+        device.update("wifi_rssi", -60)
+
+        assert wifi.set_state.call_count == 2
+        assert device.publish_stats.suppressed == 1
+
+        loop.close()
+
+    def test_forget_published_republishes_unchanged_state(
+        self, mock_sensor, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that states are published again after the publish cache is reset."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            entity_classes=entity_classes,
+        )
+        wifi = mock_sensor.return_value
+
+        device.update("wifi_rssi", -60)
+        device.forget_published()
+        device.update("wifi_rssi", -60)
+
+        assert wifi.set_state.call_count == 2
+
+        loop.close()
+
+    def test_optimistic_command_state_suppresses_matching_update(
+        self, mock_cover, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that the device confirming a state already published for a command is not republished."""
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            entity_classes=entity_classes,
+        )
+        device.command_handler = MagicMock()
+        cover = mock_cover.return_value
+        message = MagicMock()
+        message.payload = b"OPEN"
+
+        device._handle_command("cover", None, None, message)
+        device.update("door_state", "opening")
+
+        cover.opening.assert_called_once()
+
+        loop.close()
+
+    def test_entities_only_for_device_modules(
+        self, mock_number, mock_switch, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that only the entities of the device's modules are created."""
+        loop = asyncio.new_event_loop()
+
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            modules=["garageDoor", "garageLight"],
+            entity_classes=entity_classes,
+        )
+
+        assert device.modules == {"garageDoor", "garageLight"}
+        assert device.cover is not None
+        assert device.light is not None
+        assert device.fan_number is None
+        assert device.inflator_switch is None
+        mock_number.assert_not_called()
+        # Door, vacation and light switches; no park assist, inflator or speaker
+        assert mock_switch.call_count == 2
+
+        assert device.add_module("fan") is True
+        assert device.add_module("fan") is False
+        assert device.add_module("unknownModule") is False
+        assert device.fan_number is mock_number.return_value
+
+        loop.close()
+
+
+class TestEntityRegistry:
+    """Tests for the entity descriptors."""
+
+    def test_descriptors_reference_known_modules_and_fields(self):
+        """Test that every descriptor points at a configured module and a device update field."""
+        for descriptor in ENTITIES:
+            assert descriptor.module in MODULES
+            assert descriptor.update_field in UPDATE_FIELDS
+        assert len(ENTITIES_BY_FIELD) == len(ENTITIES)
+        assert set(MODULE_ENTITIES) == set(MODULES)
+
+    def test_commands_are_routed_by_descriptor(
+        self, mock_number, mock_switch, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes
+    ):
+        """Test that commands go to the descriptor's module and publish the expected state."""
+        loop = asyncio.new_event_loop()
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            modules=["parkAssistLaser", "fan"],
+            entity_classes=entity_classes,
+        )
+        device.command_handler = MagicMock()
+        message = MagicMock()
+
+        message.payload = b"ON"
+        device._handle_command("park_assist_switch", None, None, message)
+        message.payload = b"40"
+        device._handle_command("fan_number", None, None, message)
+        message.payload = b"TOGGLE"
+        with patch("ryobi_gdo_2_mqtt.device_manager.log") as mock_log:
+            device._handle_command("park_assist_switch", None, None, message)
+
+        assert [call.args for call in device.command_handler.send_command.call_args_list] == [
+            ("parkAssistLaser", 1, None),
+            ("fan", 40, None),
+        ]
+        mock_switch.return_value.on.assert_called_once()
+        mock_number.return_value.set_value.assert_called_once_with(40)
+        mock_log.warning.assert_called_once()
+
+        loop.close()
+
 
 class TestModuleConfig:
     """Tests for ModuleConfig and MODULES configuration."""
@@ -237,29 +652,23 @@ class TestCommandHandler:
     """Tests for CommandHandler."""
 
     @pytest.fixture
-    def mock_device(self, mock_mqtt_settings, mock_websocket, mock_api_client):
+    def mock_device(self, mock_mqtt_settings, mock_websocket, mock_api_client, entity_classes):
         """Create a mock device for testing."""
         import asyncio
 
         loop = asyncio.new_event_loop()
 
-        with (
-            patch("ryobi_gdo_2_mqtt.device_manager.Cover"),
-            patch("ryobi_gdo_2_mqtt.device_manager.Switch"),
-            patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor"),
-            patch("ryobi_gdo_2_mqtt.device_manager.Sensor"),
-            patch("ryobi_gdo_2_mqtt.device_manager.Number"),
-        ):
-            from ryobi_gdo_2_mqtt.device_manager import RyobiDevice
-
-            device = RyobiDevice(
-                device_id="test_device",
-                device_name="Test Device",
-                mqtt_settings=mock_mqtt_settings,
-                websocket=mock_websocket,
-                api_client=mock_api_client,
-                loop=loop,
-            )
+        from ryobi_gdo_2_mqtt.device_manager import RyobiDevice
+
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            entity_classes=entity_classes,
+        )
 
         yield device
         loop.close()
@@ -310,6 +719,47 @@ class TestCommandHandler:
             mock_log.error.assert_called_once()
             assert "module info not available" in str(mock_log.error.call_args)
 
+    @pytest.mark.asyncio
+    async def test_send_command_on_event_loop_creates_task(self, mock_device):
+        """Test that a command received on the device's loop is sent without a thread hop."""
+        mock_device.api_client.get_module.return_value = 7
+        mock_device.websocket.send_message = AsyncMock(return_value=True)
+        mock_device.loop = asyncio.get_running_loop()
+
+        with patch("ryobi_gdo_2_mqtt.device_manager.asyncio.run_coroutine_threadsafe") as threadsafe:
+            mock_device.command_handler.send_command("garageDoor", 1)
+            assert len(mock_device._pending_tasks) == 1
+            await asyncio.gather(*mock_device._pending_tasks)
+
+        threadsafe.assert_not_called()
+        mock_device.websocket.send_message.assert_awaited_once_with(7, 5, "doorCommand", 1, device_id="test_device")
+        assert not mock_device._pending_tasks
+
+    @pytest.mark.asyncio
+    async def test_send_command_through_scheduler(self, mock_device):
+        """Test that with a scheduler, commands from the MQTT thread are queued on the loop."""
+        mock_device.api_client.get_module.return_value = 3
+        mock_device.websocket.send_message = AsyncMock(return_value=True)
+        mock_device.loop = asyncio.get_running_loop()
+        mock_device.command_scheduler = CommandScheduler(
+            functools.partial(mock_device.websocket.send_message, device_id="test_device"), spacing=0
+        )
+
+        def drag_slider():
+            for speed in (10, 20, 30):
+                mock_device.command_handler.send_command("fan", speed)
+
+        await asyncio.to_thread(drag_slider)
+        while len(mock_device.command_scheduler):
+            await asyncio.sleep(0.01)
+        await mock_device.command_scheduler.close()
+
+        # Speeds that arrived while an earlier one was being sent are collapsed, the last always sent
+        stats = mock_device.command_scheduler.stats["speed"]
+        mock_device.websocket.send_message.assert_awaited_with(3, 3, "speed", 30, device_id="test_device")
+        assert mock_device.websocket.send_message.await_count == stats.sent == 3 - stats.coalesced
+        assert not mock_device._pending_futures
+
 
 class TestEntityFactory:
     """Tests for EntityFactory."""
@@ -326,83 +776,99 @@ class TestEntityFactory:
             model="Garage Door Opener",
         )
 
-    def test_create_cover(self, mock_mqtt_settings, device_info):
-        """Test creating a cover entity."""
+    def test_create_cover(self, mock_mqtt_settings, device_info, mock_cover, entity_classes):
+        """Test creating a cover entity with its command callback."""
         from ryobi_gdo_2_mqtt.device_manager import EntityFactory
 
         callback = MagicMock()
 
-        with patch("ryobi_gdo_2_mqtt.device_manager.Cover") as mock_cover:
-            cover = EntityFactory.create_cover("test_device", "Test Device", device_info, mock_mqtt_settings, callback)
+        cover = EntityFactory.create(
+            ENTITIES_BY_NAME["cover"],
+            "test_device",
+            "Test Device",
+            device_info,
+            mock_mqtt_settings,
+            callback,
+            entity_classes=entity_classes,
+        )
 
-            mock_cover.assert_called_once()
-            assert cover is not None
+        assert cover is mock_cover.return_value
+        settings, command_callback = mock_cover.call_args.args
+        assert settings.entity.name == "Test Device Door"
+        assert settings.entity.unique_id == "test_device_door"
+        assert command_callback is callback
 
-    def test_create_switch(self, mock_mqtt_settings, device_info):
-        """Test creating a switch entity."""
+    def test_cover_publishes_position(self, mock_mqtt_settings, device_info):
+        """Test that the cover announces a position topic next to its state topic."""
         from ryobi_gdo_2_mqtt.device_manager import EntityFactory
 
-        callback = MagicMock()
-
-        with patch("ryobi_gdo_2_mqtt.device_manager.Switch") as mock_switch:
-            switch = EntityFactory.create_switch(
-                "test_device", "Test Device", device_info, mock_mqtt_settings, callback, "light"
-            )
+        cover = EntityFactory.create(
+            ENTITIES_BY_NAME["cover"], "test_device", "Test Device", device_info, mock_mqtt_settings, MagicMock()
+        )
 
-            mock_switch.assert_called_once()
-            assert switch is not None
+        assert cover.position_topic == cover.state_topic.removesuffix("state") + "position"
+        assert cover.generate_config()["position_topic"] == cover.position_topic
 
-    def test_create_binary_sensor(self, mock_mqtt_settings, device_info):
-        """Test creating a binary sensor entity."""
+    def test_create_sensor_without_callback(self, mock_mqtt_settings, device_info, mock_sensor, entity_classes):
+        """Test that entities without commands are created without a callback, with their info fields."""
         from ryobi_gdo_2_mqtt.device_manager import EntityFactory
 
-        with patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor") as mock_sensor:
-            sensor = EntityFactory.create_binary_sensor(
-                "test_device", "Test Device", device_info, mock_mqtt_settings, "battery"
-            )
+        sensor = EntityFactory.create(
+            ENTITIES_BY_NAME["wifi_sensor"],
+            "test_device",
+            "Test Device",
+            device_info,
+            mock_mqtt_settings,
+            MagicMock(),
+            entity_classes=entity_classes,
+        )
 
-            mock_sensor.assert_called_once()
-            assert sensor is not None
+        assert sensor is mock_sensor.return_value
+        (settings,) = mock_sensor.call_args.args
+        assert settings.entity.name == "Test Device WiFi Signal"
+        assert settings.entity.device_class == "signal_strength"
+        assert settings.entity.unit_of_measurement == "dBm"
 
-    def test_create_sensor(self, mock_mqtt_settings, device_info):
-        """Test creating a sensor entity."""
+    def test_create_number_range(self, mock_mqtt_settings, device_info, mock_number, entity_classes):
+        """Test that the fan speed is a 0-100 number."""
         from ryobi_gdo_2_mqtt.device_manager import EntityFactory
 
-        with patch("ryobi_gdo_2_mqtt.device_manager.Sensor") as mock_sensor:
-            sensor = EntityFactory.create_sensor(
-                "test_device", "Test Device", device_info, mock_mqtt_settings, "wifi", "signal_strength", "dBm"
-            )
+        EntityFactory.create(
+            ENTITIES_BY_NAME["fan_number"],
+            "test_device",
+            "Test Device",
+            device_info,
+            mock_mqtt_settings,
+            MagicMock(),
+            entity_classes=entity_classes,
+        )
 
-            mock_sensor.assert_called_once()
-            assert sensor is not None
+        settings, _ = mock_number.call_args.args
+        assert (settings.entity.min, settings.entity.max, settings.entity.step) == (0, 100, 1)
 
-    def test_create_number(self, mock_mqtt_settings, device_info):
-        """Test creating a number entity."""
+    @pytest.mark.parametrize("descriptor", ENTITIES, ids=lambda descriptor: descriptor.name)
+    def test_every_descriptor_builds_its_entity(self, mock_mqtt_settings, device_info, descriptor, entity_classes):
+        """Test that every entity is built from its descriptor alone."""
         from ryobi_gdo_2_mqtt.device_manager import EntityFactory
 
-        callback = MagicMock()
-
-        with patch("ryobi_gdo_2_mqtt.device_manager.Number") as mock_number:
-            number = EntityFactory.create_number(
-                "test_device", "Test Device", device_info, mock_mqtt_settings, callback, "fan"
-            )
-
-            mock_number.assert_called_once()
-            assert number is not None
-
-    def test_switch_entity_types(self, mock_mqtt_settings, device_info):
-        """Test all switch entity types can be created."""
-        from ryobi_gdo_2_mqtt.device_manager import EntityFactory
+        entity_class = entity_classes[descriptor.entity_class]
 
-        callback = MagicMock()
-        entity_types = ["light", "vacation", "park_assist", "inflator", "bt_speaker"]
+        entity = EntityFactory.create(
+            descriptor,
+            "test_device",
+            "Test Device",
+            device_info,
+            mock_mqtt_settings,
+            MagicMock(),
+            entity_classes=entity_classes,
+        )
 
-        with patch("ryobi_gdo_2_mqtt.device_manager.Switch"):
-            for entity_type in entity_types:
-                switch = EntityFactory.create_switch(
-                    "test_device", "Test Device", device_info, mock_mqtt_settings, callback, entity_type
-                )
-                assert switch is not None
+        assert entity is entity_class.return_value
+        settings = entity_class.call_args.args[0]
+        assert isinstance(settings.entity, descriptor.info_class)
+        assert settings.entity.name == f"Test Device {descriptor.display_name}"
+        assert settings.entity.unique_id == f"test_device_{descriptor.entity_type}"
+        assert len(entity_class.call_args.args) == (1 if descriptor.command is None else 2)
 
 
 class TestDeviceManager:
@@ -412,7 +878,7 @@ class TestDeviceManager:
     async def test_setup_device_success(self, device_manager, mock_websocket, fixtures_dir):
         """Test successful device setup."""
         device_manager.api_client.update_device = AsyncMock(
-            return_value=MagicMock(door_state="closed", light_state=False, battery_level=0)
+            return_value=DeviceUpdate(door_state="closed", light_state=False, battery_level=0)
         )
 
         with patch("ryobi_gdo_2_mqtt.device_manager.RyobiDevice") as mock_device_class:
@@ -424,6 +890,106 @@ class TestDeviceManager:
             assert device is not None
             assert "c4be84986d2e" in device_manager.devices
 
+    @pytest.mark.asyncio
+    async def test_setup_device_records_startup_timings(self, device_manager, mock_websocket):
+        """Test that state fetch and entity creation are timed per device, the first state once published."""
+        device_manager.metrics = StartupMetrics()
+        device_manager.api_client.update_device = AsyncMock(return_value=DeviceUpdate(door_state="closed"))
+
+        with patch("ryobi_gdo_2_mqtt.device_manager.RyobiDevice"):
+            await device_manager.setup_device("c4be84986d2e", "Acura", mock_websocket)
+
+        timings = device_manager.metrics.devices["c4be84986d2e"]
+        assert timings.update_device is not None
+        assert timings.entity_creation is not None
+        assert timings.first_state is None
+        assert timings.websocket_connect is None
+
+    @pytest.mark.asyncio
+    async def test_setup_device_from_snapshot(self, device_manager, mock_websocket):
+        """Test that a cached state is published without fetching the device."""
+        device_manager.api_client.update_device = AsyncMock()
+        device_manager.restore_snapshot(
+            DeviceSnapshot(
+                devices={"c4be84986d2e": "Acura"},
+                modules={"c4be84986d2e": {"garageDoor": "garageDoor_7"}},
+                states={"c4be84986d2e": {"door_state": "open", "removed_field": 1}},
+            )
+        )
+
+        with patch("ryobi_gdo_2_mqtt.device_manager.RyobiDevice") as mock_device_class:
+            mock_device = mock_device_class.return_value
+            mock_device.device_id = "c4be84986d2e"
+            mock_device.modules = {"garageDoor"}
+            await device_manager.setup_device("c4be84986d2e", "Acura", mock_websocket)
+
+        device_manager.api_client.restore_module_index.assert_called_once_with(
+            "c4be84986d2e", {"garageDoor": "garageDoor_7"}
+        )
+        device_manager.api_client.update_device.assert_not_called()
+        mock_device.update.assert_called_once_with("door_state", "open")
+        assert device_manager.states["c4be84986d2e"] == {"door_state": "open"}
+
+    @pytest.mark.asyncio
+    async def test_revalidate_device_applies_only_differences(self, device_manager):
+        """Test that revalidation publishes only fields that changed since the snapshot."""
+        mock_device = MagicMock()
+        mock_device.device_id = "c4be84986d2e"
+        mock_device.modules = set(MODULE_ENTITIES)
+        device_manager.devices["c4be84986d2e"] = mock_device
+        device_manager.states["c4be84986d2e"] = {"door_state": "closed", "light_state": False}
+        device_manager.api_client.update_device = AsyncMock(
+            return_value=DeviceUpdate(door_state="closed", light_state=True, fan=40)
+        )
+
+        assert await device_manager.revalidate_device("c4be84986d2e") is True
+
+        assert [call.args for call in mock_device.update.call_args_list] == [("light_state", True), ("fan", 40)]
+        assert device_manager.states["c4be84986d2e"] == {"door_state": "closed", "light_state": True, "fan": 40}
+
+    @pytest.mark.asyncio
+    async def test_revalidate_device_keeps_newer_websocket_fields(self, device_manager):
+        """Test that revalidation doesn't roll back a field a notification set after the fetch."""
+        mock_device = MagicMock()
+        mock_device.device_id = "c4be84986d2e"
+        mock_device.modules = set(MODULE_ENTITIES)
+        device_manager.devices["c4be84986d2e"] = mock_device
+        device_manager.parser = WebSocketMessageParser()
+        device_manager.parser.seed("c4be84986d2e", {"garageDoor_7.doorState": (2000, 1)})
+        device_manager.states["c4be84986d2e"] = {"door_state": "open", "light_state": False}
+        device_manager.api_client.attribute_stamps = MagicMock(
+            return_value={"garageDoor_7.doorState": (1000, 0), "garageLight_8.lightState": (1500, True)}
+        )
+        device_manager.api_client.update_device = AsyncMock(
+            return_value=DeviceUpdate(door_state="closed", light_state=True)
+        )
+
+        assert await device_manager.revalidate_device("c4be84986d2e") is True
+
+        assert [call.args for call in mock_device.update.call_args_list] == [("light_state", True)]
+        assert device_manager.states["c4be84986d2e"]["door_state"] == "open"
+
+    @pytest.mark.asyncio
+    async def test_revalidate_device_failure(self, device_manager):
+        """Test that a failed fetch keeps the cached state."""
+        device_manager.devices["c4be84986d2e"] = MagicMock()
+        device_manager.api_client.update_device = AsyncMock(side_effect=RyobiApiError("offline"))
+
+        assert await device_manager.revalidate_device("c4be84986d2e") is False
+
+    def test_snapshot(self, device_manager):
+        """Test that the snapshot holds the module index and last known states."""
+        device_manager.api_client.module_index = MagicMock(return_value={"garageDoor": "garageDoor_7"})
+        device_manager.states["c4be84986d2e"] = {"door_state": "closed"}
+
+        snapshot = device_manager.snapshot({"c4be84986d2e": "Acura"})
+
+        assert snapshot == DeviceSnapshot(
+            devices={"c4be84986d2e": "Acura"},
+            modules={"c4be84986d2e": {"garageDoor": "garageDoor_7"}},
+            states={"c4be84986d2e": {"door_state": "closed"}},
+        )
+
     @pytest.mark.asyncio
     async def test_setup_device_failure(self, device_manager, mock_websocket):
         """Test device setup failure."""
@@ -437,21 +1003,161 @@ class TestDeviceManager:
         """Test handling device updates from WebSocket."""
         # Setup a device first
         mock_device = MagicMock()
-        mock_device.update_door_state = MagicMock()
-        mock_device.update_light_state = MagicMock()
+        mock_device.modules = set(MODULE_ENTITIES)
         device_manager.devices["c4be84986d2e"] = mock_device
 
         # Setup parser
         mock_parser = MagicMock()
-        mock_parser.parse_attribute_update = MagicMock(return_value={"door_state": "open", "light_state": True})
+        mock_parser.parse_attribute_update = MagicMock(return_value=DeviceUpdate(door_state="open", light_state=True))
         device_manager.parser = mock_parser
 
         # Handle update
         ws_data = load_fixture(fixtures_dir, "ws_message_1762952771.json")
         await device_manager.handle_device_update("c4be84986d2e", ws_data)
 
-        mock_device.update_door_state.assert_called_once_with("open")
-        mock_device.update_light_state.assert_called_once_with(True)
+        assert [call.args for call in mock_device.update.call_args_list] == [
+            ("door_state", "open"),
+            ("light_state", True),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_handle_device_update_applies_only_present_fields(self, device_manager):
+        """Test that only fields present in the update reach the device."""
+        mock_device = MagicMock()
+        mock_device.modules = set(MODULE_ENTITIES)
+        device_manager.devices["c4be84986d2e"] = mock_device
+        device_manager.parser = MagicMock()
+        device_manager.parser.parse_attribute_update = MagicMock(
+            return_value=DeviceUpdate(battery_level=0, device_name="ignored")
+        )
+
+        await device_manager.handle_device_update("c4be84986d2e", {})
+
+        mock_device.update.assert_called_once_with("battery_level", 0)
+
+    @pytest.mark.asyncio
+    async def test_handle_device_update_schedules_resync_on_gap(self, device_manager):
+        """Test that an update flagged with missed notifications refetches the device once."""
+        mock_device = MagicMock()
+        mock_device.modules = set(MODULE_ENTITIES)
+        device_manager.devices["c4be84986d2e"] = mock_device
+        flagged = DeviceUpdate(door_state="open")
+        flagged.resync = True
+        device_manager.parser = MagicMock()
+        device_manager.parser.parse_attribute_update = MagicMock(return_value=flagged)
+        device_manager.api_client.update_device = AsyncMock(return_value=DeviceUpdate(door_state="closed"))
+        device_manager.api_client.attribute_stamps = MagicMock(return_value={"garageDoor_7.doorState": (1, 0)})
+
+        await device_manager.handle_device_update("c4be84986d2e", {})
+        await device_manager.handle_device_update("c4be84986d2e", {})
+        await asyncio.gather(*device_manager._resync_tasks.values())
+
+        device_manager.parser.parse_attribute_update.assert_called_with({}, "c4be84986d2e")
+        device_manager.api_client.update_device.assert_called_once_with("c4be84986d2e")
+        device_manager.parser.seed.assert_called_once_with("c4be84986d2e", {"garageDoor_7.doorState": (1, 0)})
+        assert [call.args for call in mock_device.update.call_args_list] == [
+            ("door_state", "open"),
+            ("door_state", "open"),
+            ("door_state", "closed"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_position_burst_does_not_resync(self, device_manager):
+        """Test that door positions not chaining with the REST state don't refetch the device."""
+        mock_device = MagicMock()
+        mock_device.modules = set(MODULE_ENTITIES)
+        device_manager.devices["c4be84986d2e"] = mock_device
+        device_manager.parser = WebSocketMessageParser()
+        device_manager.parser.seed("c4be84986d2e", {"garageDoor_7.doorPosition": (1000, 50)})
+        device_manager.api_client.update_device = AsyncMock(return_value=DeviceUpdate(door_state="open"))
+
+        for value in range(61, 100, 3):
+            await device_manager.handle_device_update(
+                "c4be84986d2e",
+                {
+                    "method": "wskAttributeUpdateNtfy",
+                    "params": {
+                        "varName": "c4be84986d2e",
+                        "garageDoor_7.doorPosition": {"value": value, "lastValue": value - 1, "lastSet": value * 100},
+                    },
+                },
+            )
+
+        assert device_manager._resync_tasks == {}
+        device_manager.api_client.update_device.assert_not_called()
+        mock_device.update.assert_called_with("door_position", 97)
+
+    @pytest.mark.asyncio
+    async def test_resync_cooldown_defers_repeated_resyncs(self, device_manager):
+        """Test that gaps reported right after a resync are covered by one deferred resync."""
+        mock_device = MagicMock()
+        mock_device.modules = set(MODULE_ENTITIES)
+        device_manager.devices["c4be84986d2e"] = mock_device
+        device_manager.resync_cooldown = 0.05
+        flagged = DeviceUpdate(door_state="open")
+        flagged.resync = True
+        device_manager.parser = MagicMock()
+        device_manager.parser.parse_attribute_update = MagicMock(return_value=flagged)
+        device_manager.api_client.update_device = AsyncMock(return_value=DeviceUpdate(door_state="closed"))
+
+        await device_manager.handle_device_update("c4be84986d2e", {})
+        await asyncio.gather(*device_manager._resync_tasks.values())
+        for _ in range(5):
+            await device_manager.handle_device_update("c4be84986d2e", {})
+            await asyncio.sleep(0)
+
+        assert device_manager.api_client.update_device.await_count == 1
+        await asyncio.gather(*device_manager._resync_tasks.values())
+        assert device_manager.api_client.update_device.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_handle_device_update_adds_new_module(self, device_manager):
+        """Test that an update from a module the device wasn't known to have creates its entities."""
+        mock_device = MagicMock()
+        mock_device.modules = {"garageDoor"}
+        threads = []
+
+        def add_module(module):
+            threads.append(threading.get_ident())
+            mock_device.modules.add(module)
+            return True
+
+        mock_device.add_module = MagicMock(side_effect=add_module)
+        device_manager.devices["c4be84986d2e"] = mock_device
+        device_manager.parser = MagicMock()
+        device_manager.parser.parse_attribute_update = MagicMock(return_value=DeviceUpdate(fan=40))
+        device_manager.api_client.update_device = AsyncMock(return_value=DeviceUpdate(fan=40))
+
+        await device_manager.handle_device_update("c4be84986d2e", {})
+        await asyncio.gather(*device_manager._resync_tasks.values())
+
+        mock_device.add_module.assert_called_once_with("fan")
+        # Entities are created off the event loop, they may connect to the broker
+        assert threads != [threading.get_ident()]
+        mock_device.update.assert_called_with("fan", 40)
+        # The new module's port is reindexed for commands
+        device_manager.api_client.update_device.assert_called_once_with("c4be84986d2e")
+
+    @pytest.mark.asyncio
+    async def test_remove_device_cancels_resync(self, device_manager):
+        """Test that removing a device stops its resync and forgets its stamps."""
+        mock_device = MagicMock()
+        mock_device.cleanup = AsyncMock()
+        device_manager.devices["c4be84986d2e"] = mock_device
+        device_manager.parser = MagicMock()
+
+        async def hang(device_id):
+            await asyncio.Event().wait()
+
+        device_manager.api_client.update_device = AsyncMock(side_effect=hang)
+        device_manager.schedule_resync("c4be84986d2e")
+        task = device_manager._resync_tasks["c4be84986d2e"]
+        await asyncio.sleep(0)
+
+        await device_manager.remove_device("c4be84986d2e")
+
+        assert task.cancelled()
+        device_manager.parser.forget.assert_called_once_with("c4be84986d2e")
 
     @pytest.mark.asyncio
     async def test_handle_device_update_unknown_device(self, device_manager, fixtures_dir):
@@ -460,3 +1166,135 @@ class TestDeviceManager:
 
         # Should not raise, just log warning
         await device_manager.handle_device_update("unknown_device", ws_data)
+
+    @pytest.mark.asyncio
+    async def test_shared_connection_used_by_every_entity(self, mock_mqtt_settings, mock_api_client, mock_websocket):
+        """Test that with a shared connection all devices publish and subscribe through one client."""
+        device_manager = DeviceManager(
+            mqtt_settings=mock_mqtt_settings, api_client=mock_api_client, shared_connection=True
+        )
+        mock_api_client.update_device = AsyncMock(return_value=DeviceUpdate(door_state="closed"))
+        await device_manager.connect()
+
+        try:
+            first = await device_manager.setup_device("device1", "First", mock_websocket)
+            second = await device_manager.setup_device("device2", "Second", mock_websocket)
+
+            clients = {
+                entity.mqtt_client
+                for device in (first, second)
+                for entity in (device.cover, device.light, device.battery_sensor, device.wifi_sensor, device.fan_number)
+            }
+            assert clients == {device_manager.mqtt_client}
+            assert device_manager.mqtt_client.is_connected()
+
+            removed_callbacks = list(first._connect_callbacks)
+            assert removed_callbacks
+            await device_manager.remove_device("device1")
+
+            assert device_manager.mqtt_client.is_connected()
+            assert first.cover._command_topic in device_manager.mqtt_client._retired_topics
+            # The removed device's entities no longer resubscribe on reconnect, the other's still do
+            callbacks = device_manager.mqtt_client._connect_callbacks
+            assert not any(callback in callbacks for callback in removed_callbacks)
+            assert all(callback in callbacks for callback in second._connect_callbacks)
+        finally:
+            await device_manager.close()
+
+        assert not device_manager.mqtt_client.is_connected()
+
+    @pytest.mark.asyncio
+    async def test_in_loop_transport_implies_shared_connection(
+        self, mock_mqtt_settings, mock_api_client, mock_websocket
+    ):
+        """Test that the in-loop transport shares one client that has no network thread."""
+        device_manager = DeviceManager(
+            mqtt_settings=mock_mqtt_settings, api_client=mock_api_client, in_loop_transport=True
+        )
+        mock_api_client.update_device = AsyncMock(return_value=DeviceUpdate(door_state="closed"))
+        await device_manager.connect()
+
+        try:
+            device = await device_manager.setup_device("device1", "First", mock_websocket)
+
+            assert device_manager.shared_connection is True
+            assert device.cover.mqtt_client is device_manager.mqtt_client
+            assert device_manager.mqtt_client.is_connected()
+            assert device_manager.mqtt_client._thread is None
+        finally:
+            await device_manager.close()
+
+    @pytest.mark.asyncio
+    async def test_outbox_flushed_on_connect(self, mock_mqtt_settings, mock_api_client, mock_websocket):
+        """Test that the outbox implies a shared connection that flushes it whenever it connects."""
+        device_manager = DeviceManager(mqtt_settings=mock_mqtt_settings, api_client=mock_api_client, outbox=True)
+        publish = MagicMock()
+        device_manager.outbox.put("door/state", 0, publish, "open")
+        await device_manager.connect()
+
+        try:
+            assert device_manager.shared_connection is True
+            publish.assert_called_once_with("open")
+            assert len(device_manager.outbox) == 0
+        finally:
+            await device_manager.close()
+
+    @pytest.mark.asyncio
+    async def test_reconnect_forgets_published_states(self, mock_mqtt_settings, mock_api_client):
+        """Test that every device publishes its next states again once the shared connection is re-established."""
+        device_manager = DeviceManager(
+            mqtt_settings=mock_mqtt_settings, api_client=mock_api_client, shared_connection=True
+        )
+        await device_manager.connect()
+        device = MagicMock()
+        device_manager.devices["device1"] = device
+
+        try:
+            device_manager.mqtt_client.on_connect(None, None, None, MagicMock(is_failure=False))
+            await asyncio.sleep(0)
+
+            device.forget_published.assert_called_once()
+        finally:
+            await device_manager.close()
+
+    @pytest.mark.asyncio
+    async def test_publisher_thread_publishes_states(self, mock_mqtt_settings, mock_api_client, mock_websocket):
+        """Test that entity states are published from the publisher thread, against a real broker."""
+        device_manager = DeviceManager(
+            mqtt_settings=mock_mqtt_settings, api_client=mock_api_client, publisher_thread=True
+        )
+        mock_api_client.update_device = AsyncMock(return_value=DeviceUpdate(door_state="open", light_state=True))
+        await device_manager.connect()
+
+        try:
+            device = await device_manager.setup_device("device1", "First", mock_websocket)
+            assert device.publisher is device_manager.publisher
+        finally:
+            await device_manager.close()
+
+        stats = device_manager.publisher.stats
+        assert stats.published == device.publish_stats.sent
+        assert stats.errors == 0
+        assert stats.batches >= 1
+
+    def test_publish_stats_sums_devices(self, device_manager):
+        """Test that publish counters are summed over all devices."""
+        for device_id, (sent, suppressed) in {"device1": (3, 1), "device2": (2, 4)}.items():
+            device = MagicMock()
+            device.publish_stats = PublishStats(sent=sent, suppressed=suppressed)
+            device_manager.devices[device_id] = device
+
+        assert device_manager.publish_stats() == PublishStats(sent=5, suppressed=5)
+
+    @pytest.mark.asyncio
+    async def test_remove_device(self, device_manager):
+        """Test removing a device cleans it up."""
+        mock_device = MagicMock()
+        mock_device.cleanup = AsyncMock()
+        device_manager.devices["c4be84986d2e"] = mock_device
+
+        await device_manager.remove_device("c4be84986d2e")
+        await device_manager.remove_device("c4be84986d2e")
+
+        assert "c4be84986d2e" not in device_manager.devices
+        mock_device.cleanup.assert_called_once()
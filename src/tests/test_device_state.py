@@ -0,0 +1,82 @@
+"""Tests for device state extraction."""
+
+import pytest
+
+from ryobi_gdo_2_mqtt.device_state import MODULE_NAMES, STATE_PATHS, DeviceStateExtractor
+from ryobi_gdo_2_mqtt.models import UPDATE_FIELDS
+from tests.conftest import load_fixture
+
+
+@pytest.fixture
+def extractor():
+    """Create an extractor for the default paths."""
+    return DeviceStateExtractor()
+
+
+class TestDeviceStateExtractor:
+    """Tests for DeviceStateExtractor."""
+
+    def test_paths_reference_known_modules_and_fields(self):
+        """Test that every path reads a known module into a known update field."""
+        for path in STATE_PATHS:
+            assert path.module in MODULE_NAMES
+            assert path.field in UPDATE_FIELDS
+
+    def test_extract(self, extractor, fixtures_dir):
+        """Test that the module index, state and stamps are read from a device document."""
+        device = load_fixture(fixtures_dir, "device_update_c4be84986d2e.json")["result"][0]
+
+        state = extractor.extract(device)
+
+        assert state.modules == {
+            "garageDoor": "garageDoor_7",
+            "backupCharger": "backupCharger_8",
+            "garageLight": "garageLight_7",
+            "wifiModule": "wifiModule_9",
+        }
+        assert set(state.update) == {
+            "door_position_max",
+            "door_position",
+            "door_state",
+            "safety",
+            "vacation_mode",
+            "motion",
+            "light_state",
+            "battery_level",
+            "wifi_rssi",
+            "device_name",
+        }
+        assert state.update.door_state == "closed"
+        assert state.update.door_position_max == 87
+        assert state.update.device_name == "Acura"
+        door = device["deviceTypeMap"]["garageDoor_7"]["at"]["doorState"]
+        assert state.stamps["garageDoor_7.doorState"] == (door.get("lastSet"), door["value"])
+        assert not any(key.startswith(("masterUnit", "modulePort")) for key in state.stamps)
+
+    def test_index_modules_keeps_module_order(self, extractor):
+        """Test that modules are indexed in registry order whatever the document order."""
+        dtm = {"fan_3": {}, "masterUnit": {}, "garageDoor_1": {}, "modulePort_1": {}}
+
+        assert list(extractor.index_modules(dtm).items()) == [("garageDoor", "garageDoor_1"), ("fan", "fan_3")]
+
+    def test_optional_path_may_be_missing(self, extractor):
+        """Test that a device without a motion sensor still parses."""
+        device = {
+            "deviceTypeMap": {
+                "garageDoor_7": {
+                    "at": {"doorState": {"value": 1}, "sensorFlag": {"value": 0}, "vacationMode": {"value": 0}}
+                }
+            },
+            "metaData": {},
+        }
+
+        state = extractor.extract(device)
+
+        assert dict(state.update) == {"door_state": "open", "safety": 0, "vacation_mode": 0}
+
+    def test_required_path_missing(self, extractor):
+        """Test that a module without a required attribute is rejected."""
+        device = {"deviceTypeMap": {"garageLight_7": {"at": {"lightTimer": {"value": 0}}}}}
+
+        with pytest.raises(KeyError, match=r"garageLight_7\.lightState"):
+            extractor.extract(device)
@@ -0,0 +1,152 @@
+"""Tests for per-device dispatch queues."""
+
+import asyncio
+import logging
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from ryobi_gdo_2_mqtt.constants import OverflowPolicy
+from ryobi_gdo_2_mqtt.dispatcher import DeviceDispatcher
+
+
+class TestDeviceDispatcher:
+    """Tests for DeviceDispatcher."""
+
+    @pytest.mark.asyncio
+    async def test_submit_hands_messages_to_handler_in_order(self):
+        """Test that a device's messages are handled in arrival order."""
+        handler = AsyncMock()
+        dispatcher = DeviceDispatcher(handler)
+
+        for i in range(3):
+            assert await dispatcher.submit("device1", {"seq": i}) is True
+        await dispatcher.join()
+
+        assert [call.args for call in handler.call_args_list] == [("device1", {"seq": i}) for i in range(3)]
+        assert dispatcher.stats["device1"].processed == 3
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_slow_device_does_not_block_others(self):
+        """Test that a stalled handler for one device doesn't hold up another."""
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(device_id, message):
+            if device_id == "slow":
+                await release.wait()
+            handled.append(device_id)
+
+        dispatcher = DeviceDispatcher(handler)
+        await dispatcher.submit("slow", {})
+        await dispatcher.submit("fast", {})
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert handled == ["fast"]
+        release.set()
+        await dispatcher.join()
+        assert handled == ["fast", "slow"]
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_keeps_latest_messages(self):
+        """Test that a full queue drops its oldest message under DROP_OLDEST."""
+        handler = AsyncMock()
+        dispatcher = DeviceDispatcher(handler, maxsize=2, overflow=OverflowPolicy.DROP_OLDEST)
+
+        # No await between submits, so the worker has not drained anything yet
+        results = [await dispatcher.submit("device1", {"seq": i}) for i in range(4)]
+        assert dispatcher.stats["device1"].depth == 2
+        await dispatcher.join()
+
+        assert results == [True, True, True, True]
+        assert [call.args[1]["seq"] for call in handler.call_args_list] == [2, 3]
+        assert dispatcher.stats["device1"].dropped == 2
+        assert dispatcher.stats["device1"].high_watermark == 2
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_every_dropped_message_is_logged(self, caplog):
+        """Test that each message dropped from a full queue logs a warning."""
+        dispatcher = DeviceDispatcher(AsyncMock(), maxsize=1, overflow=OverflowPolicy.DROP_OLDEST)
+
+        with caplog.at_level(logging.WARNING, logger="ryobi_gdo_2_mqtt.logging"):
+            for i in range(4):
+                await dispatcher.submit("device1", {"seq": i})
+
+        assert [record.getMessage() for record in caplog.records].count(
+            "Dispatch queue for device1 is full (1), drop_oldest (3 dropped so far)"
+        ) == 1
+        assert len(caplog.records) == 3
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_drop_newest_keeps_queued_messages(self):
+        """Test that a full queue rejects new messages under DROP_NEWEST."""
+        handler = AsyncMock()
+        dispatcher = DeviceDispatcher(handler, maxsize=2, overflow=OverflowPolicy.DROP_NEWEST)
+
+        results = [await dispatcher.submit("device1", {"seq": i}) for i in range(4)]
+        await dispatcher.join()
+
+        assert results == [True, True, False, False]
+        assert [call.args[1]["seq"] for call in handler.call_args_list] == [0, 1]
+        assert dispatcher.stats["device1"].dropped == 2
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_block_waits_for_room(self):
+        """Test that a full queue applies backpressure under BLOCK."""
+        handler = AsyncMock()
+        dispatcher = DeviceDispatcher(handler, maxsize=1, overflow=OverflowPolicy.BLOCK)
+
+        for i in range(3):
+            await dispatcher.submit("device1", {"seq": i})
+        await dispatcher.join()
+
+        assert [call.args[1]["seq"] for call in handler.call_args_list] == [0, 1, 2]
+        assert dispatcher.stats["device1"].dropped == 0
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_are_counted_and_worker_survives(self):
+        """Test that a failing update doesn't kill the device's worker."""
+        handler = AsyncMock(side_effect=[ValueError("bad update"), None])
+        dispatcher = DeviceDispatcher(handler)
+
+        with patch("ryobi_gdo_2_mqtt.dispatcher.log"):
+            await dispatcher.submit("device1", {"seq": 0})
+            await dispatcher.submit("device1", {"seq": 1})
+            await dispatcher.join()
+
+        assert dispatcher.stats["device1"].errors == 1
+        assert dispatcher.stats["device1"].processed == 1
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_discard_stops_device_worker(self):
+        """Test that discarding a device stops its worker and forgets its queue."""
+        dispatcher = DeviceDispatcher(AsyncMock())
+        await dispatcher.submit("device1", {})
+        worker = dispatcher._workers["device1"]
+
+        await dispatcher.discard("device1")
+
+        assert worker.done()
+        assert "device1" not in dispatcher.stats
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_close_keeps_counters(self):
+        """Test that closing stops every worker but keeps the queue counters for the final report."""
+        dispatcher = DeviceDispatcher(AsyncMock())
+        await dispatcher.submit("device1", {})
+        await dispatcher.join()
+        worker = dispatcher._workers["device1"]
+
+        await dispatcher.close()
+
+        assert worker.done()
+        assert dispatcher.stats["device1"].processed == 1
@@ -0,0 +1,105 @@
+"""Tests for door motion coalescing."""
+
+import asyncio
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from ryobi_gdo_2_mqtt.door_motion import DoorMotionCoalescer
+from ryobi_gdo_2_mqtt.websocket_parser import WebSocketMessageParser
+from tests.conftest import load_fixture
+
+
+def make_coalescer(interval: float) -> tuple[DoorMotionCoalescer, MagicMock]:
+    """Create a coalescer whose state and position publishes are recorded on one mock."""
+    published = MagicMock()
+    published.state.return_value = True
+    published.position.return_value = True
+    coalescer = DoorMotionCoalescer(asyncio.get_running_loop(), published.state, published.position, interval)
+    return coalescer, published
+
+
+class TestDoorMotionCoalescer:
+    """Tests for DoorMotionCoalescer."""
+
+    @pytest.mark.asyncio
+    async def test_updates_published_at_once_while_still(self):
+        """Test that updates outside a motion are published as they arrive."""
+        coalescer, published = make_coalescer(10)
+
+        assert coalescer.update_position(0) is True
+        assert coalescer.update_state("closed") is True
+        assert coalescer.update_position(0) is True
+
+        assert published.mock_calls == [call.position(0), call.state("closed"), call.position(0)]
+
+    @pytest.mark.asyncio
+    async def test_motion_updates_coalesced(self):
+        """Test that a motion publishes its start, then the latest update once per interval."""
+        coalescer, published = make_coalescer(0.05)
+
+        assert coalescer.update_state("opening") is True
+        assert coalescer.update_position(10) is False
+        assert coalescer.update_position(20) is False
+        assert published.mock_calls == [call.state("opening")]
+
+        await asyncio.sleep(0.1)
+
+        assert published.mock_calls == [call.state("opening"), call.position(20)]
+        assert coalescer.stats.published == 2
+
+    @pytest.mark.asyncio
+    async def test_motion_end_published_with_final_position(self):
+        """Test that the end of a motion is published right away, with the final position."""
+        coalescer, published = make_coalescer(10)
+        coalescer.update_state("closing")
+        coalescer.update_position(40)
+
+        assert coalescer.update_position(0) is False
+        assert coalescer.update_state("closed") is True
+
+        assert published.mock_calls == [call.state("closing"), call.position(0), call.state("closed")]
+        assert coalescer.moving is False
+        assert coalescer._timer is None
+
+    @pytest.mark.asyncio
+    async def test_no_interval_publishes_every_update(self):
+        """Test that an interval of 0 publishes every update during a motion."""
+        coalescer, _ = make_coalescer(0)
+        coalescer.update_state("opening")
+
+        assert coalescer.update_position(10) is True
+        assert coalescer.update_position(20) is True
+        assert coalescer.stats.reduction == 0
+
+    @pytest.mark.asyncio
+    async def test_recorded_motion(self, fixtures_dir):
+        """Test the publishes made for a recorded opening of the door."""
+        parser = WebSocketMessageParser()
+        coalescer, published = make_coalescer(10)
+        coalescer.update_state("opening")
+        for name in ("1762952767", "1762952768", "1762952770", "1762952771"):
+            updates = parser.parse_attribute_update(load_fixture(fixtures_dir, f"ws_message_{name}.json"))
+            for field in updates:
+                if field == "door_position":
+                    coalescer.update_position(updates[field])
+                else:
+                    coalescer.update_state(updates[field])
+
+        assert published.mock_calls == [call.state("opening"), call.position(87), call.state("open")]
+        assert coalescer.stats.received == 6
+        assert coalescer.stats.published == 2
+        assert coalescer.stats.motions == 1
+        assert coalescer.stats.reduction == pytest.approx(2 / 3)
+
+    @pytest.mark.asyncio
+    async def test_cancel_drops_scheduled_publish(self):
+        """Test that cancelling drops the publish scheduled during a motion."""
+        coalescer, published = make_coalescer(0.05)
+        coalescer.update_state("opening")
+        coalescer.update_position(10)
+
+        coalescer.cancel()
+        await asyncio.sleep(0.1)
+
+        assert published.mock_calls == [call.state("opening")]
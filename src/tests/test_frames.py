@@ -0,0 +1,83 @@
+"""Tests for websocket request frame encoding."""
+
+import json
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from ryobi_gdo_2_mqtt import frames
+from ryobi_gdo_2_mqtt.logging import log
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test without cached bodies."""
+    frames.command_body.cache_clear()
+    frames.subscribe_body.cache_clear()
+
+
+class TestFrames:
+    """Tests for frame encoding."""
+
+    def test_frame_matches_encoding_whole_request(self):
+        """Test that a frame is the same text as the whole request encoded at once."""
+        body = frames.command_body(7, 5, "doorCommand", 1, "c4be84986d2e")
+
+        assert frames.frame(12, body) == json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "id": 12,
+                "method": "gdoModuleCommand",
+                "params": {
+                    "msgType": 16,
+                    "moduleType": 5,
+                    "portId": 7,
+                    "moduleMsg": {"doorCommand": 1},
+                    "topic": "c4be84986d2e",
+                },
+            }
+        )
+        assert frames.frame(3, frames.subscribe_body("d.wskAttributeUpdateNtfy")) == json.dumps(
+            {"jsonrpc": "2.0", "id": 3, "method": "wskSubscribe", "params": {"topic": "d.wskAttributeUpdateNtfy"}}
+        )
+
+    def test_repeated_command_not_encoded_again(self):
+        """Test that a repeated command reuses its encoded body."""
+        first = frames.command_body(7, 5, "doorCommand", 1, "device")
+
+        with patch("ryobi_gdo_2_mqtt.frames.json.dumps") as dumps:
+            second = frames.command_body(7, 5, "doorCommand", 1, "device")
+            frames.frame(2, second)
+
+        dumps.assert_not_called()
+        assert second is first
+
+    def test_bool_and_int_values_kept_apart(self):
+        """Test that True and 1 are cached as different commands."""
+        assert '"lightState": 1' in frames.command_body(7, 5, "lightState", 1, "device")
+        assert '"lightState": true' in frames.command_body(7, 5, "lightState", True, "device")
+
+    def test_redact_api_key(self):
+        """Test that the API key is blanked in a copy, from a message or a frame."""
+        message = {"params": {"apiKey": "secret_key", "varName": "user"}}
+
+        assert "secret_key" not in frames.redact_api_key(message)
+        assert "secret_key" not in frames.redact_api_key(json.dumps(message))
+        assert message["params"]["apiKey"] == "secret_key"
+
+    def test_redaction_only_when_logged(self):
+        """Test that a message is only redacted if its log record is emitted."""
+        frame = json.dumps({"params": {"apiKey": "secret_key"}})
+        level = log.level
+
+        try:
+            with patch("ryobi_gdo_2_mqtt.frames.redact_api_key", return_value="") as redact:
+                log.setLevel(logging.INFO)
+                log.debug("Sending %s", frames.Redacted(frame))
+                redact.assert_not_called()
+
+                assert str(frames.Redacted(frame)) == ""
+                redact.assert_called_once_with(frame)
+        finally:
+            log.setLevel(level)
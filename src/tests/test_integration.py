@@ -1,7 +1,7 @@
 """Integration tests for Ryobi GDO 2 MQTT."""
 
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from aiohttp import ClientSession
@@ -109,11 +109,8 @@ class TestDeviceManagerIntegration:
     """Integration tests for device manager with MQTT and WebSocket."""
 
     @pytest.mark.asyncio
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
     async def test_device_setup_and_state_sync(
-        self, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, fixtures_dir
+        self, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, fixtures_dir, entity_classes
     ):
         """Test device setup → MQTT entity creation → state updates from WebSocket."""
         # Setup mocks
@@ -136,7 +133,9 @@ class TestDeviceManagerIntegration:
         mock_websocket.send_message = AsyncMock()
 
         # Create device manager
-        device_manager = DeviceManager(mqtt_settings=mock_mqtt_settings, api_client=mock_api_client)
+        device_manager = DeviceManager(
+            mqtt_settings=mock_mqtt_settings, api_client=mock_api_client, entity_classes=entity_classes
+        )
         parser = WebSocketMessageParser()
         device_manager.parser = parser
 
@@ -163,12 +162,7 @@ class TestCommandFlow:
     """Integration tests for command flow: MQTT → WebSocket → Device."""
 
     @pytest.mark.asyncio
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
-    async def test_mqtt_command_to_websocket_flow(
-        self, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, fixtures_dir
-    ):
+    async def test_mqtt_command_to_websocket_flow(self, mock_mqtt_settings, fixtures_dir, entity_classes):
         """Test receiving MQTT command → sending WebSocket message → device state update."""
         from paho.mqtt.client import MQTTMessage
 
@@ -193,6 +187,7 @@ class TestCommandFlow:
             websocket=mock_websocket,
             api_client=mock_api_client,
             loop=loop,
+            entity_classes=entity_classes,
         )
 
         # Simulate MQTT door command
@@ -200,7 +195,7 @@ class TestCommandFlow:
         mqtt_message.payload = b"OPEN"
 
         # Trigger door command handler
-        device._handle_door_command(None, None, mqtt_message)
+        device._handle_command("cover", None, None, mqtt_message)
 
         # Wait for async task to complete
         await asyncio.sleep(0.1)
@@ -217,7 +212,7 @@ class TestCommandFlow:
         mock_websocket.send_message.reset_mock()
         mqtt_message.payload = b"ON"
 
-        device._handle_light_command(None, None, mqtt_message)
+        device._handle_command("light", None, None, mqtt_message)
         await asyncio.sleep(0.1)
 
         # Verify WebSocket message was sent
@@ -231,14 +226,7 @@ class TestNewEntitiesIntegration:
     """Integration tests for newly added entities."""
 
     @pytest.mark.asyncio
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Sensor")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Number")
-    async def test_all_entities_created_on_device_setup(
-        self, mock_number, mock_sensor, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, fixtures_dir
-    ):
+    async def test_all_entities_created_on_device_setup(self, mock_mqtt_settings, fixtures_dir, entity_classes):
         """Test that all entities are created when device is set up."""
         mock_api_client = MagicMock()
 
@@ -268,7 +256,9 @@ class TestNewEntitiesIntegration:
 
         from ryobi_gdo_2_mqtt.device_manager import DeviceManager
 
-        device_manager = DeviceManager(mqtt_settings=mock_mqtt_settings, api_client=mock_api_client)
+        device_manager = DeviceManager(
+            mqtt_settings=mock_mqtt_settings, api_client=mock_api_client, entity_classes=entity_classes
+        )
 
         device = await device_manager.setup_device("test_device", "Test Device", mock_websocket)
 
@@ -285,7 +275,7 @@ class TestNewEntitiesIntegration:
         assert hasattr(device, "fan_number")
 
     @pytest.mark.asyncio
-    async def test_vacation_mode_command_flow(self, mock_mqtt_settings, fixtures_dir):
+    async def test_vacation_mode_command_flow(self, mock_mqtt_settings, fixtures_dir, entity_classes):
         """Test vacation mode command flow."""
         from paho.mqtt.client import MQTTMessage
 
@@ -297,52 +287,39 @@ class TestNewEntitiesIntegration:
 
         loop = asyncio.get_running_loop()
 
-        with (
-            patch("ryobi_gdo_2_mqtt.device_manager.Cover"),
-            patch("ryobi_gdo_2_mqtt.device_manager.Switch"),
-            patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor"),
-            patch("ryobi_gdo_2_mqtt.device_manager.Sensor"),
-            patch("ryobi_gdo_2_mqtt.device_manager.Number"),
-        ):
-            from ryobi_gdo_2_mqtt.device_manager import RyobiDevice
-
-            device = RyobiDevice(
-                device_id="test_device",
-                device_name="Test Device",
-                mqtt_settings=mock_mqtt_settings,
-                websocket=mock_websocket,
-                api_client=mock_api_client,
-                loop=loop,
-            )
+        from ryobi_gdo_2_mqtt.device_manager import RyobiDevice
 
-            # Simulate MQTT vacation mode command
-            mqtt_message = MQTTMessage()
-            mqtt_message.payload = b"ON"
+        device = RyobiDevice(
+            device_id="test_device",
+            device_name="Test Device",
+            mqtt_settings=mock_mqtt_settings,
+            websocket=mock_websocket,
+            api_client=mock_api_client,
+            loop=loop,
+            entity_classes=entity_classes,
+        )
 
-            device._handle_vacation_command(None, None, mqtt_message)
+        # Simulate MQTT vacation mode command
+        mqtt_message = MQTTMessage()
+        mqtt_message.payload = b"ON"
 
-            # Wait for async task to complete
-            await asyncio.sleep(0.1)
+        device._handle_command("vacation_switch", None, None, mqtt_message)
 
-            # Verify WebSocket message was sent
-            mock_websocket.send_message.assert_called_once()
-            call_args = mock_websocket.send_message.call_args[0]
-            assert call_args[2] == "vacationMode"
-            assert call_args[3] == 1
+        # Wait for async task to complete
+        await asyncio.sleep(0.1)
+
+        # Verify WebSocket message was sent
+        mock_websocket.send_message.assert_called_once()
+        call_args = mock_websocket.send_message.call_args[0]
+        assert call_args[2] == "vacationMode"
+        assert call_args[3] == 1
 
 
 class TestEndToEndFlow:
     """End-to-end integration tests."""
 
     @pytest.mark.asyncio
-    @patch("ryobi_gdo_2_mqtt.device_manager.Cover")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Switch")
-    @patch("ryobi_gdo_2_mqtt.device_manager.BinarySensor")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Sensor")
-    @patch("ryobi_gdo_2_mqtt.device_manager.Number")
-    async def test_complete_flow_with_multiple_devices(
-        self, mock_number, mock_sensor, mock_binary_sensor, mock_switch, mock_cover, mock_mqtt_settings, fixtures_dir
-    ):
+    async def test_complete_flow_with_multiple_devices(self, mock_mqtt_settings, fixtures_dir, entity_classes):
         """Test complete flow with multiple devices: auth → discovery → setup → updates."""
         # Mock session
         mock_session = MagicMock(spec=ClientSession)
@@ -378,7 +355,9 @@ class TestEndToEndFlow:
         assert len(devices) == 2
 
         # Step 3: Setup device manager
-        device_manager = DeviceManager(mqtt_settings=mock_mqtt_settings, api_client=api_client)
+        device_manager = DeviceManager(
+            mqtt_settings=mock_mqtt_settings, api_client=api_client, entity_classes=entity_classes
+        )
         parser = WebSocketMessageParser()
         device_manager.parser = parser
 
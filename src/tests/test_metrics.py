@@ -0,0 +1,86 @@
+"""Tests for startup metrics."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from ryobi_gdo_2_mqtt.metrics import StartupMetrics
+
+
+class TestStartupMetrics:
+    """Tests for StartupMetrics."""
+
+    def test_phase_records_duration(self):
+        """Test that a phase records how long its block took, even when it raises."""
+        metrics = StartupMetrics()
+
+        with patch("ryobi_gdo_2_mqtt.metrics.time.monotonic", side_effect=[10.0, 10.5]):
+            with pytest.raises(RuntimeError), metrics.phase("login"):
+                raise RuntimeError("login failed")
+
+        assert metrics.phases == {"login": 0.5}
+
+    def test_first_state_is_measured_from_start_once(self):
+        """Test that only the first state publish of a device is recorded."""
+        metrics = StartupMetrics(started=100.0)
+
+        with patch("ryobi_gdo_2_mqtt.metrics.time.monotonic", side_effect=[102.0, 105.0]):
+            metrics.mark_first_state("device1")
+            metrics.mark_first_state("device1")
+
+        assert metrics.devices["device1"].first_state == 2.0
+
+    def test_reconnects_do_not_overwrite_first_connect(self):
+        """Test that a websocket reconnect keeps the startup connect time."""
+        metrics = StartupMetrics()
+
+        metrics.mark_websocket_connected(["device1", "device2"], 1.5)
+        metrics.mark_websocket_connected(["device1"], 9.0)
+
+        assert metrics.devices["device1"].websocket_connect == 1.5
+        assert metrics.devices["device2"].websocket_connect == 1.5
+
+    @pytest.mark.asyncio
+    async def test_wait_connected_waits_for_every_device(self):
+        """Test that waiting returns once each given device's websocket connected."""
+        metrics = StartupMetrics()
+        waiter = asyncio.create_task(metrics.wait_connected(["device1", "device2"], timeout=1))
+
+        metrics.mark_websocket_connected(["device1"], 1.0)
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        metrics.mark_websocket_connected(["device2"], 2.0)
+        assert await waiter is True
+
+    @pytest.mark.asyncio
+    async def test_wait_connected_times_out(self):
+        """Test that a device that never connects doesn't hold up the report forever."""
+        metrics = StartupMetrics()
+
+        assert await metrics.wait_connected(["device1"], timeout=0.01) is False
+
+    def test_report_logs_and_writes_summary(self, tmp_path):
+        """Test that the report is logged and exported as JSON."""
+        metrics = StartupMetrics()
+        metrics.phases["login"] = 0.25
+        metrics.device("device1").update_device = 0.5
+        path = tmp_path / "startup.json"
+
+        with patch("ryobi_gdo_2_mqtt.metrics.log") as mock_log:
+            metrics.report(str(path))
+
+        assert mock_log.info.call_count == 2
+        assert json.loads(path.read_text()) == {
+            "phases": {"login": 0.25},
+            "devices": {
+                "device1": {
+                    "update_device": 0.5,
+                    "entity_creation": None,
+                    "websocket_connect": None,
+                    "first_state": None,
+                }
+            },
+        }
@@ -1,6 +1,8 @@
 """Tests for data models."""
 
-from ryobi_gdo_2_mqtt.models import DeviceData, LoginResponse
+import pytest
+
+from ryobi_gdo_2_mqtt.models import DeviceData, DeviceUpdate, LoginResponse
 from tests.conftest import load_fixture
 
 
@@ -40,3 +42,43 @@ class TestDeviceData:
         assert data.light_state is None
         assert data.battery_level is None
         assert data.device_name is None
+
+
+class TestDeviceUpdate:
+    """Tests for DeviceUpdate."""
+
+    def test_presence_mask_tracks_set_fields(self):
+        """Test that only set fields are present, in field order."""
+        update = DeviceUpdate(fan=50)
+        update.set("door_state", "open")
+
+        assert list(update) == ["door_state", "fan"]
+        assert len(update) == 2
+        assert "fan" in update
+        assert "light_state" not in update
+        assert update.light_state is None
+
+    def test_falsy_values_are_present(self):
+        """Test that a field set to a falsy value still counts as present."""
+        update = DeviceUpdate(light_state=False, battery_level=0)
+
+        assert dict(update) == {"light_state": False, "battery_level": 0}
+
+    def test_mapping_access(self):
+        """Test dict-style access for present and absent fields."""
+        update = DeviceUpdate(motion=1)
+
+        assert update["motion"] == 1
+        assert update.get("fan") is None
+        assert update == {"motion": 1}
+        with pytest.raises(KeyError):
+            update["fan"]
+
+    def test_unknown_field_rejected(self):
+        """Test that unknown fields are rejected."""
+        with pytest.raises(TypeError):
+            DeviceUpdate(garage="open")
+
+    def test_is_slotted(self):
+        """Test that updates do not carry a per-instance dict."""
+        assert not hasattr(DeviceUpdate(), "__dict__")
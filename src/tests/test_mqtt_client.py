@@ -0,0 +1,197 @@
+"""Tests for the shared MQTT client."""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from ha_mqtt_discoverable import Settings as MQTTSettings
+from paho.mqtt.reasoncodes import ReasonCode
+
+from ryobi_gdo_2_mqtt.mqtt_client import SharedMQTTClient
+
+
+@pytest.fixture
+def client():
+    """Create a shared client that is never connected."""
+    return SharedMQTTClient(MQTTSettings.MQTT(host="localhost", port=1883, username="user", password="pass"))
+
+
+def connack(name: str = "Success") -> ReasonCode:
+    """Build a CONNACK reason code."""
+    from paho.mqtt.packettypes import PacketTypes
+
+    return ReasonCode(PacketTypes.CONNACK, name)
+
+
+class TestSharedMQTTClient:
+    """Tests for SharedMQTTClient."""
+
+    def test_on_connect_collects_callbacks(self, client):
+        """Test that setting on_connect adds a callback instead of replacing the previous one."""
+        first, second = MagicMock(), MagicMock()
+
+        client.on_connect = first
+        client.on_connect = second
+        client.on_connect(client, None, {}, connack())
+
+        first.assert_called_once()
+        second.assert_called_once()
+
+    def test_on_connect_registers_callback_once(self, client):
+        """Test that registering the same callback again doesn't run it twice."""
+        callback = MagicMock()
+
+        class Owner:
+            calls = 0
+
+            def on_connect(self, *args):
+                self.calls += 1
+
+        owner = Owner()
+        client.on_connect = callback
+        client.on_connect = callback
+        # A bound method is a new object on each access
+        client.on_connect = owner.on_connect
+        client.on_connect = owner.on_connect
+        client.on_connect(client, None, {}, connack())
+
+        callback.assert_called_once()
+        assert owner.calls == 1
+
+    def test_remove_connect_callback(self, client):
+        """Test that a removed connect callback no longer runs."""
+        removed, kept = MagicMock(), MagicMock()
+        client.on_connect = removed
+        client.on_connect = kept
+
+        client.remove_connect_callback(removed)
+        client.remove_connect_callback(removed)
+        client.on_connect(client, None, {}, connack())
+
+        removed.assert_not_called()
+        kept.assert_called_once()
+
+    def test_collect_connect_callbacks(self, client):
+        """Test that the callbacks registered within the block are collected."""
+        before, inside, other_thread = MagicMock(), MagicMock(), MagicMock()
+        client.on_connect = before
+
+        with client.collect_connect_callbacks() as collected:
+            client.on_connect = inside
+            thread = threading.Thread(target=setattr, args=(client, "on_connect", other_thread))
+            thread.start()
+            thread.join()
+        client.on_connect = MagicMock()
+
+        assert collected == [inside]
+
+    def test_failed_connect_skips_callbacks(self, client):
+        """Test that a refused connection does not run the connect callbacks."""
+        callback = MagicMock()
+        client.on_connect = callback
+
+        with patch("ryobi_gdo_2_mqtt.mqtt_client.log"):
+            client.on_connect(client, None, {}, connack("Not authorized"))
+
+        callback.assert_not_called()
+
+    def test_callback_error_does_not_stop_others(self, client):
+        """Test that one failing connect callback doesn't keep others from resubscribing."""
+        failing, working = MagicMock(side_effect=RuntimeError("boom")), MagicMock()
+        client.on_connect = failing
+        client.on_connect = working
+
+        with patch("ryobi_gdo_2_mqtt.mqtt_client.log"):
+            client.on_connect(client, None, {}, connack())
+
+        working.assert_called_once()
+
+    def test_entities_cannot_disconnect(self, client):
+        """Test that disconnect and loop_stop from entities are ignored."""
+        with (
+            patch("paho.mqtt.client.Client.disconnect") as disconnect,
+            patch("paho.mqtt.client.Client.loop_stop") as loop_stop,
+        ):
+            client.disconnect()
+            client.loop_stop()
+
+        disconnect.assert_not_called()
+        loop_stop.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_disconnects(self, client):
+        """Test that shutdown really disconnects and stops the network thread."""
+        with (
+            patch("paho.mqtt.client.Client.disconnect") as disconnect,
+            patch("paho.mqtt.client.Client.loop_stop") as loop_stop,
+        ):
+            await client.shutdown()
+
+        disconnect.assert_called_once()
+        loop_stop.assert_called_once()
+
+    def test_retired_topic_is_not_resubscribed(self, client):
+        """Test that command topics of removed entities are skipped on resubscribe."""
+        with patch("paho.mqtt.client.Client.subscribe") as subscribe, patch("paho.mqtt.client.Client.unsubscribe"):
+            client.message_callback_add("hmd/cover/acura/command", MagicMock())
+            client.retire("hmd/cover/acura/command")
+            client.subscribe("hmd/cover/acura/command", qos=1)
+
+            subscribe.assert_not_called()
+
+            # A new entity for the same topic revives it
+            client.message_callback_add("hmd/cover/acura/command", MagicMock())
+            client.subscribe("hmd/cover/acura/command", qos=1)
+
+            subscribe.assert_called_once_with("hmd/cover/acura/command", qos=1)
+
+
+class TestInLoopTransport:
+    """Tests for SharedMQTTClient driven by the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_messages_are_handled_on_the_event_loop(self):
+        """Test that the in-loop client round-trips a message without a network thread."""
+        client = SharedMQTTClient(MQTTSettings.MQTT(host="localhost", port=1883), in_loop=True)
+        received: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        def on_message(_client, _userdata, message):
+            received.set_result((message.payload, threading.get_ident()))
+
+        client.on_connect = lambda c, *args: c.subscribe("ryobi_test/in_loop")
+        client.message_callback_add("ryobi_test/in_loop", on_message)
+
+        try:
+            assert await client.start(timeout=5) is True
+            assert client._thread is None
+
+            # Wait for the SUBACK so the publish is routed back to us
+            for _ in range(50):
+                if not client._out_packet:
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+            client.publish("ryobi_test/in_loop", "open")
+
+            payload, thread_id = await asyncio.wait_for(received, timeout=5)
+        finally:
+            await client.shutdown()
+
+        assert payload == b"open"
+        assert thread_id == threading.get_ident()
+        assert not client.is_connected()
+
+    @pytest.mark.asyncio
+    async def test_unreachable_broker_retries_in_background(self):
+        """Test that a refused connection doesn't fail startup."""
+        client = SharedMQTTClient(MQTTSettings.MQTT(host="localhost", port=1), in_loop=True)
+
+        with patch("ryobi_gdo_2_mqtt.mqtt_client.log") as mock_log:
+            assert await client.start(timeout=0.1) is False
+            mock_log.warning.assert_called()
+            assert client._misc_task is not None
+            assert not client._misc_task.done()
+            await client.shutdown()
+
+        assert client._misc_task.done()
@@ -0,0 +1,63 @@
+"""Tests for the MQTT state outbox."""
+
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from ryobi_gdo_2_mqtt.outbox import StateOutbox
+
+
+@pytest.fixture
+def outbox():
+    """Create an empty outbox."""
+    return StateOutbox()
+
+
+class TestStateOutbox:
+    """Tests for StateOutbox."""
+
+    def test_keeps_latest_state_per_topic(self, outbox):
+        """Test that a topic holds only its latest state, in the place it was first queued."""
+        publish = MagicMock()
+        outbox.put("a/state", 1, publish, 1)
+        outbox.put("b/state", 1, publish, 2)
+        outbox.put("a/state", 1, publish, 3)
+
+        assert len(outbox) == 2
+        assert outbox.flush() == 2
+        assert publish.mock_calls == [call(3), call(2)]
+        assert outbox.stats.queued == 3
+        assert outbox.stats.compacted == 1
+        assert outbox.stats.compaction_ratio == 1.5
+        assert outbox.stats.max_depth == 2
+
+    def test_flushes_in_priority_order(self, outbox):
+        """Test that lower priorities are published first."""
+        publish = MagicMock()
+        outbox.put("wifi/state", 2, publish, "wifi")
+        outbox.put("light/state", 1, publish, "light")
+        outbox.put("door/state", 0, publish, "door")
+
+        outbox.flush()
+
+        assert publish.mock_calls == [call("door"), call("light"), call("wifi")]
+        assert outbox.stats.flushes == 1
+        assert outbox.stats.max_flush_seconds >= outbox.stats.last_flush_seconds >= 0
+
+    def test_flush_empty(self, outbox):
+        """Test that flushing an empty outbox is not counted."""
+        assert outbox.flush() == 0
+        assert outbox.stats.flushes == 0
+        assert outbox.stats.compaction_ratio == 1.0
+
+    def test_failed_publish_does_not_stop_flush(self, outbox):
+        """Test that an error publishing one state is counted and the rest are still published."""
+        failing = MagicMock(side_effect=RuntimeError("broker gone"))
+        publish = MagicMock()
+        outbox.put("door/state", 0, failing)
+        outbox.put("light/state", 1, publish)
+
+        assert outbox.flush() == 1
+        publish.assert_called_once_with()
+        assert outbox.stats.errors == 1
+        assert len(outbox) == 0
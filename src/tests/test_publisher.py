@@ -0,0 +1,67 @@
+"""Tests for the MQTT publisher thread."""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from ryobi_gdo_2_mqtt.publisher import MQTTPublisher
+
+
+@pytest.fixture
+def publisher():
+    """Create a publisher, stopped after the test."""
+    publisher = MQTTPublisher(batch_size=3)
+    yield publisher
+    publisher.stop()
+
+
+class TestMQTTPublisher:
+    """Tests for MQTTPublisher."""
+
+    def test_publishes_in_order_on_worker_thread(self, publisher):
+        """Test that publishes run in submit order off the submitting thread."""
+        calls = []
+        publish = MagicMock(side_effect=lambda value: calls.append((value, threading.current_thread().name)))
+
+        publisher.start()
+        for value in range(5):
+            publisher.submit(publish, value)
+        publisher.stop()
+
+        assert [value for value, _ in calls] == [0, 1, 2, 3, 4]
+        assert {thread for _, thread in calls} == {"mqtt-publisher"}
+        assert publisher.stats.published == 5
+
+    def test_drains_in_batches(self, publisher):
+        """Test that queued publishes are run in batches of at most batch_size."""
+        publish = MagicMock()
+        for value in range(7):
+            publisher.submit(publish, value)
+
+        publisher.start()
+        publisher.stop()
+
+        assert publish.call_count == 7
+        assert publisher.stats.batches == 3
+        assert publisher.stats.largest_batch == 3
+        assert publisher.stats.max_latency >= publisher.stats.mean_latency > 0
+
+    def test_failed_publish_does_not_stop_worker(self, publisher):
+        """Test that an error in one publish is counted and the rest still run."""
+        publish = MagicMock(side_effect=[RuntimeError("broker gone"), None])
+
+        publisher.start()
+        publisher.submit(publish, 1)
+        publisher.submit(publish, 2)
+        publisher.stop()
+
+        assert publish.call_count == 2
+        assert publisher.stats.errors == 1
+        assert publisher.stats.published == 1
+
+    def test_stop_without_start(self, publisher):
+        """Test that stopping a publisher that never started returns at once."""
+        publisher.stop()
+
+        assert publisher.stats.published == 0
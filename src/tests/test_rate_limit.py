@@ -0,0 +1,52 @@
+"""Tests for REST request rate limiting."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from ryobi_gdo_2_mqtt.rate_limit import TokenBucket
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket."""
+
+    def test_rejects_invalid_limits(self):
+        """Test that a bucket that never allows a request is rejected."""
+        with pytest.raises(ValueError, match="Rate must be greater than 0"):
+            TokenBucket(0)
+        with pytest.raises(ValueError, match="Burst must be 1 or greater"):
+            TokenBucket(1, burst=0)
+
+    @pytest.mark.asyncio
+    async def test_burst_is_not_throttled(self):
+        """Test that up to ``burst`` requests go through without waiting."""
+        bucket = TokenBucket(rate=1, burst=3)
+
+        with patch("ryobi_gdo_2_mqtt.rate_limit.asyncio.sleep") as mock_sleep:
+            waits = [await bucket.acquire() for _ in range(3)]
+
+        assert waits == [0.0, 0.0, 0.0]
+        mock_sleep.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_refill_once_empty(self):
+        """Test that a request beyond the burst waits for the next token."""
+        bucket = TokenBucket(rate=100, burst=1)
+
+        assert await bucket.acquire() == 0.0
+        waited = await bucket.acquire()
+
+        assert 0 < waited <= 0.01
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_spaced_by_rate(self):
+        """Test that concurrent waiters get tokens one rate interval apart."""
+        bucket = TokenBucket(rate=200, burst=1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+
+        # Four of the five requests wait 5ms each
+        assert loop.time() - start >= 0.018
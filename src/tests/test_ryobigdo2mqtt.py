@@ -6,6 +6,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from aiohttp import ClientSession
 
+from ryobi_gdo_2_mqtt.cache import DeviceSnapshot, DeviceSnapshotCache
 from ryobi_gdo_2_mqtt.exceptions import RyobiApiError
 from ryobi_gdo_2_mqtt.ryobigdo2mqtt import ApplicationBootstrap, ResourceManager, ServiceRunner
 from ryobi_gdo_2_mqtt.settings import Settings
@@ -161,6 +162,33 @@ class TestApplicationBootstrap:
             assert bootstrap.api_client is mock_client
             mock_client.get_api_key.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_authenticate_uses_cached_api_key(self, mock_settings, tmp_path):
+        """Test that a cached API key skips logging in."""
+        mock_settings.api_key_cache_file = str(tmp_path / "api_key.json")
+        bootstrap = ApplicationBootstrap(mock_settings)
+
+        with patch("ryobi_gdo_2_mqtt.ryobigdo2mqtt.RyobiApiClient") as mock_client_class:
+            mock_client = MagicMock()
+            mock_client.use_cached_api_key = MagicMock(return_value=True)
+            mock_client.get_api_key = AsyncMock(return_value=True)
+            mock_client_class.return_value = mock_client
+
+            await bootstrap.authenticate(MagicMock(spec=ClientSession))
+
+            assert mock_client_class.call_args.kwargs["key_cache"].path == tmp_path / "api_key.json"
+            mock_client.get_api_key.assert_not_called()
+
+    def test_load_snapshot(self, mock_settings, tmp_path):
+        """Test that devices cached by the previous run are loaded when caching is enabled."""
+        assert ApplicationBootstrap(mock_settings).load_snapshot() is None
+
+        mock_settings.device_cache_file = str(tmp_path / "devices.json")
+        snapshot = DeviceSnapshot(devices={"device1": "Device 1"}, modules={"device1": {}})
+        DeviceSnapshotCache(mock_settings.device_cache_file).store("test@example.com", snapshot)
+
+        assert ApplicationBootstrap(mock_settings).load_snapshot() == snapshot
+
     @pytest.mark.asyncio
     async def test_discover_devices_success(self, mock_settings):
         """Test successful device discovery."""
@@ -288,6 +316,152 @@ class TestServiceRunner:
             # Should only add task for successful device
             assert mock_resource_manager.add_task.call_count == 1
 
+    @pytest.mark.asyncio
+    async def test_setup_devices_listens_once_per_shared_websocket(
+        self, service_runner, mock_coordinator, mock_resource_manager
+    ):
+        """Test that a WebSocket shared by several devices is only started once."""
+        devices = {"device1": "Device 1", "device2": "Device 2"}
+        mock_session = MagicMock(spec=ClientSession)
+
+        mock_ws = MagicMock()
+        mock_ws.listen = AsyncMock()
+        mock_coordinator.setup_device = AsyncMock(return_value=mock_ws)
+
+        with patch("asyncio.create_task") as mock_create_task:
+            mock_create_task.return_value = MagicMock(spec=asyncio.Task)
+
+            await service_runner.setup_devices(devices, "user@example.com", "apikey123", mock_session)
+
+            assert mock_coordinator.setup_device.call_count == 2
+            assert mock_resource_manager.add_task.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_setup_devices_runs_concurrently_within_limit(self, mock_coordinator, mock_resource_manager):
+        """Test that devices are set up in parallel, never more than the limit at once."""
+        runner = ServiceRunner(
+            coordinator=mock_coordinator, resource_manager=mock_resource_manager, setup_concurrency=2
+        )
+        devices = {f"device{i}": f"Device {i}" for i in range(5)}
+        active = 0
+        peak = 0
+
+        async def setup_device(device_id, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            ws = MagicMock()
+            ws.listen = AsyncMock()
+            return ws
+
+        mock_coordinator.setup_device = AsyncMock(side_effect=setup_device)
+
+        await runner.setup_devices(devices, "user@example.com", "apikey123", MagicMock(spec=ClientSession))
+
+        assert peak == 2
+        assert mock_resource_manager.add_task.call_count == 5
+        for call in mock_resource_manager.add_task.call_args_list:
+            await call.args[0]
+
+    @pytest.mark.asyncio
+    async def test_setup_devices_listens_before_slow_devices_finish(
+        self, service_runner, mock_coordinator, mock_resource_manager
+    ):
+        """Test that a ready device starts listening while another is still being set up."""
+        release = asyncio.Event()
+        fast_ws = MagicMock()
+        fast_ws.listen = AsyncMock()
+
+        async def setup_device(device_id, **kwargs):
+            if device_id == "slow":
+                await release.wait()
+                raise ValueError("Setup failed")
+            return fast_ws
+
+        mock_coordinator.setup_device = AsyncMock(side_effect=setup_device)
+        setup = asyncio.create_task(
+            service_runner.setup_devices(
+                {"slow": "Slow", "fast": "Fast"}, "user@example.com", "apikey123", MagicMock(spec=ClientSession)
+            )
+        )
+        await asyncio.sleep(0.01)
+
+        assert fast_ws in service_runner._listening
+        mock_resource_manager.add_task.assert_called_once()
+
+        release.set()
+        await setup
+        assert mock_resource_manager.add_task.call_count == 1
+        await mock_resource_manager.add_task.call_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_report_startup_waits_for_ready_devices(self, mock_coordinator, mock_resource_manager):
+        """Test that startup timings are reported once the set up devices are connected."""
+        metrics = MagicMock()
+        metrics.wait_connected = AsyncMock(return_value=True)
+        runner = ServiceRunner(
+            coordinator=mock_coordinator,
+            resource_manager=mock_resource_manager,
+            metrics=metrics,
+            metrics_file="startup.json",
+        )
+        ws = MagicMock()
+        ws.listen = AsyncMock()
+        mock_coordinator.setup_device = AsyncMock(side_effect=[ValueError("Setup failed"), ws])
+
+        with patch("asyncio.create_task"):
+            await runner.setup_devices(
+                {"device1": "Device 1", "device2": "Device 2"},
+                "user@example.com",
+                "apikey123",
+                MagicMock(spec=ClientSession),
+            )
+        await runner.report_startup()
+
+        metrics.wait_connected.assert_awaited_once_with(["device2"])
+        metrics.report.assert_called_once_with("startup.json")
+
+    @pytest.mark.asyncio
+    async def test_revalidate_applies_device_list_differences(self, mock_coordinator, mock_resource_manager):
+        """Test that cached devices are checked, gone ones removed and new ones set up."""
+        device_cache = MagicMock()
+        runner = ServiceRunner(mock_coordinator, mock_resource_manager, device_cache=device_cache)
+        runner.devices = {"device1": "Device 1", "device2": "Device 2"}
+        runner._ready = ["device1", "device2"]
+        mock_coordinator.api_client.username = "user@example.com"
+        mock_coordinator.api_client.get_devices = AsyncMock(return_value={"device1": "Renamed", "device3": "Device 3"})
+        mock_coordinator.remove_device = AsyncMock()
+        mock_coordinator.device_manager.revalidate_device = AsyncMock(return_value=True)
+        mock_coordinator.setup_device = AsyncMock(return_value=MagicMock())
+
+        with patch.object(runner, "_start_listening"):
+            await runner.revalidate("user@example.com", "apikey123", MagicMock(spec=ClientSession))
+
+        mock_coordinator.remove_device.assert_awaited_once_with("device2")
+        mock_coordinator.device_manager.revalidate_device.assert_awaited_once_with("device1")
+        assert mock_coordinator.setup_device.call_args.kwargs["device_id"] == "device3"
+        assert runner.devices == {"device1": "Renamed", "device3": "Device 3"}
+        assert runner._ready == ["device1", "device3"]
+        mock_coordinator.device_manager.snapshot.assert_called_once_with(runner.devices)
+        device_cache.store.assert_called_once_with("user@example.com", mock_coordinator.device_manager.snapshot())
+
+    @pytest.mark.asyncio
+    async def test_revalidate_keeps_cached_devices_when_offline(self, mock_coordinator, mock_resource_manager):
+        """Test that the cached devices stay when the device list can't be fetched."""
+        device_cache = MagicMock()
+        runner = ServiceRunner(mock_coordinator, mock_resource_manager, device_cache=device_cache)
+        runner.devices = {"device1": "Device 1"}
+        mock_coordinator.api_client.get_devices = AsyncMock(side_effect=RyobiApiError("offline"))
+        mock_coordinator.remove_device = AsyncMock()
+
+        await runner.revalidate("user@example.com", "apikey123", MagicMock(spec=ClientSession))
+
+        mock_coordinator.remove_device.assert_not_called()
+        assert runner.devices == {"device1": "Device 1"}
+        device_cache.store.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_run_gathers_tasks(self, service_runner, mock_resource_manager):
         """Test run gathers all tasks."""
@@ -1,18 +1,31 @@
 """Tests for service coordinator."""
 
-from unittest.mock import AsyncMock, MagicMock
+import asyncio
+import logging
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from ryobi_gdo_2_mqtt.command_scheduler import CommandStats
 from ryobi_gdo_2_mqtt.constants import WebSocketState
+from ryobi_gdo_2_mqtt.device_manager import PublishStats
+from ryobi_gdo_2_mqtt.dispatcher import QueueStats
+from ryobi_gdo_2_mqtt.door_motion import MotionStats
+from ryobi_gdo_2_mqtt.metrics import StartupMetrics
+from ryobi_gdo_2_mqtt.outbox import StateOutbox
+from ryobi_gdo_2_mqtt.rate_limit import RequestStats
 from ryobi_gdo_2_mqtt.service import ServiceCoordinator
 from ryobi_gdo_2_mqtt.websocket import SIGNAL_CONNECTION_STATE
+from ryobi_gdo_2_mqtt.websocket_parser import WebSocketMessageParser
+from tests.conftest import load_fixture
 
 
 @pytest.fixture
 def mock_api_client():
     """Create mock API client."""
-    return MagicMock()
+    client = MagicMock()
+    client.request_stats = RequestStats()
+    return client
 
 
 @pytest.fixture
@@ -21,7 +34,15 @@ def mock_device_manager():
     manager = MagicMock()
     manager.devices = {}
     manager.handle_device_update = AsyncMock()
+    manager.cancel_resyncs = AsyncMock()
+    manager.close = AsyncMock()
     manager.setup_device = AsyncMock()
+    manager.parser = None
+    manager.publisher = None
+    manager.outbox = None
+    manager.publish_stats.return_value = PublishStats()
+    manager.motion_stats.return_value = MotionStats()
+    manager.command_stats.return_value = {}
     return manager
 
 
@@ -70,6 +91,17 @@ class TestServiceCoordinator:
         # Should not raise
         await callback(SIGNAL_CONNECTION_STATE, WebSocketState.CONNECTED)
 
+    @pytest.mark.asyncio
+    async def test_websocket_connected_records_startup_timing(self, coordinator, mock_session):
+        """Test that a device's first WebSocket connect is recorded in the startup metrics."""
+        coordinator.device_manager.metrics = StartupMetrics()
+        ws = await coordinator.setup_device("device1", "Device 1", "user", "key", mock_session)
+        ws.connect_seconds = 1.25
+
+        await ws.callback(SIGNAL_CONNECTION_STATE, WebSocketState.CONNECTED)
+
+        assert coordinator.device_manager.metrics.devices["device1"].websocket_connect == 1.25
+
     @pytest.mark.asyncio
     async def test_websocket_callback_handles_stopped_state(self, coordinator):
         """Test WebSocket callback handles STOPPED state."""
@@ -90,6 +122,29 @@ class TestServiceCoordinator:
 
         coordinator.device_manager.handle_device_update.assert_called_once_with(device_id, test_data)
 
+    @pytest.mark.asyncio
+    async def test_websocket_callback_queues_data_on_dispatcher(self, coordinator):
+        """Test WebSocket data is handed to the dispatcher when one is configured."""
+        coordinator.dispatcher = MagicMock()
+        coordinator.dispatcher.submit = AsyncMock()
+        callback = coordinator.create_websocket_callback("test_device")
+        test_data = {"test": "data"}
+
+        await callback("data", test_data)
+
+        coordinator.dispatcher.submit.assert_called_once_with("test_device", test_data)
+        coordinator.device_manager.handle_device_update.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_closes_dispatcher(self, coordinator):
+        """Test cleanup stops the dispatcher."""
+        coordinator.dispatcher = MagicMock()
+        coordinator.dispatcher.close = AsyncMock()
+
+        await coordinator.cleanup()
+
+        coordinator.dispatcher.close.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_cleanup_closes_websockets(self, coordinator, mock_session):
         """Test cleanup closes all WebSockets."""
@@ -108,6 +163,19 @@ class TestServiceCoordinator:
         ws1.close.assert_called_once()
         ws2.close.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_remove_device_closes_its_websocket(self, coordinator, mock_session):
+        """Test removing a device closes its dedicated WebSocket."""
+        coordinator.device_manager.remove_device = AsyncMock()
+        ws = await coordinator.setup_device("device1", "Device 1", "user", "key", mock_session)
+        ws.close = AsyncMock()
+
+        await coordinator.remove_device("device1")
+
+        ws.close.assert_called_once()
+        assert "device1" not in coordinator.websockets
+        coordinator.device_manager.remove_device.assert_called_once_with("device1")
+
     @pytest.mark.asyncio
     async def test_cleanup_cleans_up_devices(self, coordinator, mock_session):
         """Test cleanup calls cleanup on all devices."""
@@ -127,3 +195,167 @@ class TestServiceCoordinator:
 
         mock_device1.cleanup.assert_called_once()
         mock_device2.cleanup.assert_called_once()
+
+    def test_stats_groups_counters_per_component(self, coordinator):
+        """Test that the counters of every enabled component are collected, with derived values."""
+        coordinator.api_client.request_stats = RequestStats(sent=5, coalesced=2)
+        coordinator.dispatcher = MagicMock()
+        coordinator.dispatcher.stats = {"device1": QueueStats(enqueued=250, processed=240, dropped=9)}
+        coordinator.device_manager.parser = WebSocketMessageParser()
+        coordinator.device_manager.parser.stale_dropped = 4
+        coordinator.device_manager.parser.gaps_detected = 2
+        coordinator.device_manager.publish_stats.return_value = PublishStats(sent=7, suppressed=3)
+        coordinator.device_manager.outbox = StateOutbox()
+        coordinator.device_manager.motion_stats.return_value = MotionStats(received=10, published=4, motions=1)
+        coordinator.device_manager.command_stats.return_value = {"doorCommand": CommandStats(queued=2, sent=2)}
+
+        stats = coordinator.stats()
+
+        assert list(stats) == [
+            "api_requests",
+            "dispatch device1",
+            "websocket_updates",
+            "entity_states",
+            "mqtt_outbox",
+            "door_motion",
+            "commands doorCommand",
+        ]
+        assert stats["api_requests"]["coalesced"] == 2
+        assert stats["dispatch device1"]["dropped"] == 9
+        assert stats["websocket_updates"] == {"stale_dropped": 4, "gaps_detected": 2}
+        assert stats["entity_states"] == {"sent": 7, "suppressed": 3}
+        assert stats["mqtt_outbox"]["depth"] == 0
+        assert stats["door_motion"]["reduction"] == pytest.approx(0.6)
+        assert stats["commands doorCommand"]["sent"] == 2
+
+    def test_log_stats(self, coordinator, caplog):
+        """Test that every group of counters is logged on one line."""
+        coordinator.device_manager.publish_stats.return_value = PublishStats(sent=7, suppressed=3)
+
+        with caplog.at_level(logging.INFO, logger="ryobi_gdo_2_mqtt.logging"):
+            coordinator.log_stats()
+
+        assert "Stats entity_states: sent=7, suppressed=3" in caplog.text
+        assert "Stats api_requests: sent=0, coalesced=0, throttled=0, throttled_seconds=0.000" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_cleanup_logs_stats_after_closing(self, coordinator, caplog):
+        """Test that cleanup logs the final counters, including the dispatch queues it closed."""
+        coordinator.dispatcher = MagicMock()
+        coordinator.dispatcher.close = AsyncMock()
+        coordinator.dispatcher.stats = {"device1": QueueStats(enqueued=250, processed=240, dropped=9)}
+
+        with caplog.at_level(logging.INFO, logger="ryobi_gdo_2_mqtt.logging"):
+            await coordinator.cleanup()
+
+        assert "Stats dispatch device1: depth=0, high_watermark=0, enqueued=250, processed=240" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_report_stats_logs_every_interval(self, coordinator):
+        """Test that the counters are logged periodically while the service runs."""
+        with patch.object(coordinator, "log_stats") as log_stats:
+            task = asyncio.create_task(coordinator.report_stats(0.01))
+            await asyncio.sleep(0.035)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        assert log_stats.call_count >= 2
+
+
+class TestServiceCoordinatorMultiplex:
+    """Tests for ServiceCoordinator with a shared WebSocket per account."""
+
+    @pytest.fixture
+    def coordinator(self, mock_api_client, mock_device_manager):
+        """Create a multiplexing service coordinator instance."""
+        return ServiceCoordinator(api_client=mock_api_client, device_manager=mock_device_manager, multiplex=True)
+
+    @pytest.mark.asyncio
+    async def test_devices_share_one_websocket(self, coordinator, mock_session):
+        """Test that devices on the same account share a WebSocket."""
+        ws1 = await coordinator.setup_device("device1", "Device 1", "user", "key", mock_session)
+        ws2 = await coordinator.setup_device("device2", "Device 2", "user", "key", mock_session)
+
+        assert ws1 is ws2
+        assert ws1.devices == ["device1", "device2"]
+        assert coordinator.pools["user"].shards == [ws1]
+        coordinator.device_manager.setup_device.assert_any_call("device1", "Device 1", coordinator.pools["user"])
+
+    @pytest.mark.asyncio
+    async def test_accounts_get_separate_websockets(self, coordinator, mock_session):
+        """Test that each account gets its own shared WebSocket."""
+        ws1 = await coordinator.setup_device("device1", "Device 1", "user1", "key", mock_session)
+        ws2 = await coordinator.setup_device("device2", "Device 2", "user2", "key", mock_session)
+
+        assert ws1 is not ws2
+
+    @pytest.mark.asyncio
+    async def test_failed_device_is_not_subscribed(self, coordinator, mock_session):
+        """Test that a device whose setup fails is not subscribed."""
+        coordinator.device_manager.setup_device.side_effect = ValueError("Setup failed")
+
+        with pytest.raises(ValueError, match="Setup failed"):
+            await coordinator.setup_device("device1", "Device 1", "user", "key", mock_session)
+
+        assert coordinator.pools["user"].devices == []
+
+    @pytest.mark.asyncio
+    async def test_shared_callback_routes_data_to_device(self, coordinator, mock_session, fixtures_dir):
+        """Test that shared WebSocket data is routed to the device in params.varName."""
+        ws = await coordinator.setup_device("c4be84986d2e", "Acura", "user", "key", mock_session)
+        await coordinator.setup_device("d4f513e9a416", "Genesis", "user", "key", mock_session)
+        data = load_fixture(fixtures_dir, "ws_message_1762952771.json")
+
+        await ws.callback("data", data)
+
+        coordinator.device_manager.handle_device_update.assert_called_once_with("c4be84986d2e", data)
+
+    @pytest.mark.asyncio
+    async def test_shared_callback_ignores_responses(self, coordinator, mock_session, fixtures_dir):
+        """Test that RPC responses on a shared WebSocket are not routed to any device."""
+        ws = await coordinator.setup_device("c4be84986d2e", "Acura", "user", "key", mock_session)
+
+        await ws.callback("data", load_fixture(fixtures_dir, "ws_message_1762952686.json"))
+        await ws.callback(SIGNAL_CONNECTION_STATE, WebSocketState.CONNECTED)
+
+        coordinator.device_manager.handle_device_update.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_devices_are_sharded_by_topics_per_connection(
+        self, mock_api_client, mock_device_manager, mock_session
+    ):
+        """Test that devices beyond the per-connection limit open another WebSocket."""
+        coordinator = ServiceCoordinator(
+            api_client=mock_api_client, device_manager=mock_device_manager, multiplex=True, topics_per_connection=2
+        )
+
+        shards = [
+            await coordinator.setup_device(f"device{i}", f"Device {i}", "user", "key", mock_session) for i in range(3)
+        ]
+
+        assert shards[0] is shards[1]
+        assert shards[2] is not shards[0]
+        assert len(coordinator.pools["user"].shards) == 2
+
+    @pytest.mark.asyncio
+    async def test_remove_device_rebalances_pool(self, coordinator, mock_session):
+        """Test removing a device drops it from its pool and the device manager."""
+        coordinator.device_manager.remove_device = AsyncMock()
+        ws = await coordinator.setup_device("device1", "Device 1", "user", "key", mock_session)
+
+        await coordinator.remove_device("device1")
+
+        assert ws.devices == []
+        assert coordinator.pools["user"].shards == []
+        coordinator.device_manager.remove_device.assert_called_once_with("device1")
+
+    @pytest.mark.asyncio
+    async def test_cleanup_closes_shared_websocket_once(self, coordinator, mock_session):
+        """Test cleanup closes a shared WebSocket only once."""
+        ws = await coordinator.setup_device("device1", "Device 1", "user", "key", mock_session)
+        await coordinator.setup_device("device2", "Device 2", "user", "key", mock_session)
+        ws.close = AsyncMock()
+
+        await coordinator.cleanup()
+
+        ws.close.assert_called_once()
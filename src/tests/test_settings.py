@@ -6,6 +6,7 @@ from unittest.mock import patch
 import pytest
 from pydantic import ValidationError
 
+from ryobi_gdo_2_mqtt.constants import OverflowPolicy
 from ryobi_gdo_2_mqtt.settings import Settings
 
 
@@ -44,6 +45,23 @@ class TestSettings:
         assert settings.mqtt_port == 1883
         assert settings.mqtt_user == ""
         assert settings.mqtt_password.get_secret_value() == ""
+        assert settings.websocket_multiplex is False
+        assert settings.websocket_topics_per_connection == 50
+        assert settings.dispatch_queue_size == 100
+        assert settings.dispatch_overflow == OverflowPolicy.DROP_OLDEST
+        assert settings.mqtt_republish_after == 0
+        assert settings.mqtt_shared_connection is False
+        assert settings.mqtt_in_loop_transport is False
+        assert settings.mqtt_publisher_thread is False
+        assert settings.mqtt_outbox is False
+        assert settings.door_motion_interval == 1.0
+        assert settings.command_scheduler is False
+        assert settings.command_spacing == 0.2
+        assert settings.setup_concurrency == 4
+        assert settings.api_key_cache_file == ""
+        assert settings.device_cache_file == ""
+        assert settings.api_rate_limit == 0
+        assert settings.api_rate_burst == 5
 
     def test_settings_password_is_secret(self):
         """Test that password is stored as SecretStr."""
@@ -182,3 +200,91 @@ class TestSettings:
                     _cli_parse_args=False,
                 )
             assert "Log level must be one of" in str(exc_info.value)
+
+    def test_websocket_topics_per_connection_validation(self):
+        """Test that a negative websocket shard size is rejected."""
+        with patch.dict(os.environ, {}, clear=False):
+            with pytest.raises(ValidationError) as exc_info:
+                Settings(
+                    email="test@example.com",
+                    password="testpass",
+                    mqtt_host="localhost",
+                    websocket_topics_per_connection=-1,
+                    _cli_parse_args=False,
+                )
+            assert "Topics per connection must be 0 or greater" in str(exc_info.value)
+
+    def test_setup_concurrency_validation(self):
+        """Test that setting up fewer than one device at a time is rejected."""
+        with patch.dict(os.environ, {}, clear=False):
+            with pytest.raises(ValidationError) as exc_info:
+                Settings(
+                    email="test@example.com",
+                    password="testpass",
+                    mqtt_host="localhost",
+                    setup_concurrency=0,
+                    _cli_parse_args=False,
+                )
+            assert "Setup concurrency must be 1 or greater" in str(exc_info.value)
+
+    def test_api_rate_limit_validation(self):
+        """Test that a negative rate limit or an empty burst is rejected."""
+        with patch.dict(os.environ, {}, clear=False):
+            with pytest.raises(ValidationError) as exc_info:
+                Settings(
+                    email="test@example.com",
+                    password="testpass",
+                    mqtt_host="localhost",
+                    api_rate_limit=-1,
+                    _cli_parse_args=False,
+                )
+            assert "API rate limit must be 0 or greater" in str(exc_info.value)
+
+            with pytest.raises(ValidationError) as exc_info:
+                Settings(
+                    email="test@example.com",
+                    password="testpass",
+                    mqtt_host="localhost",
+                    api_rate_burst=0,
+                    _cli_parse_args=False,
+                )
+            assert "API rate burst must be 1 or greater" in str(exc_info.value)
+
+    def test_door_motion_interval_validation(self):
+        """Test that a negative door motion interval is rejected."""
+        with patch.dict(os.environ, {}, clear=False):
+            with pytest.raises(ValidationError) as exc_info:
+                Settings(
+                    email="test@example.com",
+                    password="testpass",
+                    mqtt_host="localhost",
+                    door_motion_interval=-1,
+                    _cli_parse_args=False,
+                )
+            assert "Door motion interval must be 0 or greater" in str(exc_info.value)
+
+    def test_stats_interval_validation(self):
+        """Test that a negative stats interval is rejected."""
+        with patch.dict(os.environ, {}, clear=False):
+            with pytest.raises(ValidationError) as exc_info:
+                Settings(
+                    email="test@example.com",
+                    password="testpass",
+                    mqtt_host="localhost",
+                    stats_interval=-1,
+                    _cli_parse_args=False,
+                )
+            assert "Stats interval must be 0 or greater" in str(exc_info.value)
+
+    def test_command_spacing_validation(self):
+        """Test that a negative command spacing is rejected."""
+        with patch.dict(os.environ, {}, clear=False):
+            with pytest.raises(ValidationError) as exc_info:
+                Settings(
+                    email="test@example.com",
+                    password="testpass",
+                    mqtt_host="localhost",
+                    command_spacing=-1,
+                    _cli_parse_args=False,
+                )
+            assert "Command spacing must be 0 or greater" in str(exc_info.value)
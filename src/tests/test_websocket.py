@@ -1,16 +1,21 @@
 """Tests for WebSocket client."""
 
+import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from aiohttp import ClientSession, WSMsgType
+from aiohttp import ClientConnectionError, ClientSession, WSMsgType
 
+from ryobi_gdo_2_mqtt.exceptions import RyobiAuthenticationError, RyobiRpcError
 from ryobi_gdo_2_mqtt.websocket import (
+    ERROR_AUTH_FAILURE,
     STATE_CONNECTED,
     STATE_DISCONNECTED,
     STATE_STOPPED,
     RyobiWebSocket,
 )
+from tests.conftest import load_fixture
 
 
 @pytest.fixture
@@ -37,6 +42,17 @@ def websocket_client(mock_session, mock_callback):
     )
 
 
+def acking_send(websocket, result=None):
+    """Mock websocket_send so the server answers every request immediately."""
+
+    async def send(frame):
+        request = json.loads(frame)
+        websocket._resolve_response({"jsonrpc": "2.0", "id": request["id"], "result": result or {"result": "OK"}})
+        return True
+
+    return AsyncMock(side_effect=send)
+
+
 class TestRyobiWebSocket:
     """Tests for RyobiWebSocket."""
 
@@ -44,7 +60,7 @@ class TestRyobiWebSocket:
         """Test WebSocket client initialization."""
         assert websocket_client._user == "test@example.com"
         assert websocket_client._apikey == "test_api_key"
-        assert websocket_client._device_id == "test_device"
+        assert websocket_client.devices == ["test_device"]
         assert websocket_client.failed_attempts == 0
         assert websocket_client._state is None
 
@@ -59,12 +75,12 @@ class TestRyobiWebSocket:
     @pytest.mark.asyncio
     async def test_websocket_auth_sends_correct_message(self, websocket_client):
         """Test that websocket_auth sends correct authentication message."""
-        websocket_client.websocket_send = AsyncMock()
+        websocket_client.websocket_send = acking_send(websocket_client)
 
         await websocket_client.websocket_auth()
 
         websocket_client.websocket_send.assert_called_once()
-        call_args = websocket_client.websocket_send.call_args[0][0]
+        call_args = json.loads(websocket_client.websocket_send.call_args[0][0])
         assert call_args["method"] == "srvWebSocketAuth"
         assert call_args["params"]["varName"] == "test@example.com"
         assert call_args["params"]["apiKey"] == "test_api_key"
@@ -72,15 +88,112 @@ class TestRyobiWebSocket:
     @pytest.mark.asyncio
     async def test_websocket_subscribe_sends_correct_message(self, websocket_client):
         """Test that websocket_subscribe sends correct subscription message."""
-        websocket_client.websocket_send = AsyncMock()
+        websocket_client.websocket_send = acking_send(websocket_client)
 
         await websocket_client.websocket_subscribe()
 
         websocket_client.websocket_send.assert_called_once()
-        call_args = websocket_client.websocket_send.call_args[0][0]
+        call_args = json.loads(websocket_client.websocket_send.call_args[0][0])
         assert call_args["method"] == "wskSubscribe"
         assert call_args["params"]["topic"] == "test_device.wskAttributeUpdateNtfy"
 
+    @pytest.mark.asyncio
+    async def test_websocket_subscribe_sends_one_subscription_per_device(self, websocket_client):
+        """Test that a multiplexed connection subscribes to every device's topic."""
+        websocket_client.websocket_send = acking_send(websocket_client)
+        await websocket_client.add_device("other_device")
+
+        await websocket_client.websocket_subscribe()
+
+        topics = [json.loads(call[0][0])["params"]["topic"] for call in websocket_client.websocket_send.call_args_list]
+        assert topics == ["test_device.wskAttributeUpdateNtfy", "other_device.wskAttributeUpdateNtfy"]
+
+    @pytest.mark.asyncio
+    async def test_websocket_subscribe_includes_devices_added_meanwhile(self, websocket_client):
+        """Test that a device added while subscriptions are in flight is subscribed too."""
+        acking = acking_send(websocket_client)
+
+        async def send(frame):
+            if json.loads(frame)["params"]["topic"].startswith("test_device"):
+                await websocket_client.add_device("late_device")
+            return await acking(frame)
+
+        websocket_client.websocket_send = AsyncMock(side_effect=send)
+
+        await websocket_client.websocket_subscribe()
+
+        topics = [json.loads(call[0][0])["params"]["topic"] for call in websocket_client.websocket_send.call_args_list]
+        assert topics == ["test_device.wskAttributeUpdateNtfy", "late_device.wskAttributeUpdateNtfy"]
+
+    @pytest.mark.asyncio
+    async def test_add_device_subscribes_when_connected(self, websocket_client):
+        """Test that adding a device to a live connection subscribes it immediately."""
+        websocket_client._state = STATE_CONNECTED
+        websocket_client.websocket_send = acking_send(websocket_client)
+
+        await websocket_client.add_device("other_device")
+        await websocket_client.add_device("other_device")
+
+        websocket_client.websocket_send.assert_called_once()
+        call_args = json.loads(websocket_client.websocket_send.call_args[0][0])
+        assert call_args["params"]["topic"] == "other_device.wskAttributeUpdateNtfy"
+        assert websocket_client.devices == ["test_device", "other_device"]
+
+    @pytest.mark.asyncio
+    async def test_add_device_defers_subscription_until_connected(self, websocket_client):
+        """Test that adding a device before connecting only records it."""
+        websocket_client.websocket_send = AsyncMock()
+
+        await websocket_client.add_device("other_device")
+
+        websocket_client.websocket_send.assert_not_called()
+        assert "other_device" in websocket_client.devices
+
+    @pytest.mark.asyncio
+    async def test_remove_device(self, websocket_client):
+        """Test removing a device from a disconnected connection only forgets it."""
+        websocket_client.websocket_send = AsyncMock()
+
+        await websocket_client.remove_device("test_device")
+        await websocket_client.remove_device("unknown_device")
+
+        assert websocket_client.devices == []
+        websocket_client.websocket_send.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_remove_device_unsubscribes_when_connected(self, websocket_client):
+        """Test that removing a device from a live connection unsubscribes it."""
+        websocket_client._state = STATE_CONNECTED
+        websocket_client.websocket_send = acking_send(websocket_client)
+
+        await websocket_client.remove_device("test_device")
+
+        request = json.loads(websocket_client.websocket_send.call_args[0][0])
+        assert request["method"] == "wskUnsubscribe"
+        assert request["params"]["topic"] == "test_device.wskAttributeUpdateNtfy"
+        assert websocket_client.devices == []
+
+    def test_device_for_routes_by_var_name(self, websocket_client, fixtures_dir):
+        """Test that notifications are routed using params.varName."""
+        websocket_client._device_ids = ["c4be84986d2e"]
+        data = load_fixture(fixtures_dir, "ws_message_1762952771.json")
+
+        assert websocket_client.device_for(data) == "c4be84986d2e"
+
+    def test_device_for_falls_back_to_topic(self, websocket_client):
+        """Test that notifications without varName are routed using the topic."""
+        data = {"method": "wskAttributeUpdateNtfy", "params": {"topic": "test_device.wskAttributeUpdateNtfy"}}
+
+        assert websocket_client.device_for(data) == "test_device"
+
+    def test_device_for_ignores_other_messages(self, websocket_client, fixtures_dir):
+        """Test that RPC responses and foreign devices are not routed."""
+        ack = load_fixture(fixtures_dir, "ws_message_1762952686.json")
+        foreign = load_fixture(fixtures_dir, "ws_message_1762952771.json")
+
+        assert websocket_client.device_for(ack) is None
+        assert websocket_client.device_for(foreign) is None
+
     @pytest.mark.asyncio
     async def test_websocket_send_success(self, websocket_client):
         """Test successful websocket message sending."""
@@ -120,27 +233,127 @@ class TestRyobiWebSocket:
     async def test_send_message_when_connected(self, websocket_client):
         """Test sending command message when connected."""
         websocket_client._state = STATE_CONNECTED
-        websocket_client.websocket_send = AsyncMock()
+        websocket_client.websocket_send = acking_send(websocket_client)
 
-        await websocket_client.send_message(7, 5, "doorCommand", 1)
+        assert await websocket_client.send_message(7, 5, "doorCommand", 1) is True
 
         websocket_client.websocket_send.assert_called_once()
-        call_args = websocket_client.websocket_send.call_args[0][0]
+        call_args = json.loads(websocket_client.websocket_send.call_args[0][0])
         assert call_args["method"] == "gdoModuleCommand"
         assert call_args["params"]["portId"] == 7
         assert call_args["params"]["moduleType"] == 5
         assert call_args["params"]["moduleMsg"]["doorCommand"] == 1
 
+    @pytest.mark.asyncio
+    async def test_repeated_requests_reuse_encoded_bodies(self, websocket_client):
+        """Test that repeating auth and a command encodes nothing but the request IDs."""
+        websocket_client._state = STATE_CONNECTED
+        websocket_client.websocket_send = acking_send(websocket_client)
+        await websocket_client.websocket_auth()
+        await websocket_client.send_message(7, 5, "doorCommand", 1)
+
+        with patch("ryobi_gdo_2_mqtt.frames.json.dumps") as dumps:
+            await websocket_client.websocket_auth()
+            await websocket_client.send_message(7, 5, "doorCommand", 1)
+
+        dumps.assert_not_called()
+        first_auth, first_command, auth, command = (
+            json.loads(call[0][0]) for call in websocket_client.websocket_send.call_args_list
+        )
+        assert auth["params"] == first_auth["params"]
+        assert command["params"] == first_command["params"]
+        assert command["id"] != first_command["id"]
+
+    @pytest.mark.asyncio
+    async def test_send_message_targets_device_topic(self, websocket_client):
+        """Test that commands on a multiplexed connection are addressed to the given device."""
+        websocket_client._state = STATE_CONNECTED
+        websocket_client.websocket_send = acking_send(websocket_client)
+
+        await websocket_client.send_message(7, 5, "doorCommand", 1)
+        await websocket_client.send_message(7, 5, "doorCommand", 1, device_id="other_device")
+
+        topics = [json.loads(call[0][0])["params"]["topic"] for call in websocket_client.websocket_send.call_args_list]
+        assert topics == ["test_device", "other_device"]
+
     @pytest.mark.asyncio
     async def test_send_message_when_not_connected(self, websocket_client):
         """Test that send_message does nothing when not connected."""
         websocket_client._state = STATE_DISCONNECTED
         websocket_client.websocket_send = AsyncMock()
 
-        await websocket_client.send_message(7, 5, "doorCommand", 1)
+        assert await websocket_client.send_message(7, 5, "doorCommand", 1) is False
 
         websocket_client.websocket_send.assert_not_called()
 
+    @pytest.mark.asyncio
+    async def test_requests_use_unique_ids(self, websocket_client):
+        """Test that every request carries its own id so responses can be matched."""
+        websocket_client.websocket_send = acking_send(websocket_client)
+        await websocket_client.add_device("other_device")
+
+        await websocket_client.websocket_auth()
+        await websocket_client.websocket_subscribe()
+
+        ids = [json.loads(call[0][0])["id"] for call in websocket_client.websocket_send.call_args_list]
+        assert len(set(ids)) == 3
+        assert websocket_client._pending == {}
+
+    @pytest.mark.asyncio
+    async def test_websocket_auth_rejected(self, websocket_client):
+        """Test that an auth response without OK raises."""
+        websocket_client.websocket_send = acking_send(websocket_client, result={"result": "FAIL"})
+
+        with pytest.raises(RyobiAuthenticationError):
+            await websocket_client.websocket_auth()
+
+    @pytest.mark.asyncio
+    async def test_request_error_response(self, websocket_client):
+        """Test that a JSON-RPC error response is raised to the caller."""
+
+        async def send(frame):
+            websocket_client._resolve_response({"id": json.loads(frame)["id"], "error": {"message": "bad topic"}})
+            return True
+
+        websocket_client.websocket_send = AsyncMock(side_effect=send)
+
+        with pytest.raises(RyobiRpcError, match="bad topic"):
+            await websocket_client.request("wskSubscribe", {"topic": "x"})
+
+    @pytest.mark.asyncio
+    async def test_request_times_out(self, websocket_client):
+        """Test that an unanswered request times out and is forgotten."""
+        websocket_client.websocket_send = AsyncMock(return_value=True)
+
+        with pytest.raises(TimeoutError):
+            await websocket_client.request("wskSubscribe", {"topic": "x"}, timeout=0.01)
+
+        assert websocket_client._pending == {}
+
+    @pytest.mark.asyncio
+    async def test_request_fails_when_send_fails(self, websocket_client):
+        """Test that a request that could not be sent fails immediately."""
+        websocket_client.websocket_send = AsyncMock(return_value=False)
+
+        with pytest.raises(ClientConnectionError):
+            await websocket_client.request("wskSubscribe", {"topic": "x"})
+
+    @pytest.mark.asyncio
+    async def test_resolve_response_ignores_notifications(self, websocket_client, fixtures_dir):
+        """Test that notifications and unknown ids are not treated as responses."""
+        notification = load_fixture(fixtures_dir, "ws_message_1762952771.json")
+
+        assert websocket_client._resolve_response(notification) is False
+        assert websocket_client._resolve_response({"id": 99, "result": {}}) is False
+
+    @pytest.mark.asyncio
+    async def test_send_message_not_acknowledged(self, websocket_client):
+        """Test that send_message reports a command the server never acknowledged."""
+        websocket_client._state = STATE_CONNECTED
+        websocket_client.request = AsyncMock(side_effect=TimeoutError)
+
+        assert await websocket_client.send_message(7, 5, "doorCommand", 1) is False
+
     @pytest.mark.asyncio
     async def test_close_sets_state_to_stopped(self, websocket_client, mock_callback):
         """Test that close sets state to stopped."""
@@ -155,7 +368,7 @@ class TestRyobiWebSocket:
         mock_ws_client = MagicMock()
         mock_message = MagicMock()
         mock_message.type = WSMsgType.TEXT
-        mock_message.json.return_value = {"test": "data"}
+        mock_message.data = '{"method": "wskAttributeUpdateNtfy", "params": {"varName": "test_device"}}'
 
         # Create async iterator that yields one message then stops
         async def mock_iter():
@@ -176,7 +389,7 @@ class TestRyobiWebSocket:
         # Verify callback was called with the message data
         data_calls = [call for call in mock_callback.call_args_list if call[0][0] == "data"]
         assert len(data_calls) > 0
-        assert data_calls[0][0][1] == {"test": "data"}
+        assert data_calls[0][0][1] == {"method": "wskAttributeUpdateNtfy", "params": {"varName": "test_device"}}
 
     @pytest.mark.asyncio
     async def test_running_handles_closed_messages(self, websocket_client):
@@ -208,3 +421,111 @@ class TestRyobiWebSocket:
 
         # Should exit cleanly when connection closes
         assert websocket_client.state == STATE_DISCONNECTED
+
+    @pytest.mark.asyncio
+    async def test_running_resolves_responses_without_forwarding(self, websocket_client, mock_callback):
+        """Test that handshake responses complete their requests and never reach the callback."""
+        response = MagicMock()
+        response.type = WSMsgType.TEXT
+        notification = MagicMock()
+        notification.type = WSMsgType.BINARY
+        notification.data = b'{"method": "wskAttributeUpdateNtfy", "params": {}}'
+        sent = asyncio.Queue()
+
+        async def mock_iter():
+            message = await sent.get()
+            response.data = json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": {"result": "OK"}})
+            yield response
+            message = await sent.get()
+            response.data = json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": {}})
+            yield response
+            while websocket_client.state != STATE_CONNECTED:
+                await asyncio.sleep(0)
+            yield notification
+            websocket_client._state = STATE_STOPPED
+
+        mock_ws_client = MagicMock()
+        mock_ws_client.__aiter__ = lambda self: mock_iter()
+        websocket_client.session.ws_connect = MagicMock()
+        websocket_client.session.ws_connect.return_value.__aenter__ = AsyncMock(return_value=mock_ws_client)
+        websocket_client.session.ws_connect.return_value.__aexit__ = AsyncMock()
+
+        async def send(frame):
+            await sent.put(json.loads(frame))
+            return True
+
+        websocket_client.websocket_send = AsyncMock(side_effect=send)
+
+        await websocket_client.running()
+
+        data_calls = [call[0][1] for call in mock_callback.call_args_list if call[0][0] == "data"]
+        assert data_calls == [{"method": "wskAttributeUpdateNtfy", "params": {}}]
+        assert ("websocket_state", STATE_CONNECTED, None) in [call[0] for call in mock_callback.call_args_list]
+
+    @pytest.mark.asyncio
+    async def test_handle_frame_drops_unknown_and_invalid_frames(self, websocket_client, mock_callback):
+        """Test that only attribute notifications reach the callback."""
+        with patch("ryobi_gdo_2_mqtt.websocket.log"):
+            await websocket_client._handle_frame(b'{"jsonrpc": "2.0", "method": "srvPing", "params": {}}')
+            await websocket_client._handle_frame(b'{"jsonrpc": "2.0", "id": 42, "result": {}}')
+            await websocket_client._handle_frame(b"not json")
+
+        mock_callback.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_running_stops_on_auth_rejection(self, websocket_client, mock_callback):
+        """Test that a rejected handshake stops the connection instead of retrying."""
+
+        async def mock_iter():
+            await asyncio.Event().wait()
+            yield  # pragma: no cover
+
+        mock_ws_client = MagicMock()
+        mock_ws_client.__aiter__ = lambda self: mock_iter()
+        websocket_client.session.ws_connect = MagicMock()
+        websocket_client.session.ws_connect.return_value.__aenter__ = AsyncMock(return_value=mock_ws_client)
+        websocket_client.session.ws_connect.return_value.__aexit__ = AsyncMock(return_value=False)
+        websocket_client.websocket_auth = AsyncMock(side_effect=RyobiAuthenticationError("rejected"))
+
+        with patch("ryobi_gdo_2_mqtt.websocket.log"):
+            await websocket_client.running()
+
+        assert websocket_client.state == STATE_STOPPED
+        mock_callback.assert_called_with("websocket_state", STATE_STOPPED, ERROR_AUTH_FAILURE)
+
+    @pytest.mark.asyncio
+    async def test_running_retries_with_new_key_on_auth_rejection(self, websocket_client):
+        """Test that a rejected API key is replaced once and the connection retried."""
+        mock_ws_client = MagicMock()
+        websocket_client.session.ws_connect = MagicMock()
+        websocket_client.session.ws_connect.return_value.__aenter__ = AsyncMock(return_value=mock_ws_client)
+        websocket_client.session.ws_connect.return_value.__aexit__ = AsyncMock(return_value=False)
+        websocket_client.websocket_auth = AsyncMock(side_effect=RyobiAuthenticationError("rejected"))
+        websocket_client.reauthenticate = AsyncMock(return_value="new_api_key")
+
+        with patch("ryobi_gdo_2_mqtt.websocket.log"):
+            await websocket_client.running()
+            assert websocket_client.state == STATE_DISCONNECTED
+            assert websocket_client._apikey == "new_api_key"
+
+            # The new key is rejected too, so there is no second login
+            await websocket_client.running()
+
+        websocket_client.reauthenticate.assert_awaited_once_with("test_api_key")
+        assert websocket_client.state == STATE_STOPPED
+
+    @pytest.mark.asyncio
+    async def test_running_stops_when_reauthentication_fails(self, websocket_client, mock_callback):
+        """Test that the connection stops if no new API key can be obtained."""
+        mock_ws_client = MagicMock()
+        websocket_client.session.ws_connect = MagicMock()
+        websocket_client.session.ws_connect.return_value.__aenter__ = AsyncMock(return_value=mock_ws_client)
+        websocket_client.session.ws_connect.return_value.__aexit__ = AsyncMock(return_value=False)
+        websocket_client.websocket_auth = AsyncMock(side_effect=RyobiAuthenticationError("rejected"))
+        websocket_client.reauthenticate = AsyncMock(return_value=None)
+
+        with patch("ryobi_gdo_2_mqtt.websocket.log"):
+            await websocket_client.running()
+
+        assert websocket_client.state == STATE_STOPPED
+        mock_callback.assert_called_with("websocket_state", STATE_STOPPED, ERROR_AUTH_FAILURE)
@@ -1,8 +1,11 @@
 """Tests for WebSocket message parser."""
 
+import logging
+from unittest.mock import patch
+
 import pytest
 
-from ryobi_gdo_2_mqtt.websocket_parser import WebSocketMessageParser
+from ryobi_gdo_2_mqtt.websocket_parser import WebSocketMessageParser, compile_key
 from tests.conftest import load_fixture
 
 
@@ -75,8 +78,8 @@ class TestWebSocketMessageParser:
         updates = parser.parse_attribute_update(data)
 
         # This message has both doorState and doorPosition
-        assert "door_state" in updates
         assert updates["door_state"] == "open"
+        assert updates["door_position"] == 87
 
 
 class TestWebSocketParserNewEntities:
@@ -151,3 +154,177 @@ class TestWebSocketParserNewEntities:
 
         assert "bt_speaker" in updates
         assert updates["bt_speaker"] == 1
+
+
+class TestCompileKey:
+    """Tests for the compiled attribute key cache."""
+
+    def test_compile_key_maps_attributes(self):
+        """Test that keys compile to the field they update."""
+        assert compile_key("garageDoor_7.motionSensor") == ("motion", None)
+        assert compile_key("garageLight_7.lightState") == ("light_state", bool)
+        assert compile_key("fan_3.speed") == ("fan", None)
+        assert compile_key("garageDoor_7.doorPosition") == ("door_position", None)
+
+    def test_compile_key_ignored_keys(self):
+        """Test that metadata and unused module attributes are ignored."""
+        assert compile_key("topic") is None
+        assert compile_key("varName") is None
+        assert compile_key("garageDoor_7.doorError") is None
+
+    def test_compile_key_unhandled_module(self):
+        """Test that unknown modules compile to an unhandled marker."""
+        assert compile_key("wifiModule_1.rssi") == (None, None)
+
+    def test_compile_key_is_cached(self):
+        """Test that each distinct key is compiled once."""
+        compile_key.cache_clear()
+
+        compile_key("garageDoor_7.doorState")
+        compile_key("garageDoor_7.doorState")
+
+        info = compile_key.cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
+
+    def test_parse_unknown_door_state_is_dropped(self, parser):
+        """Test that door state values outside the known states are not reported."""
+        data = {"method": "wskAttributeUpdateNtfy", "params": {"garageDoor_7.doorState": {"value": 99}}}
+
+        assert parser.parse_attribute_update(data) == {}
+
+    def test_parse_bad_value_keeps_earlier_updates(self, parser):
+        """Test that a value that fails conversion stops parsing but keeps what was parsed."""
+        data = {
+            "method": "wskAttributeUpdateNtfy",
+            "params": {
+                "garageLight_7.lightState": {"value": True},
+                "backupCharger_8.chargeLevel": {"value": None},
+            },
+        }
+
+        with patch("ryobi_gdo_2_mqtt.websocket_parser.log"):
+            assert parser.parse_attribute_update(data) == {"light_state": True}
+
+
+def door_state_message(value, last_value, last_set):
+    """Build a doorState notification for device c4be84986d2e."""
+    return {
+        "method": "wskAttributeUpdateNtfy",
+        "params": {
+            "topic": "c4be84986d2e.wskAttributeUpdateNtfy",
+            "varName": "c4be84986d2e",
+            "garageDoor_7.doorState": {"value": value, "lastValue": last_value, "lastSet": last_set},
+        },
+    }
+
+
+def door_position_message(value, last_value, last_set):
+    """Build a doorPosition notification for device c4be84986d2e."""
+    return {
+        "method": "wskAttributeUpdateNtfy",
+        "params": {
+            "topic": "c4be84986d2e.wskAttributeUpdateNtfy",
+            "varName": "c4be84986d2e",
+            "garageDoor_7.doorPosition": {"value": value, "lastValue": last_value, "lastSet": last_set},
+        },
+    }
+
+
+class TestStaleUpdates:
+    """Tests for lastSet based stale and duplicate detection."""
+
+    def test_duplicate_notification_dropped(self, parser, fixtures_dir):
+        """Test that a replayed notification is dropped for its device."""
+        data = load_fixture(fixtures_dir, "ws_message_1762952771.json")
+
+        first = parser.parse_attribute_update(data, "c4be84986d2e")
+        second = parser.parse_attribute_update(data, "c4be84986d2e")
+
+        assert first == {"door_state": "open", "door_position": 87}
+        assert second == {}
+        assert parser.stale_dropped == 2
+
+    def test_out_of_order_notification_dropped(self, parser):
+        """Test that an older notification arriving late does not regress state."""
+        parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e")
+
+        updates = parser.parse_attribute_update(door_state_message(3, 2, 1000), "c4be84986d2e")
+
+        assert updates == {}
+
+    def test_devices_tracked_separately(self, parser):
+        """Test that stamps of one device don't affect another."""
+        parser.parse_attribute_update(door_state_message(1, 3, 2000), "device1")
+
+        assert parser.parse_attribute_update(door_state_message(1, 3, 2000), "device2") == {"door_state": "open"}
+
+    def test_no_tracking_without_device(self, parser, fixtures_dir):
+        """Test that messages parsed without a device are never dropped."""
+        data = load_fixture(fixtures_dir, "ws_message_1762952771.json")
+
+        parser.parse_attribute_update(data)
+
+        assert parser.parse_attribute_update(data) == {"door_state": "open", "door_position": 87}
+
+    def test_last_value_mismatch_flags_resync(self, parser):
+        """Test that a lastValue different from the applied value flags a gap."""
+        parser.seed("c4be84986d2e", {"garageDoor_7.doorState": (1000, 0)})
+
+        updates = parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e")
+
+        assert updates == {"door_state": "open"}
+        assert updates.resync is True
+        assert parser.gaps_detected == 1
+
+    def test_gap_logs_warning(self, parser, caplog):
+        """Test that every detected gap is logged as a warning."""
+        parser.seed("c4be84986d2e", {"garageDoor_7.doorState": (1000, 0)})
+
+        with caplog.at_level(logging.WARNING, logger="ryobi_gdo_2_mqtt.logging"):
+            parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e")
+
+        assert "Missed update for c4be84986d2e garageDoor_7.doorState: expected lastValue 0, got 3" in caplog.text
+
+    def test_position_last_value_mismatch_no_resync(self, parser):
+        """Test that positions skipping values while the door moves don't flag gaps."""
+        parser.seed("c4be84986d2e", {"garageDoor_7.doorPosition": (1000, 50)})
+
+        for value, last_set in ((61, 2000), (72, 3000), (87, 4000)):
+            updates = parser.parse_attribute_update(door_position_message(value, value - 5, last_set), "c4be84986d2e")
+            assert updates == {"door_position": value}
+            assert updates.resync is False
+
+        assert parser.gaps_detected == 0
+
+    def test_matching_last_value_no_resync(self, parser):
+        """Test that contiguous updates don't flag a gap."""
+        parser.seed("c4be84986d2e", {"garageDoor_7.doorState": (1000, 3)})
+
+        updates = parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e")
+
+        assert updates.resync is False
+
+    def test_seed_keeps_newer_notification_stamps(self, parser):
+        """Test that an older REST state doesn't overwrite newer notification stamps."""
+        parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e")
+
+        parser.seed("c4be84986d2e", {"garageDoor_7.doorState": (1000, 3)})
+
+        assert parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e") == {}
+
+    def test_newer_fields(self, parser):
+        """Test that only fields notified after the given stamps are reported newer."""
+        parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e")
+
+        assert parser.newer_fields("c4be84986d2e", {"garageDoor_7.doorState": (1000, 1)}) == {"door_state"}
+        assert parser.newer_fields("c4be84986d2e", {"garageDoor_7.doorState": (3000, 1)}) == set()
+        assert parser.newer_fields("device2", {"garageDoor_7.doorState": (1000, 1)}) == set()
+
+    def test_forget_clears_device(self, parser):
+        """Test that forgetting a device accepts its updates again."""
+        parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e")
+
+        parser.forget("c4be84986d2e")
+
+        assert parser.parse_attribute_update(door_state_message(1, 3, 2000), "c4be84986d2e") == {"door_state": "open"}
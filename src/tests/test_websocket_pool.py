@@ -0,0 +1,238 @@
+"""Tests for the sharded WebSocket pool."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiohttp import ClientSession
+
+from ryobi_gdo_2_mqtt.websocket import STATE_CONNECTED, STATE_STOPPED
+from ryobi_gdo_2_mqtt.websocket_pool import RyobiWebSocketPool
+
+
+@pytest.fixture
+def mock_session():
+    """Create a mock aiohttp session."""
+    return MagicMock(spec=ClientSession)
+
+
+@pytest.fixture
+def shard_callbacks():
+    """Collect the getter each shard's callback was built with."""
+    return []
+
+
+@pytest.fixture
+def pool(mock_session, shard_callbacks):
+    """Create a pool with room for two devices per connection."""
+
+    def callback_factory(get_websocket):
+        shard_callbacks.append(get_websocket)
+        return AsyncMock()
+
+    return RyobiWebSocketPool(
+        callback_factory=callback_factory,
+        username="test@example.com",
+        apikey="test_api_key",
+        session=mock_session,
+        topics_per_connection=2,
+    )
+
+
+def serve(shard, subscriptions: set[str]) -> None:
+    """Connect a shard to a fake server that tracks which devices it streams to the shard."""
+    shard._state = STATE_CONNECTED
+
+    async def send(frame):
+        request = json.loads(frame)
+        device_id = request["params"]["topic"].split(".", 1)[0]
+        if request["method"] == "wskSubscribe":
+            subscriptions.add(device_id)
+        elif request["method"] == "wskUnsubscribe":
+            subscriptions.discard(device_id)
+        shard._resolve_response({"id": request["id"], "result": {}})
+        return True
+
+    shard.websocket_send = AsyncMock(side_effect=send)
+
+
+class TestRyobiWebSocketPool:
+    """Tests for RyobiWebSocketPool."""
+
+    @pytest.mark.asyncio
+    async def test_add_device_fills_shards_up_to_limit(self, pool):
+        """Test that devices are spread over connections of bounded size."""
+        for device_id in ["device1", "device2", "device3"]:
+            await pool.add_device(device_id)
+
+        assert [shard.devices for shard in pool.shards] == [["device1", "device2"], ["device3"]]
+
+    @pytest.mark.asyncio
+    async def test_add_device_prefers_least_loaded_shard(self, pool):
+        """Test that new devices go to the connection with the most room."""
+        for device_id in ["device1", "device2", "device3"]:
+            await pool.add_device(device_id)
+        await pool.shards[0].remove_device("device1")
+        await pool.shards[0].remove_device("device2")
+
+        shard = await pool.add_device("device4")
+
+        assert shard is pool.shards[0]
+
+    @pytest.mark.asyncio
+    async def test_add_device_is_idempotent(self, pool):
+        """Test that adding a device twice keeps a single subscription."""
+        first = await pool.add_device("device1")
+        second = await pool.add_device("device1")
+
+        assert first is second
+        assert pool.devices == ["device1"]
+
+    @pytest.mark.asyncio
+    async def test_unbounded_pool_uses_one_connection(self, mock_session):
+        """Test that a limit of 0 puts every device on one connection."""
+        pool = RyobiWebSocketPool(
+            callback_factory=lambda get_websocket: AsyncMock(),
+            username="test@example.com",
+            apikey="test_api_key",
+            session=mock_session,
+            topics_per_connection=0,
+        )
+
+        for i in range(5):
+            await pool.add_device(f"device{i}")
+
+        assert len(pool.shards) == 1
+
+    @pytest.mark.asyncio
+    async def test_shard_callback_getter_returns_its_shard(self, pool, shard_callbacks):
+        """Test that each shard's callback can find the shard it belongs to."""
+        for device_id in ["device1", "device2", "device3"]:
+            await pool.add_device(device_id)
+
+        assert [get_websocket() for get_websocket in shard_callbacks] == pool.shards
+
+    @pytest.mark.asyncio
+    async def test_remove_device_rebalances_into_fewer_shards(self, pool):
+        """Test that removing a device folds a sparse connection into the others."""
+        for device_id in ["device1", "device2", "device3", "device4"]:
+            await pool.add_device(device_id)
+        retiring = pool.shards[1]
+        retiring.close = AsyncMock()
+
+        await pool.remove_device("device1")
+
+        assert len(pool.shards) == 2
+        await pool.remove_device("device2")
+
+        assert len(pool.shards) == 1
+        assert sorted(pool.shards[0].devices) == ["device3", "device4"]
+        retiring.close.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_remove_device_evens_out_remaining_shards(self, mock_session):
+        """Test that removals leave the connections that stay open evenly loaded."""
+        pool = RyobiWebSocketPool(
+            callback_factory=lambda get_websocket: AsyncMock(),
+            username="test@example.com",
+            apikey="test_api_key",
+            session=mock_session,
+            topics_per_connection=3,
+        )
+        for i in range(1, 7):
+            await pool.add_device(f"device{i}")
+
+        await pool.remove_device("device4")
+        await pool.remove_device("device5")
+
+        assert len(pool.shards) == 2
+        assert [len(shard.devices) for shard in pool.shards] == [2, 2]
+        assert sorted(pool.devices) == ["device1", "device2", "device3", "device6"]
+
+    @pytest.mark.asyncio
+    async def test_rebalance_subscribes_moved_devices_on_live_shard(self, pool):
+        """Test that devices moved to a connected shard are resubscribed there, removed ones unsubscribed."""
+        for device_id in ["device1", "device2", "device3"]:
+            await pool.add_device(device_id)
+        keeper, retiring = pool.shards
+        keeper._state = STATE_CONNECTED
+        keeper.websocket_send = AsyncMock(
+            side_effect=lambda frame: keeper._resolve_response({"id": json.loads(frame)["id"], "result": {}}) or True
+        )
+        retiring.close = AsyncMock()
+
+        await pool.remove_device("device1")
+
+        assert pool.shards == [keeper]
+        assert keeper.devices == ["device2", "device3"]
+        requests = [json.loads(call.args[0]) for call in keeper.websocket_send.call_args_list]
+        assert [(request["method"], request["params"]["topic"]) for request in requests] == [
+            ("wskUnsubscribe", "device1.wskAttributeUpdateNtfy"),
+            ("wskSubscribe", "device3.wskAttributeUpdateNtfy"),
+        ]
+        assert retiring.devices == []
+        retiring.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_moved_device_streamed_on_one_shard_only(self, mock_session):
+        """Test that the shard a device is moved off stops receiving its notifications."""
+        pool = RyobiWebSocketPool(
+            callback_factory=lambda get_websocket: AsyncMock(),
+            username="test@example.com",
+            apikey="test_api_key",
+            session=mock_session,
+            topics_per_connection=3,
+        )
+        for i in range(1, 7):
+            await pool.add_device(f"device{i}")
+        streamed = [set(shard.devices) for shard in pool.shards]
+        for shard, subscriptions in zip(pool.shards, streamed, strict=True):
+            serve(shard, subscriptions)
+
+        await pool.remove_device("device4")
+        await pool.remove_device("device5")
+
+        assert streamed == [set(shard.devices) for shard in pool.shards]
+        assert not streamed[0] & streamed[1]
+
+    @pytest.mark.asyncio
+    async def test_remove_unknown_device(self, pool):
+        """Test removing a device the pool does not carry is a no-op."""
+        await pool.add_device("device1")
+
+        await pool.remove_device("unknown")
+
+        assert pool.devices == ["device1"]
+
+    @pytest.mark.asyncio
+    async def test_send_message_routes_to_device_shard(self, pool):
+        """Test that commands go out over the connection carrying the device."""
+        for device_id in ["device1", "device2", "device3"]:
+            await pool.add_device(device_id)
+        for shard in pool.shards:
+            shard.send_message = AsyncMock()
+
+        await pool.send_message(7, 5, "doorCommand", 1, device_id="device3")
+
+        pool.shards[0].send_message.assert_not_called()
+        pool.shards[1].send_message.assert_called_once_with(7, 5, "doorCommand", 1, device_id="device3")
+
+    @pytest.mark.asyncio
+    async def test_send_message_unknown_device(self, pool):
+        """Test that commands for devices outside the pool are dropped."""
+        await pool.add_device("device1")
+        pool.shards[0].send_message = AsyncMock()
+
+        await pool.send_message(7, 5, "doorCommand", 1, device_id="unknown")
+
+        pool.shards[0].send_message.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_close_stops_every_shard(self, pool):
+        """Test that closing the pool stops all connections."""
+        for device_id in ["device1", "device2", "device3"]:
+            await pool.add_device(device_id)
+
+        await pool.close()
+
+        assert all(shard.state == STATE_STOPPED for shard in pool.shards)